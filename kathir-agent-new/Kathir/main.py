@@ -11,6 +11,7 @@ Run the CLI chat loop instead:
 """
 
 import os
+import threading
 from dotenv import load_dotenv
 from fastapi import FastAPI
 from fastapi.responses import Response
@@ -19,11 +20,15 @@ from fastapi.middleware.cors import CORSMiddleware
 # Load environment variables from .env file
 load_dotenv()
 
+from src.api.routes_admin import router as admin_router
 from src.api.routes_cart import router as cart_router
 from src.api.routes_favorites import router as favorites_router
 from src.api.routes_health import router as health_router
 from src.api.routes_meals import router as meals_router
 from src.api.routes_agent import router as agent_router
+from src.utils.restaurant_directory import restaurant_directory
+from src.utils.checkpointer import start_compactor
+from src.utils.meal_catalog import start_catalog_refresher
 
 app = FastAPI(
     title="Boss Food Ordering API",
@@ -40,6 +45,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.on_event("startup")
+def warm_indexes():
+    """Load the in-process meal catalog (vector + BM25) and restaurant directory, and
+    start checkpoint compaction, in the background."""
+    start_catalog_refresher()
+    start_compactor()
+    threading.Thread(target=restaurant_directory.refresh, daemon=True).start()
+
+
 @app.get("/")
 async def root():
     """API root endpoint"""
@@ -49,8 +63,10 @@ async def root():
         "docs": "/docs",
         "redoc": "/redoc",
         "health": "/health",
+        "metrics": "/metrics",
         "endpoints": {
             "agent_chat": "/agent/chat",
+            "agent_chat_stream": "/agent/chat/stream",
             "agent_info": "/agent/info",
             "meals_search": "/meals/search",
             "favorites_search": "/favorites/search",
@@ -72,3 +88,4 @@ app.include_router(agent_router, prefix="/agent", tags=["Agent"])
 app.include_router(meals_router, prefix="/meals", tags=["Meals"])
 app.include_router(favorites_router, prefix="/favorites", tags=["Favorites"])
 app.include_router(cart_router, prefix="/cart", tags=["Cart"])
+app.include_router(admin_router, prefix="/admin", tags=["Admin"])
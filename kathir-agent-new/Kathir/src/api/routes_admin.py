@@ -0,0 +1,70 @@
+"""
+api/routes_admin.py
+───────────────────
+FastAPI router — internal maintenance hooks.
+
+Call these from Supabase database webhooks (or by hand) when source data
+changes, so in-process caches and indexes pick it up immediately instead of
+waiting for their next periodic refresh.
+
+Requests must send ADMIN_TOKEN in the X-Admin-Token header. With no
+ADMIN_TOKEN configured every endpoint answers 503 — the hooks are never open.
+
+Mount this router in your main app:
+    from api.routes_admin import router as admin_router
+    app.include_router(admin_router, prefix="/admin", tags=["Admin"])
+"""
+
+import hmac
+import os
+from typing import List, Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException
+
+from src.utils.checkpointer import get_checkpointer
+from src.utils.restaurant_directory import restaurant_directory
+from src.utils.result_cache import search_cache
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not hmac.compare_digest((x_admin_token or "").encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.post("/refresh/restaurants")
+def refresh_restaurants():
+    """Reload the in-process restaurant directory (run when restaurants change)."""
+    count = restaurant_directory.refresh()
+    return {"ok": True, "restaurants": count}
+
+
+@router.post("/invalidate/meals")
+def invalidate_meals(meal_ids: Optional[List[str]] = Body(default=None, embed=True)):
+    """
+    Drop cached searches that contain any of `meal_ids` (run when a meal's
+    stock or status changes). Without `meal_ids` the whole cache is cleared.
+    """
+    if meal_ids is None:
+        dropped = search_cache.clear()
+    else:
+        dropped = search_cache.invalidate_meals(meal_ids)
+    return {"ok": True, "invalidated": dropped}
+
+
+@router.get("/checkpoints")
+def checkpoint_footprint(limit: int = 100):
+    """Per-thread conversation storage (checkpoints, writes, bytes, idle time), largest first."""
+    return {"ok": True, **get_checkpointer().footprint(limit=limit)}
+
+
+@router.post("/checkpoints/compact")
+def compact_checkpoints():
+    """Evict idle / excess threads, trim per-thread history and VACUUM now."""
+    return {"ok": True, **get_checkpointer().compact()}
@@ -2,17 +2,33 @@
 routes_agent.py
 ───────────────
 FastAPI routes for the Boss AI agent.
+
+  POST /chat         — run the whole ReAct loop, return one JSON response
+  POST /chat/stream  — the same run as Server-Sent Events: tool_start /
+                       tool_result as tools run, token as the final answer
+                       streams, then done
+
+Simple requests ("what's in my cart?", "desserts under 50") are answered by
+the intent router's fast path without an LLM call (see intent_router.py).
 """
 
+import json
+import os
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Any, AsyncIterator, Dict, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from src.boss_agent import create_agent
+from src.intent_router import aclassify, answer
 from src.utils.auth import get_current_user
+from src.utils.checkpointer import get_checkpointer
+from src.utils.concurrency import ConcurrencyGate, GateFull
+from src.utils.request_context import set_current_user, user_context
+from src.utils.tool_data import ToolDataCollector, build_response, tool_output_data
 
 router = APIRouter()
 
@@ -20,6 +36,13 @@ router = APIRouter()
 _agent = None
 _sessions = {}  # Store session threads
 
+# Per-worker cap on concurrent agent runs, with a bounded wait queue
+agent_gate = ConcurrencyGate(
+    limit=int(os.environ.get("AGENT_MAX_CONCURRENCY", "4")),
+    max_waiting=int(os.environ.get("AGENT_MAX_QUEUE", "16")),
+    wait_timeout=float(os.environ.get("AGENT_QUEUE_TIMEOUT_SECONDS", "10")),
+)
+
 
 def get_agent():
     """Get or create the global agent instance"""
@@ -52,8 +75,8 @@ async def chat_with_agent(
     Chat with the Boss AI agent.
     
     The agent returns structured JSON responses with:
-    - message: User-friendly text
-    - data: Structured data (meals, cart, etc.)
+    - message: User-friendly text (written by the model)
+    - data: Structured data (meals, cart, etc.) — the tool output, attached as-is
     - action: Type of response (search, cart, build, etc.)
     
     User is automatically determined from authentication.
@@ -77,70 +100,39 @@ async def chat_with_agent(
         now = datetime.now().strftime("%Y-%m-%d %H:%M")
         contextual_message = f"[context: current time={now}, location=Cairo EG, user_id={user_id}]\n{request.message}"
         
-        # Invoke agent
-        result = agent.invoke(
-            {"messages": [{"role": "user", "content": contextual_message}]},
-            config,
-        )
+        # Simple, self-contained requests skip the LLM entirely.
+        route = await aclassify(request.message)
+        if route is not None:
+            with user_context(user_id):
+                fast = await answer(agent, config, route, contextual_message, request.message)
+            if session_id not in _sessions:
+                _sessions[session_id] = {"created_at": datetime.now(), "message_count": 0}
+            _sessions[session_id]["message_count"] = fast["message_count"]
+            return ChatResponse(
+                ok=True,
+                response=fast["response"],
+                session_id=session_id,
+                message_count=fast["message_count"],
+            )
+
+        # Run the agent without blocking the event loop, behind the per-worker
+        # gate. Tools read user_id from the request context; their results
+        # are captured as they finish and attached to the reply below.
+        collector = ToolDataCollector()
+        with user_context(user_id):
+            async with agent_gate.slot():
+                result = await agent.ainvoke(
+                    {"messages": [{"role": "user", "content": contextual_message}]},
+                    {**config, "callbacks": [collector]},
+                )
         
-        # Extract response
-        response_content = result["messages"][-1].content
+        response_content = json.dumps(
+            build_response(result["messages"][-1].content, collector),
+            ensure_ascii=False,
+            default=str,
+        )
         message_count = len(result["messages"])
-        
-        # Try to extract tool results from message history
-        import json
-        import re
-        
-        tool_results = None
-        tool_action = None
-        
-        # Look through messages for tool calls and results
-        for msg in result["messages"]:
-            # Check if this is a tool message (has tool_calls)
-            if hasattr(msg, 'tool_calls') and msg.tool_calls:
-                for tool_call in msg.tool_calls:
-                    tool_action = tool_call.get('name', '').replace('_', '')
-            
-            # Check if this is a tool result message
-            if hasattr(msg, 'type') and msg.type == 'tool':
-                try:
-                    # Tool result is in the content
-                    if isinstance(msg.content, str):
-                        tool_results = json.loads(msg.content)
-                    elif isinstance(msg.content, dict):
-                        tool_results = msg.content
-                except:
-                    pass
-        
-        # Try to parse JSON from agent's response
-        json_match = re.search(r'\{.*\}', response_content, re.DOTALL)
-        if json_match:
-            try:
-                parsed_json = json.loads(json_match.group())
-                
-                # If agent didn't include data but we have tool results, add them
-                if (parsed_json.get('data') is None or parsed_json.get('data') == {}) and tool_results:
-                    parsed_json['data'] = tool_results
-                
-                # If no action specified but we detected one, add it
-                if not parsed_json.get('action') and tool_action:
-                    parsed_json['action'] = tool_action
-                
-                response_content = json.dumps(parsed_json, ensure_ascii=False)
-            except json.JSONDecodeError:
-                # If JSON parsing fails, create response with tool results
-                response_content = json.dumps({
-                    "message": response_content,
-                    "data": tool_results,
-                    "action": tool_action
-                }, ensure_ascii=False)
-        else:
-            # No JSON found, wrap response with tool results
-            response_content = json.dumps({
-                "message": response_content,
-                "data": tool_results,
-                "action": tool_action
-            }, ensure_ascii=False)
+        print(f"Agent turn {session_id}: {collector.finish()}")
         
         # Store session
         if session_id not in _sessions:
@@ -154,10 +146,127 @@ async def chat_with_agent(
             message_count=message_count
         )
         
+    except GateFull as exc:
+        raise _busy(exc)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Agent error: {str(e)}")
 
 
+def _busy(exc: GateFull) -> HTTPException:
+    return HTTPException(
+        status_code=exc.status_code,
+        detail=exc.detail,
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+
+@router.post("/chat/stream")
+async def chat_with_agent_stream(
+    request: ChatRequest,
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Chat with the Boss AI agent over Server-Sent Events.
+
+    Events (each `data:` is JSON):
+    - session     : {session_id} — sent first
+    - tool_start  : {name, input} — a tool call began
+    - tool_result : {name, output} — a tool call finished
+    - token       : {text} — a chunk of the model's reply ({"message", "action"})
+    - done        : {session_id, response, message_count} — response is the
+                    same JSON string /chat returns, with the tool data attached
+    - error       : {detail}
+    """
+    route = await aclassify(request.message)
+
+    # Fail fast with a real status code before the 200 stream starts
+    # (the fast path does not take an agent slot).
+    if route is None:
+        try:
+            agent_gate.check()
+        except GateFull as exc:
+            raise _busy(exc)
+
+    agent = get_agent()
+    session_id = request.session_id or str(uuid.uuid4())
+    config = {"configurable": {"thread_id": session_id}}
+
+    now = datetime.now().strftime("%Y-%m-%d %H:%M")
+    contextual_message = f"[context: current time={now}, location=Cairo EG, user_id={user_id}]\n{request.message}"
+
+    async def fast_events() -> AsyncIterator[str]:
+        set_current_user(user_id)
+        yield _sse("session", {"session_id": session_id})
+        yield _sse("tool_start", {"name": route.tool, "input": route.args})
+        try:
+            fast = await answer(agent, config, route, contextual_message, request.message)
+            if session_id not in _sessions:
+                _sessions[session_id] = {"created_at": datetime.now(), "message_count": 0}
+            _sessions[session_id]["message_count"] = fast["message_count"]
+            yield _sse("tool_result", {"name": route.tool, "output": fast["data"]})
+            yield _sse("done", {
+                "session_id": session_id,
+                "response": fast["response"],
+                "message_count": fast["message_count"],
+            })
+        except Exception as e:
+            yield _sse("error", {"detail": f"Agent error: {str(e)}"})
+
+    async def events() -> AsyncIterator[str]:
+        # Tools read user_id from the request context; this generator runs in its own task.
+        set_current_user(user_id)
+        yield _sse("session", {"session_id": session_id})
+
+        reply: list[str] = []
+        collector = ToolDataCollector()
+        try:
+            async with agent_gate.slot():
+                async for ev in agent.astream_events(
+                    {"messages": [{"role": "user", "content": contextual_message}]},
+                    {**config, "callbacks": [collector]},
+                    version="v2",
+                ):
+                    kind = ev["event"]
+                    if kind == "on_tool_start":
+                        reply.clear()  # text before a tool call is not the final answer
+                        yield _sse("tool_start", {"name": ev["name"], "input": ev["data"].get("input")})
+                    elif kind == "on_tool_end":
+                        yield _sse("tool_result", {"name": ev["name"], "output": tool_output_data(ev["data"].get("output"))})
+                    elif kind == "on_chat_model_stream":
+                        text = ev["data"]["chunk"].content
+                        if isinstance(text, str) and text:
+                            reply.append(text)
+                            yield _sse("token", {"text": text})
+
+                state = await agent.aget_state(config)
+                messages = state.values.get("messages", [])
+                if session_id not in _sessions:
+                    _sessions[session_id] = {"created_at": datetime.now(), "message_count": 0}
+                _sessions[session_id]["message_count"] = len(messages)
+
+                final = messages[-1].content if messages else "".join(reply)
+                print(f"Agent turn {session_id}: {collector.finish()}")
+                yield _sse("done", {
+                    "session_id": session_id,
+                    "response": json.dumps(build_response(final, collector), ensure_ascii=False, default=str),
+                    "message_count": len(messages),
+                })
+        except GateFull as exc:
+            yield _sse("error", {"detail": exc.detail, "status": exc.status_code, "retry_after": exc.retry_after})
+        except Exception as e:
+            yield _sse("error", {"detail": f"Agent error: {str(e)}"})
+
+    return StreamingResponse(
+        fast_events() if route is not None else events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/sessions")
 async def list_sessions():
     """List all active chat sessions"""
@@ -176,12 +285,13 @@ async def list_sessions():
 
 @router.delete("/sessions/{session_id}")
 async def delete_session(session_id: str):
-    """Delete a chat session"""
-    if session_id in _sessions:
-        del _sessions[session_id]
-        return {"ok": True, "message": f"Session {session_id} deleted"}
-    else:
+    """Delete a chat session (and its stored conversation history)"""
+    # Stored history outlives the in-memory session list (e.g. across restarts).
+    known = _sessions.pop(session_id, None) is not None
+    stored = await get_checkpointer().adelete_thread(session_id)
+    if not (known or stored):
         raise HTTPException(status_code=404, detail="Session not found")
+    return {"ok": True, "message": f"Session {session_id} deleted"}
 
 
 @router.get("/agent/info")
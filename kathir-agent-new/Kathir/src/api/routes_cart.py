@@ -13,9 +13,10 @@ from typing import Any, Dict, List, Optional
 from fastapi import APIRouter, Body, Depends, Query
 from pydantic import BaseModel, Field
 
-from src.tools.budget import build_cart
+from src.tools.budget import abuild_cart
 from src.tools.cart import add_to_cart, get_cart
 from src.utils.auth import get_current_user
+from src.utils.request_context import user_context
 
 router = APIRouter()
 
@@ -40,28 +41,35 @@ class BuildCartRequest(BaseModel):
 @router.get("/", response_model=Dict[str, Any])
 def get_cart_endpoint(
     include_expired: bool = Query(default=False, description="Include stale/expired items"),
+    user_id: str = Depends(get_current_user),
 ) -> Dict[str, Any]:
     """
     Retrieve the current user's cart with itemised details and a grand total.
     Stale items (expired / out of stock) are always returned separately.
     
     Note: Restaurant filtering removed for security. Use restaurant_name in search instead.
+    User is automatically determined from authentication.
     """
-    return get_cart.invoke({
-        "include_expired": include_expired,
-    })
+    with user_context(user_id):
+        return get_cart.invoke({
+            "include_expired": include_expired,
+        })
 
 
 @router.post("/add", response_model=Dict[str, Any])
-def add_to_cart_endpoint(body: AddToCartRequest = Body(...)) -> Dict[str, Any]:
+def add_to_cart_endpoint(
+    body: AddToCartRequest = Body(...),
+    user_id: str = Depends(get_current_user),
+) -> Dict[str, Any]:
     """
     Add or increment a meal in the cart.
     Validates stock, expiry, and active status before writing.
     """
-    return add_to_cart.invoke({
-        "meal_id": body.meal_id,
-        "quantity": body.quantity,
-    })
+    with user_context(user_id):
+        return add_to_cart.invoke({
+            "meal_id": body.meal_id,
+            "quantity": body.quantity,
+        })
 
 
 @router.post("/build", response_model=Dict[str, Any])
@@ -76,11 +84,11 @@ async def build_cart_endpoint(
     Note: Restaurant must be specified by name, not ID, for security.
     User is automatically determined from authentication.
     """
-    return build_cart.invoke({
-        "budget": body.budget,
-        "restaurant_name": body.restaurant_name,
-        "user_id": user_id,
-        "target_meal_count": body.target_meal_count,
-        "max_qty_per_meal": body.max_qty_per_meal,
-        "preferred_meals": body.preferred_meals,
-    })
+    return await abuild_cart(
+        budget=body.budget,
+        restaurant_name=body.restaurant_name,
+        user_id=user_id,
+        target_meal_count=body.target_meal_count,
+        max_qty_per_meal=body.max_qty_per_meal,
+        preferred_meals=body.preferred_meals,
+    )
@@ -12,7 +12,7 @@ from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Depends, Query
 
-from src.tools.favorites import search_favorites
+from src.tools.favorites import asearch_favorites
 from src.utils.auth import get_current_user
 
 router = APIRouter()
@@ -27,22 +27,25 @@ async def search_favorites_endpoint(
     min_price: Optional[float] = Query(default=None),
     max_price: Optional[float] = Query(default=None),
     min_similarity: float = Query(default=0.55, ge=0.0, le=1.0),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
 ) -> Dict[str, Any]:
     """
     Search within the authenticated user's saved favorite meals.
 
     - With **query**: performs semantic search intersected with the user's favorites.
     - Without **query**: returns all favorites matching the given filters.
+    - **cursor**: pass the previous response's `next_cursor` to fetch the next page.
     
     Note: Restaurant IDs are not exposed for security. Results include restaurant_name.
     User is automatically determined from authentication.
     """
-    return search_favorites.invoke({
-        "user_id": user_id,
-        "query": query,
-        "limit": limit,
-        "category": category,
-        "min_price": min_price,
-        "max_price": max_price,
-        "min_similarity": min_similarity,
-    })
+    return await asearch_favorites(
+        user_id=user_id,
+        query=query,
+        limit=limit,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        min_similarity=min_similarity,
+        cursor=cursor,
+    )
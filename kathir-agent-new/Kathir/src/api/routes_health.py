@@ -12,7 +12,15 @@ from datetime import datetime, timezone
 
 from fastapi import APIRouter
 
+from src.api.routes_agent import agent_gate
+from src.intent_router import router_stats
 from src.utils.db_client import sb
+from src.utils.embedding_cache import query_cache
+from src.utils.embeddings import query_encoder
+from src.utils.history import history_stats
+from src.utils.restaurant_directory import restaurant_directory
+from src.utils.result_cache import search_cache
+from src.utils.tool_data import tool_steps
 
 router = APIRouter()
 
@@ -46,3 +54,19 @@ def readiness_check():
         "db": db_status,
         "timestamp": datetime.now(timezone.utc).isoformat(),
     }
+
+
+@router.get("/metrics")
+def metrics():
+    """In-process cache, batching, agent admission and routing counters."""
+    return {
+        "embedding_cache": query_cache.stats(),
+        "embedding_batches": query_encoder.stats(),
+        "restaurant_directory": restaurant_directory.stats(),
+        "search_cache": search_cache.stats(),
+        "agent_gate": agent_gate.stats(),
+        "agent_history": history_stats(),
+        "intent_router": router_stats(),
+        "agent_tool_steps": tool_steps.stats(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
@@ -29,6 +29,7 @@ def search_meals_endpoint(
     limit: int = Query(default=8, ge=1, le=50),
     min_similarity: float = Query(default=0.55, ge=0.0, le=1.0),
     sort: Literal["relevance", "price_asc"] = Query(default="relevance"),
+    cursor: Optional[str] = Query(default=None, description="next_cursor from the previous page"),
 ) -> Dict[str, Any]:
     """
     Search for meals using semantic similarity and/or structured filters.
@@ -38,6 +39,7 @@ def search_meals_endpoint(
     - **category**: Exact match — "Desserts", "Bakery", "Meat & Poultry", "Seafood", "Meals"
     - **exclude_allergens**: e.g. `["gluten"]` for gluten-free results
     - **sort**: `relevance` (default) or `price_asc`
+    - **cursor**: pass the previous response's `next_cursor` to fetch the next page
     
     Note: Restaurant IDs are not exposed for security reasons. Use restaurant_name instead.
     """
@@ -52,4 +54,5 @@ def search_meals_endpoint(
         "limit": limit,
         "min_similarity": min_similarity,
         "sort": sort,
+        "cursor": cursor,
     })
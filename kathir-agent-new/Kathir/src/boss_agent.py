@@ -16,27 +16,24 @@ import warnings
 from datetime import datetime
 
 from langchain_openai import ChatOpenAI
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.prebuilt import create_react_agent
 
 from src.prompts import BASE_SYSTEM_PROMPT
-from src.tools.budget import build_cart
-from src.tools.cart import add_to_cart, get_cart
-from src.tools.favorites import search_favorites
-from src.tools.meals import search_meals
+from src.utils.checkpointer import get_checkpointer
+from src.utils.history import HistoryState, trim_history
+from src.tools.agent_views import AGENT_TOOLS
 
 warnings.filterwarnings(
     "ignore",
     message="create_react_agent has been moved",
 )
 
-# All tools exposed to the agent
-AGENT_TOOLS = [search_meals, search_favorites, build_cart, add_to_cart, get_cart]
-
 
 def create_agent(model: str = "google/gemini-2.0-flash-001"):
     """
-    Instantiate the Boss agent with memory checkpointing.
+    Instantiate the Boss agent with persistent, bounded checkpointing
+    (SQLite — see utils/checkpointer.py) and a token-budgeted view of the
+    conversation on every model call (see utils/history.py).
 
     Args:
         model: OpenRouter model identifier.
@@ -57,7 +54,9 @@ def create_agent(model: str = "google/gemini-2.0-flash-001"):
         model=llm,
         tools=AGENT_TOOLS,
         prompt=BASE_SYSTEM_PROMPT,
-        checkpointer=MemorySaver(),
+        pre_model_hook=trim_history,
+        state_schema=HistoryState,
+        checkpointer=get_checkpointer(),
     )
 
 
@@ -0,0 +1,429 @@
+"""
+intent_router.py
+────────────────
+Fast path in front of the Boss agent for simple, self-contained requests.
+
+  classify(message)  — Route(tool, args, source) or None (→ full agent)
+  answer(agent, config, route, contextual_message, message)
+                     — run the tool, template the JSON reply, record the
+                       exchange in the agent's thread
+  router_stats()     — hit rate by intent and by source, for /metrics
+
+Routing is two-stage:
+  1. Rules — regexes for "what's in my cart", "my favourites …" and
+     "show / find / عايز <food> [under N]" with arguments pulled from the
+     text (query, price bounds, cheapest-first).
+  2. Embeddings — messages the rules did not claim are compared with a few
+     prototype phrasings per intent (encode_query, so vectors are cached).
+     Only a confident, clear-margin match over the "needs the agent"
+     prototypes is routed.
+
+Anything that refers back to the conversation ("add it", "the second one",
+"cheaper ones"), builds or edits a cart, or is long goes to the agent. So
+does anything a bare query would get wrong: negations, allergens and diets
+("without eggs", "no nuts", "gluten-free", "بدون"), a restaurant ("from …",
+"من …"), a quantity or headcount, and searches that name no food ("I need
+help") — searching "no nuts" semantically returns the meals with nuts.
+The routed exchange is written into the thread as a normal tool-call turn,
+so follow-ups handled by the agent see it.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, NamedTuple, Optional
+
+import numpy as np
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from src.tools.agent_views import compact
+from src.tools.cart import get_cart
+from src.tools.favorites import asearch_favorites
+from src.tools.meals import search_meals
+from src.utils.request_context import current_user_id
+
+INTENT_ROUTER_ENABLED = os.environ.get("INTENT_ROUTER_ENABLED", "1") == "1"
+INTENT_ROUTER_EMBEDDINGS = os.environ.get("INTENT_ROUTER_EMBEDDINGS", "1") == "1"
+INTENT_ROUTER_MIN_SIMILARITY = float(os.environ.get("INTENT_ROUTER_MIN_SIMILARITY", "0.78"))
+INTENT_ROUTER_MIN_MARGIN = float(os.environ.get("INTENT_ROUTER_MIN_MARGIN", "0.05"))
+
+_MAX_WORDS = 12
+
+
+class Route(NamedTuple):
+    tool: str               # "get_cart" | "search_meals" | "search_favorites"
+    args: Dict[str, Any]
+    source: str             # "rule" | "embedding"
+
+
+# ── Rules ─────────────────────────────────────────────────────────────────────
+
+# Follow-ups, cart edits and open questions: always the agent's job.
+_NEEDS_AGENT = re.compile(
+    r"\b(add|put|remove|delete|build|budget|plan|orders?|checkout|it|its|that|this|those|these|them|"
+    r"one|ones|more|another|other|again|previous|first|second|third|last|same|instead|also|"
+    r"cheaper|compare|recommend|suggest|why|how|which|should|healthy|healthier|calories)\b"
+    r"|\b(?:ده|دي|دول)\b"
+    r"|ضيف|اضف|أضف|ضيفه|شيل|ميزاني|كمان|تاني|ارخص|أرخص|انهي|أنهي|ليه|ازاي",
+    re.IGNORECASE,
+)
+_CART = re.compile(
+    r"^\s*(?:(?:what'?s|what\s+is|whats|show|view|see|check|open|display)\b.*\b)?"
+    r"(?:my|the)?\s*(?:cart|basket)\s*\??\s*$"
+    r"|(?:ايه|إيه|وريني|اعرض|عرض).*(?:السله|السلة|سلتي|العربه|العربة|الكارت)",
+    re.IGNORECASE,
+)
+_CART_EDIT = re.compile(r"\b(add|remove|delete|empty|clear|build|budget)\b|ضيف|اضف|أضف|شيل|فضي", re.IGNORECASE)
+_FAVORITES = re.compile(r"\bfavou?rites?\b|\bsaved\b|المفضل|مفضلاتي", re.IGNORECASE)
+_SEARCH_VERB = re.compile(
+    r"^\s*(?:please\s+)?(?:show(?:\s+me)?|find(?:\s+me)?|search(?:\s+for)?|look(?:ing)?\s+for|"
+    r"i\s+want|i'?d\s+like|i\s+need|give\s+me|get\s+me|any|list)\b"
+    r"|^\s*(?:عايز|عاوز|عايزه|اريد|أريد|ابحث\s+عن|دور\s+على|وريني|هات)",
+    re.IGNORECASE,
+)
+_MAX_PRICE = re.compile(
+    r"(?:under|below|less\s+than|max(?:imum)?|up\s+to|within|<=?|تحت|اقل\s+من|أقل\s+من|في\s+حدود)"
+    r"\s*(\d+(?:\.\d+)?)\s*(?:egp|le|l\.e\.?|pounds?|جنيه)?",
+    re.IGNORECASE,
+)
+_MIN_PRICE = re.compile(
+    r"(?:over|above|more\s+than|at\s+least|>=?|فوق|اكثر\s+من|أكثر\s+من)"
+    r"\s*(\d+(?:\.\d+)?)\s*(?:egp|le|l\.e\.?|pounds?|جنيه)?",
+    re.IGNORECASE,
+)
+_CHEAPEST = re.compile(r"\b(cheapest|lowest\s+price)\b|الأرخص|الارخص", re.IGNORECASE)
+# Checked once price bounds are removed: what a bare query cannot express.
+# Arabic allergen / diet words match as substrings so prefixed forms
+# ("بالمكسرات") count; short function words need boundaries.
+_AGENT_ONLY = re.compile(
+    r"\b(no|not|non|without|free|except|excluding|avoid|allerg\w*|intoleran\w*|"
+    r"gluten|dairy|lactose|milk|nuts?|peanuts?|eggs?|soy|sesame|shellfish|"
+    r"vegan|vegetarian|halal|keto|diet\w*|sugar|"
+    r"from|at|restaurants?|"
+    r"people|persons?|guests?|family|kids|pieces?|portions?|servings?|couple|dozen|"
+    r"two|three|four|five|six|seven|eight|nine|ten)\b"
+    r"|\d"
+    r"|\b(?:من|غير|مش|بلاش|اتنين|تلاته|تلاتة|اربعه|أربعة)\b"
+    r"|بدون|حساسي|جلوتين|لبن|ألبان|البان|مكسرات|سوداني|بيض|نباتي|دايت|سكر|مطعم|"
+    r"افراد|أفراد|اشخاص|أشخاص|نفر|قطع",
+    re.IGNORECASE,
+)
+# Food and meal words a routed search must contain (singular; Arabic without "ال").
+_FOOD_WORDS = frozenset("""
+    chicken beef meat lamb liver fish seafood shrimp tuna salmon calamari steak wing burger
+    sandwich shawarma kebab kofta falafel taameya koshary koshari foul ful hawawshi pizza
+    pasta noodle lasagna macaroni rice bread bakery pastry croissant feteer pie
+    cake dessert sweet chocolate ice cream cookie biscuit donut brownie kunafa konafa
+    basbousa baklava pudding crepe waffle pancake salad soup molokhia mahshi vegetable
+    potato fries fruit juice drink coffee tea smoothie cheese breakfast lunch dinner snack
+    grill grilled fried roast spicy sushi wrap taco hotdog sausage dumpling
+    فراخ دجاج فرخة لحمة لحم كبدة سمك جمبري تونة سلمون كاليماري استيك برجر ساندوتش
+    سندوتش شاورما كباب كفتة فلافل طعمية كشري فول حواوشي بيتزا مكرونة معكرونة رز أرز عيش
+    خبز مخبوزات فطير فطيرة كرواسون فطار غدا غداء عشا عشاء كيك كيكة حلويات حلو حلوى
+    شوكولاتة شيكولاتة ايس آيس كريم جيلاتي بسكويت دونات كنافة بسبوسة بقلاوة
+    كريب وافل بانكيك سلطة شوربة ملوخية محشي خضار بطاطس فاكهة عصير قهوة شاي جبنة
+    مشويات مشوي مقلي سبايسي سوشي راب سجق
+""".split())
+_FILLER = re.compile(
+    r"\b(please|the|a|an|me|my|some|any|food|foods|meal|meals|dish|dishes|options?|items?|"
+    r"something|stuff|for|with|price|egp|le|pounds?|today|now|saved|favou?rites?)\b"
+    r"|المفضله|المفضلة|مفضلاتي|اكل|أكل|وجبات|وجبه|وجبة|حاجه|حاجة|جنيه|لو\s+سمحت",
+    re.IGNORECASE,
+)
+
+
+def _is_arabic(text: str) -> bool:
+    return bool(re.search(r"[؀-ۿ]", text))
+
+
+def _search_args(text: str) -> Dict[str, Any]:
+    """Filters and leftover query text from a short search request."""
+    args: Dict[str, Any] = {}
+    rest = text
+    m = _MAX_PRICE.search(rest)
+    if m:
+        args["max_price"] = float(m.group(1))
+        rest = rest.replace(m.group(0), " ")
+    m = _MIN_PRICE.search(rest)
+    if m:
+        args["min_price"] = float(m.group(1))
+        rest = rest.replace(m.group(0), " ")
+    if _CHEAPEST.search(rest):
+        args["sort"] = "price_asc"
+        rest = _CHEAPEST.sub(" ", rest)
+    rest = _SEARCH_VERB.sub(" ", rest)
+    rest = _FILLER.sub(" ", rest)
+    query = " ".join(re.sub(r"[^\w\s'-]", " ", rest).split())
+    if query:
+        args["query"] = query
+    return args
+
+
+def _agent_only(text: str) -> bool:
+    """Negation, allergen / diet, restaurant, quantity or headcount: the agent's job."""
+    rest = _MIN_PRICE.sub(" ", _MAX_PRICE.sub(" ", text))
+    return bool(_AGENT_ONLY.search(rest))
+
+
+def _food_word(word: str) -> bool:
+    if word.startswith("ال") and len(word) > 3:
+        word = word[2:]
+    if word in _FOOD_WORDS:
+        return True
+    if word.endswith("ies"):
+        return word[:-3] + "y" in _FOOD_WORDS
+    return word.endswith("s") and (word[:-1] in _FOOD_WORDS or word[:-2] in _FOOD_WORDS)
+
+
+def _names_food(query: Optional[str]) -> bool:
+    """Whether a search query names a food or meal (otherwise it is not a menu search)."""
+    return any(_food_word(w) for w in (query or "").lower().split())
+
+
+def _favorites_args(text: str) -> Dict[str, Any]:
+    # search_favorites filters by text and price only
+    return {k: v for k, v in _search_args(text).items() if k in ("query", "min_price", "max_price")}
+
+
+def _rule_route(text: str) -> Optional[Route]:
+    if _CART.search(text) and not _CART_EDIT.search(text):
+        return Route("get_cart", {}, "rule")
+    if _NEEDS_AGENT.search(text) or _agent_only(text):
+        return None
+    if _FAVORITES.search(text):
+        args = _favorites_args(text)
+        if not args.get("query") or _names_food(args["query"]):
+            return Route("search_favorites", args, "rule")
+        return None
+    if _SEARCH_VERB.search(text):
+        args = _search_args(text)
+        if _names_food(args.get("query")):
+            return Route("search_meals", args, "rule")
+    return None
+
+
+# ── Embedding classifier ──────────────────────────────────────────────────────
+
+_PROTOTYPES: Dict[str, List[str]] = {
+    "get_cart": [
+        "what's in my cart", "show my cart", "my basket", "cart contents",
+        "ايه اللي في السلة", "وريني السلة",
+    ],
+    "search_favorites": [
+        "show my favorites", "my saved meals", "favorite desserts", "meals i liked",
+        "المفضلة بتاعتي", "وجباتي المفضلة",
+    ],
+    "search_meals": [
+        "chicken dishes", "desserts under 50", "pizza", "something sweet", "koshary near me",
+        "grilled fish", "عايز فراخ", "حلويات", "بيتزا رخيصة",
+    ],
+    "agent": [
+        "add the second one to my cart", "build a cart for 500 egp", "which one is healthier",
+        "hi", "thanks", "what do you recommend for dinner", "remove that from my cart",
+        "how does this app work", "plan meals for my family", "ضيف ده للسلة", "اعمل سلة ب ٥٠٠ جنيه",
+        "شكرا",
+    ],
+}
+
+
+class _PrototypeClassifier:
+    """Nearest-prototype intent classifier over encode_query vectors."""
+
+    def __init__(self):
+        self._labels: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> None:
+        from src.utils.embeddings import encode_query  # loads the model on first use
+
+        labels, vecs = [], []
+        for label, phrases in _PROTOTYPES.items():
+            for phrase in phrases:
+                labels.append(label)
+                vecs.append(encode_query(phrase))
+        self._labels = labels
+        self._matrix = np.asarray(vecs, dtype=np.float32)
+
+    def classify(self, text: str) -> Optional[str]:
+        from src.utils.embeddings import encode_query
+
+        with self._lock:
+            if self._matrix is None:
+                self._load()
+        sims = self._matrix @ np.asarray(encode_query(text), dtype=np.float32)
+        best: Dict[str, float] = {}
+        for label, sim in zip(self._labels, sims):
+            best[label] = max(best.get(label, -1.0), float(sim))
+        label = max(best, key=best.get)
+        if label == "agent" or best[label] < INTENT_ROUTER_MIN_SIMILARITY:
+            return None
+        if best[label] - best["agent"] < INTENT_ROUTER_MIN_MARGIN:
+            return None
+        return label
+
+
+_classifier = _PrototypeClassifier()
+
+
+def _embedding_route(text: str) -> Optional[Route]:
+    label = _classifier.classify(text)
+    if label is None:
+        return None
+    if label == "get_cart":
+        return Route(label, {}, "embedding")
+    if label == "search_favorites":
+        args = _favorites_args(text)
+    else:
+        args = _search_args(text)
+        if not args.get("query"):
+            return None
+    if args.get("query") and not _names_food(args["query"]):
+        return None
+    return Route(label, args, "embedding")
+
+
+# ── Stats ─────────────────────────────────────────────────────────────────────
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.fallthrough = 0
+        self.by_tool: Dict[str, int] = {}
+        self.by_source: Dict[str, int] = {}
+        self.errors = 0
+        self._fast_seconds = 0.0
+
+    def record(self, route: Optional[Route]) -> None:
+        with self._lock:
+            self.requests += 1
+            if route is None:
+                self.fallthrough += 1
+                return
+            self.by_tool[route.tool] = self.by_tool.get(route.tool, 0) + 1
+            self.by_source[route.source] = self.by_source.get(route.source, 0) + 1
+
+    def record_answer(self, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._fast_seconds += seconds
+            if not ok:
+                self.errors += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            routed = self.requests - self.fallthrough
+            return {
+                "enabled": INTENT_ROUTER_ENABLED,
+                "requests": self.requests,
+                "routed": routed,
+                "hit_rate": round(routed / self.requests, 3) if self.requests else 0.0,
+                "by_tool": dict(self.by_tool),
+                "by_source": dict(self.by_source),
+                "tool_errors": self.errors,
+                "avg_fast_path_ms": round(self._fast_seconds / routed * 1000, 1) if routed else 0.0,
+            }
+
+
+_stats = _Stats()
+
+
+def router_stats() -> Dict[str, Any]:
+    return _stats.stats()
+
+
+# ── Public API ────────────────────────────────────────────────────────────────
+
+def classify(message: str) -> Optional[Route]:
+    """Route a raw user message, or None when the agent should handle it."""
+    text = " ".join((message or "").split())
+    if not INTENT_ROUTER_ENABLED or not text or len(text.split()) > _MAX_WORDS:
+        return None
+    route = _rule_route(text)
+    if route is None and INTENT_ROUTER_EMBEDDINGS and not _NEEDS_AGENT.search(text) and not _agent_only(text):
+        try:
+            route = _embedding_route(text)
+        except Exception as exc:
+            print(f"Intent classifier unavailable: {exc}")
+    return route
+
+
+async def aclassify(message: str) -> Optional[Route]:
+    """classify() off the event loop (the embedding stage runs the model); counts the outcome."""
+    route = await asyncio.to_thread(classify, message)
+    _stats.record(route)
+    return route
+
+
+def _reply_message(route: Route, data: Dict[str, Any], arabic: bool) -> str:
+    if not data.get("ok"):
+        return data.get("error") or ("حصلت مشكلة، جرب تاني." if arabic else "Something went wrong, please try again.")
+    if route.tool == "get_cart":
+        count = data.get("count", 0)
+        if not count:
+            return "السلة فاضية. 🛒" if arabic else "Your cart is empty. 🛒"
+        total = data.get("total", 0)
+        return (f"في السلة {count} صنف، الإجمالي {total} جنيه." if arabic
+                else f"You have {count} item(s) in your cart, {total} EGP in total.")
+    count = len(data.get("results") or [])
+    what = "favourite meals" if route.tool == "search_favorites" else "meals"
+    if not count:
+        return "مالقيتش حاجة مطابقة." if arabic else f"I couldn't find any matching {what}."
+    return f"لقيت {count} اختيار." if arabic else f"Here are {count} {what} I found."
+
+
+async def _run_tool(route: Route) -> Dict[str, Any]:
+    if route.tool == "get_cart":
+        return await asyncio.to_thread(get_cart.invoke, {})
+    if route.tool == "search_favorites":
+        return await asearch_favorites(user_id=current_user_id(), **route.args)
+    return await asyncio.to_thread(search_meals.invoke, route.args)
+
+
+async def answer(agent: Any, config: Dict[str, Any], route: Route, contextual_message: str, message: str) -> Dict[str, Any]:
+    """
+    Answer a routed request without the LLM. Returns
+    {"response": <JSON string in the agent's format>, "data", "message_count"}.
+    """
+    started = time.perf_counter()
+    data = await _run_tool(route)
+    if not isinstance(data, dict):
+        data = {"ok": False, "error": str(data)}
+    _stats.record_answer(time.perf_counter() - started, bool(data.get("ok")))
+
+    reply = {
+        "message": _reply_message(route, data, _is_arabic(message)),
+        "data": data,
+        "action": "cart" if route.tool == "get_cart" else "search",
+    }
+    response = json.dumps(reply, ensure_ascii=False, default=str)
+    # In the thread the reply looks like the agent's own: message + action only.
+    recorded = json.dumps({"message": reply["message"], "action": reply["action"]}, ensure_ascii=False)
+
+    # Record the turn exactly as the agent would have produced it.
+    call_id = f"route_{uuid.uuid4().hex[:12]}"
+    await agent.aupdate_state(
+        config,
+        {"messages": [
+            HumanMessage(content=contextual_message),
+            AIMessage(content="", tool_calls=[{"name": route.tool, "args": route.args, "id": call_id}]),
+            ToolMessage(
+                content=compact(route.tool, data, config["configurable"]["thread_id"]),
+                artifact=data,
+                tool_call_id=call_id,
+                name=route.tool,
+            ),
+            AIMessage(content=recorded),
+        ]},
+        as_node="agent",
+    )
+    state = await agent.aget_state(config)
+    return {
+        "response": response,
+        "data": data,
+        "message_count": len(state.values.get("messages", [])),
+    }
@@ -0,0 +1,286 @@
+"""
+tools/agent_views.py
+────────────────────
+Agent-facing versions of the tools with a compact view of their output.
+
+  AGENT_TOOLS       — what create_agent() binds: same names, arguments and
+                      descriptions as the API tools
+  compact(tool, data, thread_id) — the LLM-facing projection of a tool result
+  resolve_meal(thread_id, ref)   — short handle (or full id) → meal id
+
+Every tool call returns (content, artifact): the model reads the compact
+content, while the full-fidelity result rides along as the ToolMessage
+artifact, which is what the API response attaches (utils/tool_data.py).
+
+Each tool also has a coroutine, so under ainvoke the tool calls of one
+model step run concurrently — at most AGENT_TOOL_CONCURRENCY at a time —
+using the async Supabase client where the tool has an async variant and a
+worker thread otherwise.
+
+The compact view uses short keys (legend in the system prompt), cuts
+descriptions, drops URLs, scores, statuses and echoed arguments, and
+replaces meal UUIDs with 6-character handles — the leading hex of the id.
+Handles shown in a thread are remembered for it so add_to_cart can turn
+them back into ids; unknown handles fall back to a prefix lookup in the
+in-process meal catalog.
+"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from langchain_core.callbacks import Callbacks, adispatch_custom_event
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
+
+from src.tools.budget import abuild_cart, build_cart
+from src.tools.cart import add_to_cart, get_cart
+from src.tools.favorites import asearch_favorites, search_favorites
+from src.tools.meals import search_meals
+from src.utils.meal_catalog import get_lexical_index
+from src.utils.tool_data import TOOL_SLOT_ACQUIRED
+
+# Concurrent tool calls per worker (several calls in one model step run together)
+AGENT_TOOL_CONCURRENCY = int(os.environ.get("AGENT_TOOL_CONCURRENCY", "4"))
+
+_HANDLE_LEN = 6
+_DESC_CHARS = 80
+_MAX_THREADS = 2048
+_UUID_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.IGNORECASE)
+
+
+# ── Handles ───────────────────────────────────────────────────────────────────
+
+class _HandleRegistry:
+    """Per-thread handle → meal id maps (LRU over threads)."""
+
+    def __init__(self, max_threads: int = _MAX_THREADS):
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, Dict[str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def remember(self, thread_id: str, meal_id: str) -> str:
+        handle = meal_id.replace("-", "")[:_HANDLE_LEN].lower()
+        with self._lock:
+            handles = self._threads.setdefault(thread_id, {})
+            self._threads.move_to_end(thread_id)
+            if handles.get(handle, meal_id) != meal_id:
+                handle = meal_id.replace("-", "").lower()  # prefix clash: show the full hex
+            handles[handle] = meal_id
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+        return handle
+
+    def lookup(self, thread_id: str, handle: str) -> Optional[str]:
+        with self._lock:
+            return self._threads.get(thread_id, {}).get(handle)
+
+
+_registry = _HandleRegistry()
+_tool_slots = asyncio.Semaphore(AGENT_TOOL_CONCURRENCY)
+
+
+def resolve_meal(thread_id: str, ref: str) -> Optional[str]:
+    """A handle from this thread's results, a full meal id, or None if unknown / ambiguous."""
+    ref = (ref or "").strip().lower()
+    if _UUID_RE.match(ref):
+        return ref
+    meal_id = _registry.lookup(thread_id, ref)
+    if meal_id is not None:
+        return meal_id
+    index = get_lexical_index()
+    if index is None or len(ref) < _HANDLE_LEN:
+        return None
+    matches = [i for i in index.ids() if i.replace("-", "").lower().startswith(ref)]
+    return matches[0] if len(matches) == 1 else None
+
+
+# ── Projections ───────────────────────────────────────────────────────────────
+
+def _short(text: Optional[str], limit: int = _DESC_CHARS) -> str:
+    text = " ".join((text or "").split())
+    return text if len(text) <= limit else text[: limit - 1] + "…"
+
+
+def _expiry(value: Optional[str]) -> Optional[str]:
+    # "2026-10-17T21:30:00+00:00" → "10-17 21:30"
+    return f"{value[5:10]} {value[11:16]}" if value and len(value) >= 16 else value
+
+
+def _drop_empty(d: Dict[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in d.items() if v not in (None, "", [], {})}
+
+
+def _meal(row: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+    return _drop_empty({
+        "h": _registry.remember(thread_id, row.get("id") or row["meal_id"]),
+        "t": row.get("title"),
+        "p": row.get("price", row.get("unit_price")),
+        "r": row.get("restaurant_name"),
+        "c": row.get("category"),
+        "d": _short(row.get("description")),
+        "x": row.get("allergens"),
+        "q": row.get("quantity_available"),
+        "exp": _expiry(row.get("expiry_date")),
+    })
+
+
+def _line(item: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+    return _drop_empty({
+        "h": _registry.remember(thread_id, item["meal_id"]),
+        "t": item.get("title"),
+        "q": item.get("quantity"),
+        "p": item.get("unit_price"),
+        "sub": item.get("subtotal"),
+        "warn": item.get("warning") or item.get("stale_reason"),
+    })
+
+
+def _error(data: Dict[str, Any]) -> Dict[str, Any]:
+    return {"ok": False, "err": data.get("error") or data.get("message") or "failed"}
+
+
+def _compact_search(data: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+    meals = [_meal(r, thread_id) for r in data.get("results") or []]
+    return _drop_empty({"ok": True, "n": len(meals), "meals": meals, "next": data.get("next_cursor")})
+
+
+def _compact_cart(data: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+    return _drop_empty({
+        "ok": True,
+        "n": data.get("count", 0),
+        "qty": data.get("total_quantity"),
+        "total": data.get("total", 0.0),
+        "items": [_line(i, thread_id) for i in data.get("items") or []],
+        "stale": [_line(i, thread_id) for i in data.get("stale_items") or []],
+    })
+
+
+def _compact_build(data: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+    return _drop_empty({
+        "ok": True,
+        "r": data.get("restaurant_name"),
+        "budget": data.get("budget"),
+        "total": data.get("total"),
+        "left": data.get("remaining_budget"),
+        "items": [_line(i, thread_id) for i in data.get("items") or []],
+    })
+
+
+def _compact_add(data: Dict[str, Any], thread_id: str) -> Dict[str, Any]:
+    return _drop_empty({
+        "ok": True,
+        "h": _registry.remember(thread_id, data["meal_id"]),
+        "t": data.get("title"),
+        "added": data.get("added_quantity"),
+        "q": data.get("new_quantity"),
+        "sub": data.get("total_price"),
+    })
+
+
+_PROJECTIONS: Dict[str, Callable[[Dict[str, Any], str], Dict[str, Any]]] = {
+    "search_meals": _compact_search,
+    "search_favorites": _compact_search,
+    "get_cart": _compact_cart,
+    "build_cart": _compact_build,
+    "add_to_cart": _compact_add,
+}
+
+
+def compact(tool_name: str, data: Any, thread_id: str) -> str:
+    """The LLM-facing JSON for one tool result."""
+    if not isinstance(data, dict):
+        view: Any = data
+    elif not data.get("ok", data.get("success", False)):
+        view = _error(data)
+    else:
+        project = _PROJECTIONS.get(tool_name)
+        view = project(data, thread_id) if project else data
+    return json.dumps(view, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+# ── Agent tools ───────────────────────────────────────────────────────────────
+
+def _thread_id(config: RunnableConfig) -> str:
+    return str((config.get("configurable") or {}).get("thread_id") or "")
+
+
+def _resolve_args(tool_name: str, args: Dict[str, Any], thread_id: str) -> Optional[Dict[str, Any]]:
+    """Turn meal handles in the model's arguments back into ids (None: unknown meal)."""
+    if tool_name == "add_to_cart":
+        meal_id = resolve_meal(thread_id, args.get("meal_id") or "")
+        if meal_id is None:
+            return None
+        args["meal_id"] = meal_id
+    if tool_name == "build_cart" and args.get("preferred_meals"):
+        resolved = (resolve_meal(thread_id, m) for m in args["preferred_meals"])
+        args["preferred_meals"] = [m for m in resolved if m]
+    return args
+
+
+_HANDLE_NOTE = {
+    "add_to_cart": "\n\nmeal_id: the meal's handle (\"h\") from a search, cart or build result.",
+    "build_cart": "\n\npreferred_meals: meal handles (\"h\") from earlier results.",
+}
+
+
+def _unknown_meal(kwargs: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "error": f"Unknown meal '{kwargs.get('meal_id')}' — use the handle \"h\" from the latest results",
+    }
+
+
+def _agent_view(base: BaseTool, native_async: Optional[Callable[..., Awaitable[Dict[str, Any]]]] = None) -> StructuredTool:
+    """
+    Wrap an API tool for the agent. The underlying function is called
+    directly (not base.invoke) so callbacks see one tool run, not two.
+    """
+
+    def run(config: RunnableConfig, **kwargs: Any):
+        thread_id = _thread_id(config)
+        args = _resolve_args(base.name, kwargs, thread_id)
+        data = _unknown_meal(kwargs) if args is None else base.func(**args)
+        return compact(base.name, data, thread_id), data
+
+    async def arun(config: RunnableConfig, callbacks: Callbacks = None, **kwargs: Any):
+        # Tool calls from one model step run concurrently (ToolNode gathers
+        # them, results keep call order); the semaphore bounds how many hit
+        # Supabase at once per worker.
+        thread_id = _thread_id(config)
+        args = _resolve_args(base.name, kwargs, thread_id)
+        if args is None:
+            data = _unknown_meal(kwargs)
+        else:
+            async with _tool_slots:
+                # Lets timing callbacks start the clock here, after any wait for a
+                # slot. `callbacks` is this tool run's child manager, so the event
+                # is reported with the tool's own run id.
+                await adispatch_custom_event(TOOL_SLOT_ACQUIRED, {}, config={**config, "callbacks": callbacks})
+                if native_async is not None:
+                    data = await native_async(**args)
+                else:
+                    data = await asyncio.to_thread(base.func, **args)
+        return compact(base.name, data, thread_id), data
+
+    return StructuredTool.from_function(
+        func=run,
+        coroutine=arun,
+        name=base.name,
+        description=base.description + _HANDLE_NOTE.get(base.name, ""),
+        args_schema=base.args_schema,
+        response_format="content_and_artifact",
+    )
+
+
+AGENT_TOOLS: List[BaseTool] = [
+    _agent_view(search_meals),
+    _agent_view(search_favorites, asearch_favorites),
+    _agent_view(build_cart, abuild_cart),
+    _agent_view(add_to_cart),
+    _agent_view(get_cart),
+]
@@ -4,11 +4,14 @@ tools/budget.py
 LangChain tool: build_cart
 
 Builds a randomized suggested cart that fits within a given budget.
-  • Requires a restaurant (by ID or partial name)
+  • Requires a restaurant (partial or misspelled name)
   • Fetches the user's favorites from DB and gives them 3× selection weight
   • Phase 1 — variety: pick ≥1 of each unique meal until unique_target is reached
   • Phase 2 — fill: top up remaining budget aggressively
   • Never exceeds budget; never exceeds per-meal stock
+
+`build_cart` (the tool) and `abuild_cart` (async routes) share one
+query_runner generator, so the logic lives in a single place.
 """
 
 import random
@@ -16,7 +19,8 @@ from typing import Any, Dict, List, Optional
 
 from langchain.tools import tool
 
-from src.utils.db_client import sb
+from src.utils.query_runner import Steps, offload, run_async, run_sync
+from src.utils.restaurant_directory import restaurant_directory
 from src.utils.time_utils import now_iso
 
 
@@ -46,6 +50,41 @@ def build_cart(
     Returns:
         Dict with ok, budget, total, remainder, cart_items, breakdown, and a message.
     """
+    return run_sync(
+        _build_cart,
+        budget=budget, restaurant_name=restaurant_name, user_id=user_id,
+        target_meal_count=target_meal_count, max_qty_per_meal=max_qty_per_meal,
+        preferred_meals=preferred_meals,
+    )
+
+
+async def abuild_cart(
+    budget: float,
+    restaurant_name: str,
+    user_id: Optional[str] = None,
+    target_meal_count: int = 5,
+    max_qty_per_meal: int = 5,
+    preferred_meals: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """build_cart on the async client, for `async def` routes."""
+    return await run_async(
+        _build_cart,
+        budget=budget, restaurant_name=restaurant_name, user_id=user_id,
+        target_meal_count=target_meal_count, max_qty_per_meal=max_qty_per_meal,
+        preferred_meals=preferred_meals,
+    )
+
+
+def _build_cart(
+    db: Any,
+    budget: float,
+    restaurant_name: str,
+    user_id: Optional[str] = None,
+    target_meal_count: int = 5,
+    max_qty_per_meal: int = 5,
+    preferred_meals: Optional[List[str]] = None,
+) -> Steps[Dict[str, Any]]:
+    """Shared build_cart logic — driven by query_runner.run_sync / run_async."""
     if budget <= 0:
         return {"ok": False, "error": "Budget must be > 0"}
 
@@ -54,34 +93,25 @@ def build_cart(
     rest_name: Optional[str] = None
 
     if restaurant_name:
-        data = (
-            sb.table("restaurants")
-              .select("profile_id, restaurant_name")
-              .ilike("restaurant_name", f"%{restaurant_name}%")
-              .limit(1)
-              .execute()
-              .data or []
-        )
+        data = yield offload(restaurant_directory.resolve, restaurant_name, limit=1)
         if not data:
             return {"ok": False, "error": f"No restaurant matching '{restaurant_name}'"}
-        rids = [data[0]["profile_id"]]
-        rest_name = data[0]["restaurant_name"]
+        rids = [data[0][0]]
+        rest_name = data[0][1]
 
     if not rids:
         return {"ok": False, "error": "A restaurant name is required"}
 
     # ── Fetch available meals ─────────────────────────────────────────────────
-    raw_meals = (
-        sb.table("meals")
+    raw_meals = (yield (
+        db.table("meals")
           .select("id, title, discounted_price, quantity_available")
           .eq("status", "active")
           .gt("quantity_available", 0)
           .gt("expiry_date", now_iso())
           .in_("restaurant_id", rids)
           .order("discounted_price")
-          .execute()
-          .data or []
-    )
+    )).data or []
 
     if not raw_meals:
         return {"ok": False, "error": "No available meals at this restaurant"}
@@ -104,13 +134,11 @@ def build_cart(
     # ── Fetch user favorites ──────────────────────────────────────────────────
     preferred_set: set[str] = set(preferred_meals or [])
     if user_id:
-        fav_rows = (
-            sb.table("favorites")
+        fav_rows = (yield (
+            db.table("favorites")
               .select("meal_id")
               .eq("user_id", user_id)
-              .execute()
-              .data or []
-        )
+        )).data or []
         preferred_set.update(f["meal_id"] for f in fav_rows)
 
     # ── Weighted random ordering (favorites appear 3×) ────────────────────────
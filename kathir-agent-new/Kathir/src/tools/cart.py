@@ -6,7 +6,8 @@ LangChain tools: add_to_cart, get_cart
 add_to_cart — validates and upserts a single meal into the user's cart.
 get_cart    — returns a full, annotated view of the user's current cart.
 
-Uses Supabase authentication to get the current user automatically.
+The current user comes from the request context that the route / agent
+populated with the already-verified user id — no auth call per tool call.
 """
 
 from datetime import datetime, timezone
@@ -15,18 +16,19 @@ from typing import Any, Dict, Optional
 from langchain_core.tools import tool
 
 from src.utils.db_client import sb
+from src.utils.restaurant_directory import restaurant_directory
 from src.utils.time_utils import now_iso
-from src.utils.auth import get_current_user_sync
+from src.utils.request_context import current_user_id
 
 
 def get_current_user_id() -> str:
     """
-    Get the current authenticated user's ID.
+    Get the current authenticated user's ID from the request context.
     
     Returns:
         User UUID string
     """
-    return get_current_user_sync()
+    return current_user_id()
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -208,22 +210,7 @@ def get_cart(
         m["id"]: m for m in (meal_q.execute().data or [])
     }
 
-    # ── 3. Batch-fetch restaurant names ──────────────────────────────────────
-    rest_ids = list({
-        m["restaurant_id"] for m in meal_map.values() if m.get("restaurant_id")
-    })
-    rest_map: Dict[str, str] = {}
-    if rest_ids:
-        rest_rows = (
-            sb.table("restaurants")
-              .select("profile_id, restaurant_name")
-              .in_("profile_id", rest_ids)
-              .execute()
-              .data or []
-        )
-        rest_map = {r["profile_id"]: r["restaurant_name"] for r in rest_rows}
-
-    # ── 4. Build line items ───────────────────────────────────────────────────
+    # ── 3. Build line items (restaurant names from the in-process directory) ──
     now_utc = datetime.now(timezone.utc)
     items: list[Dict[str, Any]] = []
     stale_items: list[Dict[str, Any]] = []
@@ -254,7 +241,7 @@ def get_cart(
             "meal_id": meal_id,
             "title": meal["title"],
             "category": meal.get("category"),
-            "restaurant_name": rest_map.get(meal.get("restaurant_id", ""), "Unknown"),
+            "restaurant_name": restaurant_directory.name_for(meal.get("restaurant_id")) or "Unknown",
             "unit_price": price,
             "quantity": qty,
             "subtotal": round(price * qty, 2),
@@ -278,7 +265,7 @@ def get_cart(
         else:
             items.append(line)
 
-    # ── 5. Summary ────────────────────────────────────────────────────────────
+    # ── 4. Summary ────────────────────────────────────────────────────────────
     active_items = [i for i in items if "stale_reason" not in i]
     grand_total = round(
         sum(i["subtotal"] for i in (items if include_expired else active_items)), 2
@@ -6,14 +6,23 @@ LangChain tool: search_favorites
 Searches inside a user's saved/favourite meals.
   • No query  → direct DB filter on the favorites set
   • With query → semantic embedding search, intersected with favorites
+
+Both modes page with opaque keyset cursors (see utils/cursors.py).
+
+The logic is written once as a query_runner generator: `search_favorites`
+(the tool) runs it on the sync client, `asearch_favorites` on the async one.
 """
 
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from langchain.tools import tool
 
-from src.utils.db_client import sb
+from src.utils.cursors import SEARCH_RANK_DEPTH, decode_cursor, page_after, price_keyset, price_page
 from src.utils.embeddings import encode_query
+from src.utils.filters import catalog_filter
+from src.utils.formatters import restaurant_name_for
+from src.utils.meal_catalog import get_meal_index
+from src.utils.query_runner import Steps, offload, run_async, run_sync
 from src.utils.time_utils import now_iso
 
 
@@ -26,6 +35,7 @@ def search_favorites(
     min_price: Optional[float] = None,
     max_price: Optional[float] = None,
     min_similarity: float = 0.55,
+    cursor: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Search inside the user's favourite meals.
@@ -42,23 +52,64 @@ def search_favorites(
         min_price     : Lower price bound in EGP.
         max_price     : Upper price bound in EGP.
         min_similarity: Cosine similarity threshold for semantic search (default 0.55).
+        cursor        : next_cursor from the previous page (omit for the first page).
         
     Note: Restaurant IDs are not exposed for security. Results include restaurant_name.
     """
+    return run_sync(
+        _search_favorites,
+        user_id=user_id, query=query, limit=limit, category=category,
+        min_price=min_price, max_price=max_price, min_similarity=min_similarity, cursor=cursor,
+    )
+
+
+async def asearch_favorites(
+    user_id: str,
+    query: str = "",
+    limit: int = 8,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_similarity: float = 0.55,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """search_favorites on the async client, for `async def` routes."""
+    return await run_async(
+        _search_favorites,
+        user_id=user_id, query=query, limit=limit, category=category,
+        min_price=min_price, max_price=max_price, min_similarity=min_similarity, cursor=cursor,
+    )
+
+
+def _search_favorites(
+    db: Any,
+    user_id: str,
+    query: str = "",
+    limit: int = 8,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_similarity: float = 0.55,
+    cursor: Optional[str] = None,
+) -> Steps[Dict[str, Any]]:
+    """Shared search_favorites logic — driven by query_runner.run_sync / run_async."""
     if not user_id:
         return {"ok": False, "error": "user_id is required"}
 
     limit = max(1, min(int(limit), 50))
+    qtext = (query or "").strip()
+    try:
+        after = decode_cursor(cursor, "score" if qtext else "price") if cursor else None
+    except ValueError as exc:
+        return {"ok": False, "error": f"Invalid cursor: {exc}", "results": []}
 
     # ── 1. Fetch the user's favorite meal IDs ─────────────────────────────────
-    fav_rows = (
-        sb.table("favorites")
+    fav_rows = (yield (
+        db.table("favorites")
           .select("meal_id")
           .eq("user_id", user_id)
           .limit(5000)
-          .execute()
-          .data or []
-    )
+    )).data or []
     fav_ids = [r["meal_id"] for r in fav_rows if r.get("meal_id")]
 
     if not fav_ids:
@@ -66,8 +117,8 @@ def search_favorites(
 
     # ── 2. Base query with common filters ─────────────────────────────────────
     base_q = (
-        sb.table("meals")
-          .select("id, title, description, category, discounted_price, restaurant_id, restaurants(restaurant_name)")
+        db.table("meals")
+          .select("id, title, description, category, discounted_price, restaurant_id")
           .in_("id", fav_ids)
           .eq("status", "active")
           .gt("quantity_available", 0)
@@ -83,75 +134,86 @@ def search_favorites(
 
     def _clean(row: Dict[str, Any], score: Optional[float] = None) -> Dict[str, Any]:
         desc = (row.get("description") or "").strip()
-        # Get restaurant name from nested object or fallback
-        restaurant_name = "Unknown Restaurant"
-        if isinstance(row.get("restaurants"), dict):
-            restaurant_name = row["restaurants"].get("restaurant_name", "Unknown Restaurant")
-        elif row.get("restaurant_name"):
-            restaurant_name = row["restaurant_name"]
-            
         return {
             "meal_id": row["id"],
             "title": row["title"],
             "description": desc[:140] if desc else "",
             "category": row.get("category"),
             "price": float(row["discounted_price"]),
-            "restaurant_name": restaurant_name,
+            "restaurant_name": restaurant_name_for(row),
             "score": score,
         }
 
-    qtext = (query or "").strip()
+    def _clean_rows(pairs: List[Tuple[Dict[str, Any], Optional[float]]]) -> List[Dict[str, Any]]:
+        # Restaurant names come from the in-process directory, whose first
+        # load is a blocking Supabase read — so this always runs via offload.
+        return [_clean(row, score) for row, score in pairs]
 
-    # ── 3A. No query → simple filtered list ──────────────────────────────────
+    # ── 3A. No query → simple filtered list, keyset-paged on (price, id) ────
     if not qtext:
-        rows = base_q.order("discounted_price").limit(limit).execute().data or []
-        results = [_clean(r) for r in rows]
+        rows = (yield price_keyset(base_q, after).limit(limit + 1)).data or []
+        rows, next_cursor = price_page(rows, limit)
+        results = yield offload(_clean_rows, [(r, None) for r in rows])
         return {
             "ok": True,
             "count": len(results),
             "results": results,
+            "next_cursor": next_cursor,
             "message": f"Found {len(results)} favorite meals.",
         }
 
     # ── 3B. Semantic search → intersect with favorites ────────────────────────
-    query_emb = encode_query(qtext)
-    vec_rows = (
-        sb.rpc("match_meals", {
+    # The ranking is read to a fixed depth on every page, so the (score, id)
+    # cursor is stable and deep pages cost the same as the first. Filters are
+    # applied to the whole ranking before it is paged, so a page is only
+    # short when the ranking runs out.
+    query_emb = yield offload(encode_query, qtext)
+    fav_set = set(fav_ids)
+    index = get_meal_index()
+    hydrated: Dict[str, Dict[str, Any]] = {}
+    if index is not None:
+        keep = catalog_filter([], min_price, max_price, category)
+        matches = index.search(
+            query_emb, SEARCH_RANK_DEPTH, float(min_similarity),
+            lambda meta: meta["id"] in fav_set and keep(meta),
+        )
+    else:
+        vec_rows = (yield db.rpc("match_meals", {
             "query_embedding": query_emb,
             "match_threshold": float(min_similarity),
-            "match_count": limit * 10,
-        })
-        .execute()
-        .data or []
-    )
-
-    fav_set = set(fav_ids)
-    intersect_ids = [r["id"] for r in vec_rows if r.get("id") in fav_set]
-
-    if not intersect_ids:
+            "match_count": SEARCH_RANK_DEPTH,
+        })).data or []
+        matches = [
+            (r["id"], float(r.get("similarity", r.get("score", 0))))
+            for r in vec_rows
+            if r.get("id") in fav_set
+        ]
+        # match_meals knows no filters: hydrate every candidate through base_q.
+        if matches:
+            rows = (yield base_q.in_("id", [mid for mid, _ in matches])).data or []
+            hydrated = {r["id"]: r for r in rows}
+            matches = [(mid, score) for mid, score in matches if mid in hydrated]
+
+    if not matches:
         return {
             "ok": True,
             "count": 0,
             "results": [],
+            "next_cursor": None,
             "message": f"No favorites matched '{qtext}'.",
         }
 
-    score_map = {
-        r["id"]: float(r.get("similarity", r.get("score", 0)))
-        for r in vec_rows
-        if "id" in r
-    }
-
-    rows = base_q.in_("id", intersect_ids).limit(limit * 3).execute().data or []
-    results = [_clean(r, score_map.get(r["id"])) for r in rows]
-
-    # Sort: highest relevance first, then price ascending
-    results.sort(key=lambda x: (x["score"] is None, -(x["score"] or 0.0), x["price"]))
-    results = results[:limit]
+    # ── 4. Page → hydrate the page only (base_q re-applies the filters) ──────
+    page, next_cursor = page_after(matches, after, limit)
+    if page and not hydrated:
+        rows = (yield base_q.in_("id", [mid for mid, _ in page])).data or []
+        hydrated = {r["id"]: r for r in rows}
+    results = yield offload(_clean_rows, [(hydrated[mid], score) for mid, score in page if mid in hydrated])
 
     return {
         "ok": True,
         "count": len(results),
         "results": results,
+        "next_cursor": next_cursor,
         "message": f"Found {len(results)} favorites matching '{qtext}'.",
     }
@@ -4,26 +4,129 @@ tools/meals.py
 LangChain tool: search_meals
 
 All-in-one meal search supporting:
-  • Semantic (embedding-based) search
-  • Restaurant filter (by ID, list of IDs, or partial name)
+  • Hybrid search: embedding similarity + BM25 keywords, fused by rank
+  • Restaurant filter (partial or misspelled name, resolved in-process)
   • Price range filter
   • Category filter
   • Allergen include/exclude filter
   • Sort by relevance or price ascending
+  • Keyset pagination via opaque cursors (see utils/cursors.py)
+
+Responses are cached per normalized argument tuple (see utils/result_cache.py).
 """
 
-from typing import Any, Dict, List, Literal, Optional
+import re
+from typing import Any, Callable, Dict, List, Literal, Optional
 
 from langchain.tools import tool
+from postgrest.exceptions import APIError
 
+from src.utils.cursors import SEARCH_RANK_DEPTH, decode_cursor, page_after, price_keyset, price_page
 from src.utils.db_client import sb
 from src.utils.embeddings import encode_query
-from src.utils.filters import apply_allergen_filters
+from src.utils.filters import apply_allergen_filters, catalog_filter, push_allergen_filters
 from src.utils.formatters import format_meal_row
+from src.utils.lexical_index import reciprocal_rank_fusion
+from src.utils.meal_catalog import (
+    REFRESH_SECONDS as CATALOG_REFRESH_SECONDS,
+    get_lexical_index,
+    get_meal_index,
+    on_meals_changed,
+    wait_for_catalog,
+)
+from src.utils.restaurant_directory import restaurant_directory
+from src.utils.result_cache import make_key, search_cache
 from src.utils.time_utils import now_iso
 
 SortMode = Literal["relevance", "price_asc"]
 
+# Flipped off the first time PostgREST reports search_meals_filtered missing.
+_filtered_rpc_available = True
+
+# Ids per `id=in.(…)` hydration request, keeping URLs within PostgREST / proxy limits.
+_HYDRATE_CHUNK = 50
+
+
+def _invalidate_cached(meal_ids: Optional[List[str]], relisted: List[str]) -> None:
+    """
+    Catalog listener: changed meals (stock, description…) drop their cached
+    searches; a meal that became live or changed price, category or another
+    filtered field may now belong to any cached page, so it drops them all.
+    """
+    if meal_ids is None:
+        search_cache.clear()
+    elif relisted:
+        search_cache.invalidate_listings()
+    else:
+        search_cache.invalidate_meals(meal_ids)
+
+
+on_meals_changed(_invalidate_cached)
+search_cache.change_feed_seconds = CATALOG_REFRESH_SECONDS
+
+
+def _vector_matches(
+    query_emb: List[float],
+    count: int,
+    min_similarity: float,
+    keep: Callable[[Dict[str, Any]], bool],
+) -> List[tuple[str, float]]:
+    """
+    Rank meals by cosine similarity → [(meal_id, similarity)], best first.
+
+    Uses the in-process index when it is loaded (filtered with `keep`),
+    otherwise the `match_meals` RPC (which knows no filters, so the caller
+    over-fetches).
+    """
+    index = get_meal_index()
+    if index is not None:
+        return index.search(query_emb, count, float(min_similarity), keep)
+
+    vec_res = sb.rpc("match_meals", {
+        "query_embedding": query_emb,
+        "match_threshold": float(min_similarity),
+        "match_count": count,
+    }).execute()
+    return [(r["id"], float(r.get("similarity", 0))) for r in (vec_res.data or [])]
+
+
+def _filtered_rpc_search(
+    query_emb: List[float],
+    count: int,
+    min_similarity: float,
+    rids: List[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    category: Optional[str],
+    exclude_allergens: Optional[List[str]],
+    require_allergens: Optional[List[str]],
+) -> Optional[List[Dict[str, Any]]]:
+    """
+    One round trip: vector match + every filter + hydration (incl. restaurant_name)
+    via the `search_meals_filtered` RPC. Returns None if the function is not
+    deployed, so the caller can fall back to match_meals + hydration.
+    """
+    global _filtered_rpc_available
+    if not _filtered_rpc_available:
+        return None
+    try:
+        return sb.rpc("search_meals_filtered", {
+            "query_embedding": query_emb,
+            "match_threshold": float(min_similarity),
+            "match_count": count,
+            "restaurant_ids": rids or None,
+            "min_price": min_price,
+            "max_price": max_price,
+            "category_filter": category,
+            "exclude_allergens": exclude_allergens or None,
+            "require_allergens": require_allergens or None,
+        }).execute().data or []
+    except APIError as exc:
+        if exc.code != "PGRST202":  # "could not find the function"
+            raise
+        _filtered_rpc_available = False
+        return None
+
 
 @tool("search_meals")
 def search_meals(
@@ -37,6 +140,7 @@ def search_meals(
     limit: int = 8,
     min_similarity: float = 0.55,
     sort: SortMode = "relevance",
+    cursor: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     All-in-one meal search.
@@ -50,27 +154,64 @@ def search_meals(
       require_allergens: list of allergens the result MUST contain (rare).
 
     Other filters:
-      query           : semantic search string
+      query           : search text (matched semantically and by keyword)
       restaurant_name : partial name match (ONLY way to filter by restaurant)
       max_price       : upper price bound in EGP
       min_price       : lower price bound in EGP
       category        : exact category string (e.g. "Desserts", "Bakery", "Meat & Poultry")
       min_similarity  : cosine threshold 0–1, default 0.55 (lower to 0.4 for dietary queries)
       sort            : "relevance" (default) or "price_asc"
+      cursor          : next_cursor from the previous page (omit for the first page)
     """
+    args = {
+        "query": query,
+        "restaurant_name": restaurant_name,
+        "max_price": max_price,
+        "min_price": min_price,
+        "category": category,
+        "exclude_allergens": exclude_allergens,
+        "require_allergens": require_allergens,
+        "limit": limit,
+        "min_similarity": min_similarity,
+        "sort": sort,
+        "cursor": cursor,
+    }
+    key = make_key(args)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return cached
+
+    result = _search_meals(**args)
+    if result.get("ok"):
+        search_cache.put(key, result)
+    return result
+
+
+def _search_meals(
+    query: str = "",
+    restaurant_name: Optional[str] = None,
+    max_price: Optional[float] = None,
+    min_price: Optional[float] = None,
+    category: Optional[str] = None,
+    exclude_allergens: Optional[List[str]] = None,
+    require_allergens: Optional[List[str]] = None,
+    limit: int = 8,
+    min_similarity: float = 0.55,
+    sort: SortMode = "relevance",
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """search_meals without the result cache."""
+    try:
+        after = decode_cursor(cursor, "score" if (query or "").strip() else "price") if cursor else None
+    except ValueError as exc:
+        return {"ok": False, "error": f"Invalid cursor: {exc}", "results": []}
+
     # ── 1. Resolve restaurant IDs (only via name, never expose IDs to users) ──
     rids = []
     if restaurant_name:
-        rest = (
-            sb.table("restaurants")
-              .select("profile_id")
-              .ilike("restaurant_name", f"%{restaurant_name}%")
-              .limit(3)
-              .execute()
-              .data
-        )
+        rest = restaurant_directory.resolve(restaurant_name, limit=3)
         if rest:
-            rids = [r["profile_id"] for r in rest]
+            rids = [rid for rid, _ in rest]
         else:
             return {
                 "ok": False,
@@ -79,33 +220,43 @@ def search_meals(
             }
 
     # ── 2. Base DB query ──────────────────────────────────────────────────────
-    # Select all fields except embedding, created_at, updated_at
-    base_q = (
-        sb.table("meals")
-          .select(
-              "id, title, description, category, image_url, discounted_price, allergens, "
-              "status, expiry_date, quantity_available, restaurant_id, "
-              "restaurants(restaurant_name)"
-          )
-          .eq("status", "active")
-          .gt("quantity_available", 0)
-          .gt("expiry_date", now_iso())
-    )
-
-    if rids:
-        base_q = base_q.in_("restaurant_id", rids)
-    if max_price is not None:
-        base_q = base_q.lte("discounted_price", float(max_price))
-    if min_price is not None:
-        base_q = base_q.gte("discounted_price", float(min_price))
-    if category:
-        base_q = base_q.eq("category", category)
-
-    # ── 3. No query → filtered browse ────────────────────────────────────────
+    # Builders are mutated in place by each filter call, so every fetch gets a
+    # fresh one — reusing a builder would stack `id=in.(…)` filters.
+    def base_query() -> Any:
+        # Select all fields except embedding, created_at, updated_at
+        q = (
+            sb.table("meals")
+              .select(
+                  "id, title, description, category, image_url, discounted_price, allergens, "
+                  "status, expiry_date, quantity_available, restaurant_id"
+              )
+              .eq("status", "active")
+              .gt("quantity_available", 0)
+              .gt("expiry_date", now_iso())
+        )
+        if rids:
+            q = q.in_("restaurant_id", rids)
+        if max_price is not None:
+            q = q.lte("discounted_price", float(max_price))
+        if min_price is not None:
+            q = q.gte("discounted_price", float(min_price))
+        if category:
+            q = q.eq("category", category)
+        return push_allergen_filters(q, exclude_allergens, require_allergens)
+
+    def hydrate(ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        rows: Dict[str, Dict[str, Any]] = {}
+        for i in range(0, len(ids), _HYDRATE_CHUNK):
+            chunk = ids[i:i + _HYDRATE_CHUNK]
+            rows.update({r["id"]: r for r in base_query().in_("id", chunk).execute().data or []})
+        return rows
+
+    # ── 3. No query → filtered browse, keyset-paged on (price, id) ──────────
     if not (query or "").strip():
-        rows = base_q.order("discounted_price").limit(limit * 4).execute().data or []
+        rows = price_keyset(base_query(), after).limit(limit + 1).execute().data or []
+        rows, next_cursor = price_page(rows, limit)
         rows = apply_allergen_filters(rows, exclude_allergens, require_allergens)
-        results = [format_meal_row(r) for r in rows[:limit]]
+        results = [format_meal_row(r) for r in rows]
         return {
             "ok": True,
             "query": "",
@@ -115,47 +266,92 @@ def search_meals(
             "results": results,
             "count": len(results),
             "sort": sort,
+            "next_cursor": next_cursor,
         }
 
-    # ── 4. Semantic search ────────────────────────────────────────────────────
-    fetch_count = limit * 5
+    # ── 4. Hybrid search: vector + BM25, fused by reciprocal rank ───────────
+    # Both rankings are taken to a fixed depth on every page, so the fused
+    # scores — and therefore the (score, id) cursor — are stable across pages
+    # and a deep page costs the same as the first one.
+    depth = SEARCH_RANK_DEPTH
     query_emb = encode_query(query)
+    keep = catalog_filter(rids, min_price, max_price, category, exclude_allergens, require_allergens)
+    # The first catalog load feeds both indexes; keyword matching needs it.
+    lexical = get_lexical_index()
+    if lexical is None:
+        lexical = wait_for_catalog()
 
-    vec_res = sb.rpc("match_meals", {
-        "query_embedding": query_emb,
-        "match_threshold": float(min_similarity),
-        "match_count": fetch_count,
-    }).execute()
-
-    matched_ids = [r["id"] for r in (vec_res.data or [])]
+    # 4a. Vector candidates — without the in-process index, prefer the
+    #     single-call filtered RPC (rows come back already hydrated).
+    index = get_meal_index()
+    rpc_rows = None
+    if index is None:
+        rpc_rows = _filtered_rpc_search(
+            query_emb, depth, min_similarity,
+            rids, min_price, max_price, category, exclude_allergens, require_allergens,
+        )
+    if rpc_rows is not None:
+        score_map = {r["id"]: float(r.get("similarity", 0)) for r in rpc_rows}
+        vector_ids = [r["id"] for r in rpc_rows]
+        hydrated = {r["id"]: r for r in rpc_rows}
+    else:
+        matches = _vector_matches(query_emb, depth, min_similarity, keep)
+        score_map = dict(matches)
+        vector_ids = [mid for mid, _ in matches]
+        hydrated = {}
 
-    if matched_ids:
-        rows = base_q.in_("id", matched_ids).limit(fetch_count).execute().data or []
-        score_map = {
-            r["id"]: float(r.get("similarity", 0))
-            for r in (vec_res.data or [])
-        }
+    # 4b. Lexical candidates from the in-process BM25 index — or, if the
+    #     catalog never loaded, a bounded substring match in the database.
+    if lexical is not None:
+        lexical_ids = [mid for mid, _ in lexical.search(query, depth, keep)]
     else:
-        # Text fallback when no vector matches found
-        term = f"%{query}%"
-        rows = (
-            base_q.or_(f"title.ilike.{term},description.ilike.{term},category.ilike.{term}")
-                  .limit(limit * 2)
-                  .execute()
-                  .data or []
+        print("search_meals: meal catalog not loaded — keyword matches via ilike")
+        term = "%" + re.sub(r"[,()%*]", " ", query).strip() + "%"
+        text_rows = (
+            base_query()
+              .or_(f"title.ilike.{term},description.ilike.{term},category.ilike.{term}")
+              .limit(depth)
+              .execute()
+              .data or []
         )
-        score_map = {}
+        hydrated.update({r["id"]: r for r in text_rows})
+        lexical_ids = [r["id"] for r in text_rows]
 
-    # ── 5. Allergen filter → sort → slice ─────────────────────────────────────
-    rows = apply_allergen_filters(rows, exclude_allergens, require_allergens)
-    results = [format_meal_row(r, score_map) for r in rows]
+    # 4c. Fuse. match_meals knows no filters, so re-apply them before paging:
+    #     from catalog metadata when it is loaded (it also supplies price_asc
+    #     prices), otherwise by hydrating every candidate through the filters.
+    fused = reciprocal_rank_fusion([vector_ids, lexical_ids])
+    if index is None and rpc_rows is None:
+        if lexical is not None:
+            fused = [(mid, f) for mid, f in fused if (m := lexical.meta(mid)) is not None and keep(m)]
+        elif fused:
+            hydrated.update(hydrate([mid for mid, _ in fused if mid not in hydrated]))
+            fused = [(mid, f) for mid, f in fused if mid in hydrated]
 
     if sort == "price_asc":
-        results.sort(key=lambda x: x["price"])
+        def price_of(mid: str) -> Optional[float]:
+            if mid in hydrated:
+                return float(hydrated[mid]["discounted_price"])
+            meta = lexical.meta(mid) if lexical is not None else None
+            return meta["price"] if meta is not None else None
+
+        unpriced = [mid for mid, _ in fused if price_of(mid) is None]
+        if unpriced:
+            hydrated.update(hydrate(unpriced))
+        # Negated price so the shared (score desc, id asc) keyset yields price ascending.
+        ranked = [(mid, -price_of(mid)) for mid, _ in fused if price_of(mid) is not None]
     else:
-        results.sort(key=lambda x: (x["score"] is None, -(x["score"] or 0.0)))
+        ranked = fused
+
+    # ── 5. Page → hydrate the page only → allergen safety net ────────────────
+    page, next_cursor = page_after(ranked, after, limit)
+    missing = [mid for mid, _ in page if mid not in hydrated]
+    if missing:
+        hydrated.update(hydrate(missing))
 
-    results = results[:limit]
+    rows = [hydrated[mid] for mid, _ in page if mid in hydrated]
+    rows = apply_allergen_filters(rows, exclude_allergens, require_allergens)
+    results = [format_meal_row(r, score_map) for r in rows]
 
     return {
         "ok": True,
@@ -169,4 +365,5 @@ def search_meals(
         "count": len(results),
         "results": results,
         "sort": sort,
+        "next_cursor": next_cursor,
     }
@@ -4,11 +4,123 @@ auth.py
 Authentication utilities for FastAPI routes.
 
 Provides dependency injection for getting the current authenticated user.
+
+Tokens are verified according to AUTH_VERIFY_MODE:
+  • local  — check the Supabase JWT in process (signature, expiry, audience)
+             with SUPABASE_JWT_SECRET (HS256) or the project's cached JWKS
+  • remote — ask Supabase Auth (`auth.get_user`) on every request
+
+Verified tokens are remembered (token hash → user_id) until they expire, so
+repeat requests skip verification entirely. The verified id is also stored
+in the request context (utils/request_context.py) for tools to read.
 """
 
-from typing import Optional
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+
+import jwt
 from fastapi import Header, HTTPException
-from src.utils.db_client import sb
+
+from src.utils.db_client import SUPABASE_URL, get_async_client
+from src.utils.request_context import DEV_USER_ID, current_user_id, set_current_user
+
+AUTH_VERIFY_MODE = os.environ.get("AUTH_VERIFY_MODE", "local")  # local | remote
+SUPABASE_JWT_SECRET = os.environ.get("SUPABASE_JWT_SECRET", "")
+AUTH_TOKEN_CACHE_SIZE = int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "1024"))
+
+_AUDIENCE = "authenticated"
+_ASYMMETRIC_ALGS = ["RS256", "ES256"]
+_jwks = jwt.PyJWKClient(
+    f"{SUPABASE_URL.rstrip('/')}/auth/v1/.well-known/jwks.json",
+    cache_keys=True,
+    lifespan=3600,
+)
+
+_verified: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # sha256(token) → (user_id, exp)
+_verified_lock = threading.Lock()
+
+
+def _cached_user(key: str) -> Optional[str]:
+    with _verified_lock:
+        hit = _verified.get(key)
+        if hit is None:
+            return None
+        if hit[1] <= time.time():
+            del _verified[key]
+            return None
+        _verified.move_to_end(key)
+        return hit[0]
+
+
+def _remember(key: str, user_id: str, exp: float) -> None:
+    with _verified_lock:
+        _verified[key] = (user_id, exp)
+        _verified.move_to_end(key)
+        while len(_verified) > AUTH_TOKEN_CACHE_SIZE:
+            _verified.popitem(last=False)
+
+
+def _verify_local(token: str) -> Tuple[str, float]:
+    """
+    Verify a Supabase access token in process → (user_id, exp).
+    Raises jwt.InvalidTokenError for bad tokens and jwt.PyJWKClientError when
+    no verification key can be obtained.
+    """
+    alg = jwt.get_unverified_header(token).get("alg")
+    if alg == "HS256":
+        if not SUPABASE_JWT_SECRET:
+            raise jwt.PyJWKClientError("HS256 token but SUPABASE_JWT_SECRET is not set")
+        key, algorithms = SUPABASE_JWT_SECRET, ["HS256"]
+    else:
+        key, algorithms = _jwks.get_signing_key_from_jwt(token).key, _ASYMMETRIC_ALGS
+    claims = jwt.decode(
+        token,
+        key,
+        algorithms=algorithms,
+        audience=_AUDIENCE,
+        options={"require": ["exp", "sub"]},
+    )
+    return claims["sub"], float(claims["exp"])
+
+
+async def _verify_remote(token: str) -> Tuple[str, float]:
+    """Verify via Supabase Auth → (user_id, exp)."""
+    asb = await get_async_client()
+    user = await asb.auth.get_user(token)
+    if not user or not user.user:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    exp = jwt.decode(token, options={"verify_signature": False}).get("exp", 0)
+    return user.user.id, float(exp)
+
+
+async def verify_token(token: str) -> str:
+    """Bearer token → user_id, using the verified-token cache first."""
+    key = hashlib.sha256(token.encode()).hexdigest()
+    user_id = _cached_user(key)
+    if user_id is not None:
+        return user_id
+
+    if AUTH_VERIFY_MODE == "remote":
+        user_id, exp = await _verify_remote(token)
+    else:
+        try:
+            # A JWKS cache miss is a network fetch — keep it off the event loop.
+            user_id, exp = await asyncio.to_thread(_verify_local, token)
+        except jwt.PyJWKClientError as exc:
+            print(f"Local JWT verification unavailable ({exc}); falling back to Supabase Auth")
+            user_id, exp = await _verify_remote(token)
+        except jwt.ExpiredSignatureError:
+            raise HTTPException(status_code=401, detail="Token has expired")
+        except jwt.InvalidTokenError as exc:
+            raise HTTPException(status_code=401, detail=f"Invalid token: {exc}")
+
+    _remember(key, user_id, exp)
+    return user_id
 
 
 async def get_current_user(authorization: Optional[str] = Header(None)) -> str:
@@ -30,7 +142,8 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> str:
     if not authorization:
         # Return a default user ID for development
         # In production, you should raise an error here
-        return "11111111-1111-1111-1111-111111111111"
+        set_current_user(DEV_USER_ID)
+        return DEV_USER_ID
     
     try:
         # Extract token from "Bearer <token>"
@@ -38,14 +151,10 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> str:
             raise HTTPException(status_code=401, detail="Invalid authorization header format")
         
         token = authorization.replace("Bearer ", "")
-        
-        # Validate token and get user
-        user = sb.auth.get_user(token)
-        
-        if not user or not user.user:
-            raise HTTPException(status_code=401, detail="Invalid or expired token")
-        
-        return user.user.id
+        user_id = await verify_token(token)
+        # Tools read the verified user from the request context (no re-auth)
+        set_current_user(user_id)
+        return user_id
         
     except HTTPException:
         raise
@@ -56,17 +165,11 @@ async def get_current_user(authorization: Optional[str] = Header(None)) -> str:
 def get_current_user_sync() -> str:
     """
     Synchronous version for use in non-async contexts (tools, etc.)
-    
+
+    Reads the user that the route (or agent) already verified for this
+    request; falls back to the development user outside a request.
+
     Returns:
         User UUID string
     """
-    try:
-        user = sb.auth.get_user()
-        if user and user.user:
-            return user.user.id
-        else:
-            # Fallback for development/testing
-            return "11111111-1111-1111-1111-111111111111"
-    except Exception:
-        # Fallback for development/testing
-        return "11111111-1111-1111-1111-111111111111"
+    return current_user_id()
@@ -0,0 +1,143 @@
+"""
+utils/batch_encoder.py
+──────────────────────
+Micro-batching dispatcher for query embeddings.
+
+Concurrent callers submit single strings; a worker thread collects whatever
+arrives within EMBEDDING_BATCH_WINDOW_MS (up to EMBEDDING_BATCH_MAX items)
+and runs one `model.encode` over the whole batch. Each caller blocks on its
+own Future and gets back only its own vector.
+
+Set EMBEDDING_BATCH_WINDOW_MS=0 to disable batching (encode inline).
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+EMBEDDING_BATCH_WINDOW_MS = float(os.environ.get("EMBEDDING_BATCH_WINDOW_MS", "5"))
+EMBEDDING_BATCH_MAX = int(os.environ.get("EMBEDDING_BATCH_MAX", "32"))
+
+
+class BatchEncoder:
+    """
+    Args:
+        get_model : zero-arg callable returning an object with
+                    `.encode(list[str], normalize_embeddings=True, ...)`.
+        window_ms : how long to wait for more requests after the first one.
+        max_batch : upper bound on texts per model call.
+    """
+
+    def __init__(self, get_model: Callable[[], Any], window_ms: float = 5, max_batch: int = 32):
+        self._get_model = get_model
+        self.window = window_ms / 1000.0
+        self.max_batch = max(1, max_batch)
+        self._queue: "queue.Queue[Tuple[str, Future]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, text: str) -> Future:
+        """Queue one text; the Future resolves to its embedding (list[float])."""
+        self._ensure_worker()
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def encode(self, text: str) -> List[float]:
+        """Blocking convenience wrapper around submit()."""
+        if self.window <= 0:
+            return self._get_model().encode(text, normalize_embeddings=True).tolist()
+        return self.submit(text).result()
+
+    def _ensure_worker(self) -> None:
+        if self._worker is not None:
+            return
+        with self._start_lock:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="batch-encoder", daemon=True)
+                self._worker.start()
+
+    def _collect(self) -> List[Tuple[str, Future]]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        # The only consumer of the queue: an exception escaping here would
+        # leave every later encode() waiting forever, so none may.
+        while True:
+            try:
+                batch = self._collect()
+            except Exception as exc:
+                print(f"Batch encoder: collect failed: {exc}")
+                continue
+            try:
+                self._encode_batch(batch)
+            except Exception as exc:
+                print(f"Batch encoder: batch failed: {exc}")
+                for _, fut in batch:
+                    _settle(fut, exc=exc)
+            self.batches += 1
+            self.items += len(batch)
+
+    def _encode_batch(self, batch: List[Tuple[str, Future]]) -> None:
+        # Claim each Future first: cancelled ones are dropped, and the rest
+        # can no longer be cancelled under us.
+        batch = [(text, fut) for text, fut in batch if fut.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        # Identical concurrent queries share a single slot in the batch.
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            vecs = self._get_model().encode(
+                texts,
+                batch_size=len(texts),
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            )
+            by_text = {t: v.tolist() for t, v in zip(texts, vecs)}
+        except Exception as exc:
+            for _, fut in batch:
+                _settle(fut, exc=exc)
+            return
+        for text, fut in batch:
+            if text in by_text:
+                _settle(fut, result=by_text[text])
+            else:
+                _settle(fut, exc=RuntimeError(f"no embedding returned for {text[:40]!r}"))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "window_ms": self.window * 1000.0,
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "queued": self._queue.qsize(),
+        }
+
+
+def _settle(fut: Future, result: Any = None, exc: Optional[BaseException] = None) -> None:
+    """Resolve a Future once; one that is already done is left alone."""
+    if fut.done():
+        return
+    try:
+        if exc is not None:
+            fut.set_exception(exc)
+        else:
+            fut.set_result(result)
+    except InvalidStateError:
+        pass  # resolved concurrently
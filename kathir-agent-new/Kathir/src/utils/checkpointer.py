@@ -0,0 +1,316 @@
+"""
+utils/checkpointer.py
+─────────────────────
+Bounded, persistent conversation memory for the agent (replaces MemorySaver).
+
+  get_checkpointer()     — the shared saver at AGENT_CHECKPOINT_DB
+  BoundedSqliteSaver.from_path(path) — SQLite-backed LangGraph checkpointer
+  .compact()    — evict idle / least-recently-used threads, trim, VACUUM
+  .footprint()  — per-thread checkpoint counts and stored bytes
+  start_compactor()       — background thread running compact() periodically
+
+Bounds:
+  • AGENT_MAX_CHECKPOINTS_PER_THREAD — older checkpoints (and their pending
+    writes) are dropped on every put; only the newest are ever read back
+  • AGENT_THREAD_TTL_HOURS           — threads idle longer are evicted
+  • AGENT_MAX_THREADS                — beyond this, least recently used go
+
+History lives on disk, so it survives restarts and costs no process memory
+between turns. The async checkpointer methods (used by ainvoke and
+astream_events) run the sync SQLite calls in a worker thread.
+"""
+
+import asyncio
+import inspect
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, Iterator, List, Optional
+
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+AGENT_CHECKPOINT_DB = os.environ.get("AGENT_CHECKPOINT_DB", ".cache/checkpoints.sqlite")
+AGENT_MAX_CHECKPOINTS_PER_THREAD = int(os.environ.get("AGENT_MAX_CHECKPOINTS_PER_THREAD", "20"))
+AGENT_THREAD_TTL_HOURS = float(os.environ.get("AGENT_THREAD_TTL_HOURS", "72"))
+AGENT_MAX_THREADS = int(os.environ.get("AGENT_MAX_THREADS", "5000"))
+AGENT_COMPACT_INTERVAL_SECONDS = float(os.environ.get("AGENT_COMPACT_INTERVAL_SECONDS", "900"))
+
+# put_writes grew a task_path argument in later langgraph-checkpoint-sqlite releases.
+_PUT_WRITES_TASK_PATH = "task_path" in inspect.signature(SqliteSaver.put_writes).parameters
+
+
+class BoundedSqliteSaver(SqliteSaver):
+    """SqliteSaver with per-thread checkpoint caps, idle/LRU eviction and async support."""
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        *,
+        max_checkpoints: int = AGENT_MAX_CHECKPOINTS_PER_THREAD,
+        ttl_seconds: float = AGENT_THREAD_TTL_HOURS * 3600,
+        max_threads: int = AGENT_MAX_THREADS,
+        **kwargs: Any,
+    ):
+        super().__init__(conn, **kwargs)
+        self.path = ""
+        self.max_checkpoints = max_checkpoints
+        self.ttl_seconds = ttl_seconds
+        self.max_threads = max_threads
+        self._local = threading.local()
+
+    @classmethod
+    def from_path(cls, path: str = AGENT_CHECKPOINT_DB, **kwargs: Any) -> "BoundedSqliteSaver":
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        saver = cls(sqlite3.connect(path, check_same_thread=False), **kwargs)
+        saver.path = path
+        return saver
+
+    def setup(self) -> None:
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS thread_activity ("
+            " thread_id TEXT PRIMARY KEY, last_used REAL NOT NULL)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_thread_activity_last_used"
+            " ON thread_activity (last_used)"
+        )
+        self.conn.commit()
+
+    # ── bounded writes ────────────────────────────────────────────────────────
+
+    @contextmanager
+    def cursor(self, transaction: bool = True) -> Iterator[sqlite3.Cursor]:
+        with super().cursor(transaction) as cur:
+            yield cur
+            after_put: Optional[Callable[[sqlite3.Cursor], None]] = getattr(self._local, "after_put", None)
+            if after_put is not None:
+                self._local.after_put = None
+                try:
+                    after_put(cur)  # before the commit on leaving super().cursor()
+                except BaseException:
+                    self.conn.rollback()  # super().cursor() commits even on error
+                    raise
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        # SqliteSaver.put writes the checkpoint through one self.cursor();
+        # activity tracking and the trim run on that cursor, so all three
+        # commit (or fail) as one transaction.
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        def track(cur: sqlite3.Cursor) -> None:
+            cur.execute(
+                "INSERT INTO thread_activity (thread_id, last_used) VALUES (?, ?)"
+                " ON CONFLICT(thread_id) DO UPDATE SET last_used = excluded.last_used",
+                (thread_id, time.time()),
+            )
+            self._trim(cur, thread_id, checkpoint_ns)
+
+        self._local.after_put = track
+        try:
+            return super().put(config, checkpoint, metadata, new_versions)
+        finally:
+            self._local.after_put = None
+
+    def _trim(self, cur: sqlite3.Cursor, thread_id: str, checkpoint_ns: str) -> None:
+        """Keep only the newest max_checkpoints checkpoints (ids sort by time)."""
+        cur.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            " AND checkpoint_id NOT IN ("
+            "   SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?"
+            "   ORDER BY checkpoint_id DESC LIMIT ?)",
+            (thread_id, checkpoint_ns, thread_id, checkpoint_ns, self.max_checkpoints),
+        )
+        if cur.rowcount:
+            cur.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ?"
+                " AND checkpoint_id NOT IN ("
+                "   SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?)",
+                (thread_id, checkpoint_ns, thread_id, checkpoint_ns),
+            )
+
+    # ── eviction / compaction ─────────────────────────────────────────────────
+
+    @staticmethod
+    def _delete_threads(cur: sqlite3.Cursor, thread_ids: Iterable[str]) -> int:
+        ids = [(t,) for t in thread_ids]
+        cur.executemany("DELETE FROM checkpoints WHERE thread_id = ?", ids)
+        cur.executemany("DELETE FROM writes WHERE thread_id = ?", ids)
+        cur.executemany("DELETE FROM thread_activity WHERE thread_id = ?", ids)
+        return len(ids)
+
+    def delete_thread(self, thread_id: str) -> bool:
+        """Drop a thread's checkpoints, writes and activity. True if it had any stored."""
+        with self.cursor() as cur:
+            existed = cur.execute(
+                "SELECT 1 FROM checkpoints WHERE thread_id = ?"
+                " UNION ALL SELECT 1 FROM writes WHERE thread_id = ?"
+                " UNION ALL SELECT 1 FROM thread_activity WHERE thread_id = ? LIMIT 1",
+                (str(thread_id),) * 3,
+            ).fetchone() is not None
+            self._delete_threads(cur, [str(thread_id)])
+        return existed
+
+    def compact(self) -> Dict[str, Any]:
+        """Evict idle and excess threads, trim every thread, then reclaim disk space."""
+        started = time.perf_counter()
+        with self.cursor() as cur:
+            # Threads written before activity tracking existed count as used now.
+            cur.execute(
+                "INSERT OR IGNORE INTO thread_activity (thread_id, last_used)"
+                " SELECT DISTINCT thread_id, ? FROM checkpoints",
+                (time.time(),),
+            )
+            idle = [r[0] for r in cur.execute(
+                "SELECT thread_id FROM thread_activity WHERE last_used < ?",
+                (time.time() - self.ttl_seconds,),
+            ).fetchall()]
+            expired = self._delete_threads(cur, idle)
+
+            excess = [r[0] for r in cur.execute(
+                "SELECT thread_id FROM thread_activity ORDER BY last_used DESC LIMIT -1 OFFSET ?",
+                (self.max_threads,),
+            ).fetchall()]
+            evicted = self._delete_threads(cur, excess)
+
+            for thread_id, checkpoint_ns in cur.execute(
+                "SELECT DISTINCT thread_id, checkpoint_ns FROM checkpoints"
+            ).fetchall():
+                self._trim(cur, thread_id, checkpoint_ns)
+
+        with self.cursor(transaction=False) as cur:
+            cur.execute("VACUUM")
+            cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        return {
+            "expired_threads": expired,
+            "evicted_threads": evicted,
+            "seconds": round(time.perf_counter() - started, 3),
+            **self._totals(),
+        }
+
+    # ── reporting ─────────────────────────────────────────────────────────────
+
+    def _totals(self) -> Dict[str, Any]:
+        size = 0
+        for suffix in ("", "-wal", "-shm"):
+            if self.path and os.path.exists(self.path + suffix):
+                size += os.path.getsize(self.path + suffix)
+        with self.cursor(transaction=False) as cur:
+            threads = cur.execute("SELECT COUNT(*) FROM thread_activity").fetchone()[0]
+        return {"threads": threads, "db_file_bytes": size}
+
+    def footprint(self, limit: int = 100) -> Dict[str, Any]:
+        """
+        Per-thread storage report, largest first:
+          checkpoints / writes      — rows kept for the thread
+          stored_bytes              — disk payload (checkpoints + metadata + writes)
+          latest_checkpoint_bytes   — what one turn deserializes into memory
+        """
+        now = time.time()
+        with self.cursor(transaction=False) as cur:
+            rows = cur.execute(
+                """
+                SELECT c.thread_id,
+                       COUNT(*),
+                       SUM(LENGTH(c.checkpoint) + LENGTH(c.metadata)),
+                       MAX(c.checkpoint_id),
+                       a.last_used
+                FROM checkpoints c
+                LEFT JOIN thread_activity a ON a.thread_id = c.thread_id
+                GROUP BY c.thread_id
+                """
+            ).fetchall()
+            writes = {
+                r[0]: (r[1], r[2] or 0)
+                for r in cur.execute(
+                    "SELECT thread_id, COUNT(*), SUM(LENGTH(value)) FROM writes GROUP BY thread_id"
+                ).fetchall()
+            }
+            latest = {
+                r[0]: r[1]
+                for r in cur.execute(
+                    "SELECT c.thread_id, LENGTH(c.checkpoint) FROM checkpoints c"
+                    " JOIN (SELECT thread_id, MAX(checkpoint_id) AS cid FROM checkpoints"
+                    "       WHERE checkpoint_ns = '' GROUP BY thread_id) m"
+                    " ON m.thread_id = c.thread_id AND m.cid = c.checkpoint_id"
+                    " WHERE c.checkpoint_ns = ''"
+                ).fetchall()
+            }
+
+        report: List[Dict[str, Any]] = []
+        for thread_id, n_checkpoints, cp_bytes, _, last_used in rows:
+            n_writes, w_bytes = writes.get(thread_id, (0, 0))
+            report.append({
+                "thread_id": thread_id,
+                "checkpoints": n_checkpoints,
+                "writes": n_writes,
+                "stored_bytes": (cp_bytes or 0) + w_bytes,
+                "latest_checkpoint_bytes": latest.get(thread_id, 0),
+                "idle_seconds": round(now - last_used, 1) if last_used else None,
+            })
+        report.sort(key=lambda r: -r["stored_bytes"])
+        return {**self._totals(), "threads_reported": min(limit, len(report)), "per_thread": report[:limit]}
+
+    # ── async API (ainvoke / astream_events) ──────────────────────────────────
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None) -> AsyncIterator[Any]:
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path: str = ""):
+        if _PUT_WRITES_TASK_PATH:
+            return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id)
+
+    async def adelete_thread(self, thread_id: str) -> bool:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_saver: Optional[BoundedSqliteSaver] = None
+_saver_lock = threading.Lock()
+_compactor: Optional[threading.Thread] = None
+
+
+def get_checkpointer() -> BoundedSqliteSaver:
+    """The process-wide checkpointer (created on first use)."""
+    global _saver
+    with _saver_lock:
+        if _saver is None:
+            _saver = BoundedSqliteSaver.from_path(AGENT_CHECKPOINT_DB)
+        return _saver
+
+
+def start_compactor(interval: float = AGENT_COMPACT_INTERVAL_SECONDS) -> None:
+    """Run compact() on the shared checkpointer every `interval` seconds (idempotent)."""
+    global _compactor
+    if _compactor is not None:
+        return
+    saver = get_checkpointer()
+
+    def _loop() -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                report = saver.compact()
+                print(f"Checkpoint compaction: {report}")
+            except Exception as exc:
+                print(f"Checkpoint compaction failed: {exc}")
+
+    _compactor = threading.Thread(target=_loop, name="checkpoint-compactor", daemon=True)
+    _compactor.start()
@@ -0,0 +1,89 @@
+"""
+utils/concurrency.py
+────────────────────
+Per-worker admission control for expensive async work (agent runs).
+
+  ConcurrencyGate(limit, max_waiting, wait_timeout)
+    slot()   — `async with gate.slot():` runs when one of `limit` slots is free
+    check()  — fail fast (GateFull) when the wait queue is already full
+
+At most `limit` runs execute at once and at most `max_waiting` callers wait
+for a slot. Past that, callers are rejected immediately (429); a caller that
+waited `wait_timeout` seconds without a slot gives up (503). Both carry a
+Retry-After estimate derived from recent run durations.
+"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict
+
+
+class GateFull(Exception):
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class ConcurrencyGate:
+    def __init__(self, limit: int = 4, max_waiting: int = 16, wait_timeout: float = 10.0):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.wait_timeout = wait_timeout
+        self._sem = asyncio.Semaphore(limit)
+        self._active = 0
+        self._waiting = 0
+        self._avg_run = 5.0  # seconds, EWMA of completed runs
+        self.admitted = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def _retry_after(self) -> int:
+        # Roughly: time for everyone ahead of a new caller to get a slot.
+        return max(1, math.ceil(self._avg_run * (self._waiting + 1) / self.limit))
+
+    def check(self) -> None:
+        """Raise GateFull (429) if a new caller could not even join the queue."""
+        if self._sem.locked() and self._waiting >= self.max_waiting:
+            self.rejected += 1
+            raise GateFull(429, "Too many concurrent agent requests", self._retry_after())
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        if not self._sem.locked():
+            await self._sem.acquire()  # a slot is free: returns without suspending
+        else:
+            self.check()
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.wait_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise GateFull(503, "Agent is busy, try again shortly", self._retry_after())
+            finally:
+                self._waiting -= 1
+
+        self._active += 1
+        self.admitted += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._active -= 1
+            self._sem.release()
+            self._avg_run = 0.8 * self._avg_run + 0.2 * (time.perf_counter() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "max_waiting": self.max_waiting,
+            "active": self._active,
+            "waiting": self._waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_run_seconds": round(self._avg_run, 2),
+        }
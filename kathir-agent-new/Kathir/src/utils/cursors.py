@@ -0,0 +1,83 @@
+"""
+utils/cursors.py
+────────────────
+Opaque keyset cursors for paginated search.
+
+  encode_cursor(kind, *key)   — url-safe base64 token for the last row of a page
+  decode_cursor(token, kind)  — back to the key tuple (ValueError if malformed)
+  page_after(ranked, after, limit) — one page of a (score, id)-ranked list
+  price_keyset(q, after) / price_page(rows, limit) — the same for PostgREST browse
+
+Two kinds are used:
+  • "price" — (discounted_price, id) for browse, ordered ascending
+  • "score" — (score, id) for ranked search, score descending then id ascending
+
+A cursor only records where the previous page ended, so fetching page 20
+costs the same as fetching page 1.
+"""
+
+import base64
+import json
+import os
+from typing import Any, List, Optional, Tuple
+
+# How deep each ranking is read before paging. Every page reads the same
+# depth, so ranked scores (and cursors) stay stable from page to page.
+SEARCH_RANK_DEPTH = int(os.environ.get("SEARCH_RANK_DEPTH", "200"))
+
+Ranked = List[Tuple[str, float]]
+
+
+def encode_cursor(kind: str, *key: Any) -> str:
+    raw = json.dumps([kind, *key], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str, kind: str) -> Tuple[Any, ...]:
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        data = json.loads(raw)
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(data, list) or len(data) != 3 or data[0] != kind:
+        raise ValueError(f"Cursor is not a '{kind}' cursor")
+    return float(data[1]), str(data[2])
+
+
+def page_after(
+    ranked: Ranked,
+    after: Optional[Tuple[float, str]],
+    limit: int,
+) -> Tuple[Ranked, Optional[str]]:
+    """
+    Slice one page out of (id, score) pairs, after the (score, id) key `after`.
+    Returns (page, next_cursor); next_cursor is None on the last page.
+    """
+    ordered = sorted(ranked, key=lambda x: (-x[1], x[0]))
+    if after is not None:
+        score, last_id = after
+        ordered = [(i, s) for i, s in ordered if s < score or (s == score and i > last_id)]
+    page = ordered[:limit]
+    if len(ordered) <= limit or not page:
+        return page, None
+    return page, encode_cursor("score", page[-1][1], page[-1][0])
+
+
+def price_keyset(q: Any, after: Optional[Tuple[float, str]]) -> Any:
+    """Add `(discounted_price, id) > after` to a PostgREST builder, ordered to match."""
+    if after is not None:
+        price, last_id = after
+        q = q.or_(
+            f"discounted_price.gt.{price},"
+            f"and(discounted_price.eq.{price},id.gt.{last_id})"
+        )
+    return q.order("discounted_price").order("id")
+
+
+def price_page(rows: List[dict], limit: int) -> Tuple[List[dict], Optional[str]]:
+    """Trim a `limit + 1` fetch to one page and build the next "price" cursor."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor("price", float(last["discounted_price"]), last["id"])
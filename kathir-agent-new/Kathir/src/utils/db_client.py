@@ -1,8 +1,25 @@
+import asyncio
 import os
-from supabase import create_client, Client
+from typing import Optional
+
+from supabase import AsyncClient, Client, acreate_client, create_client
 
 SUPABASE_URL: str = os.environ["SUPABASE_URL"]
 SUPABASE_SERVICE_ROLE_KEY: str = os.environ["SUPABASE_SERVICE_ROLE_KEY"]
 
 # Single shared client — import `sb` everywhere instead of re-creating it.
 sb: Client = create_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+
+# Async twin for `async def` routes. It has to be created inside the running
+# event loop, so it is built lazily on first use — call `get_async_client()`.
+_asb: Optional[AsyncClient] = None
+_asb_lock = asyncio.Lock()
+
+
+async def get_async_client() -> AsyncClient:
+    global _asb
+    if _asb is None:
+        async with _asb_lock:
+            if _asb is None:
+                _asb = await acreate_client(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+    return _asb
@@ -0,0 +1,117 @@
+"""
+utils/embedding_backends.py
+───────────────────────────
+CPU-friendly ways to run the bge-m3 SentenceTransformer.
+
+Selected with EMBEDDING_BACKEND:
+  • torch     — full-precision PyTorch model (default; uses CUDA if available)
+  • int8      — PyTorch with dynamic int8 quantization of every nn.Linear
+  • onnx      — ONNX Runtime export of the model
+  • onnx-int8 — ONNX Runtime with a dynamically int8-quantized graph
+
+Every backend returns a SentenceTransformer, so `.encode(...)` is the same
+everywhere. check_parity() confirms a backend still produces vectors close to
+the torch reference before it is switched on in production.
+
+The ONNX backends need `optimum[onnxruntime]`; the exported / quantized graph
+is cached under EMBEDDING_ONNX_DIR so the export only happens once.
+"""
+
+import os
+from typing import Dict, List, Literal
+
+import numpy as np
+import torch
+from sentence_transformers import SentenceTransformer
+
+Backend = Literal["torch", "int8", "onnx", "onnx-int8"]
+BACKENDS: tuple[Backend, ...] = ("torch", "int8", "onnx", "onnx-int8")
+
+EMBEDDING_BACKEND: Backend = os.environ.get("EMBEDDING_BACKEND", "torch")  # type: ignore[assignment]
+EMBEDDING_ONNX_DIR = os.environ.get("EMBEDDING_ONNX_DIR", ".cache/onnx")
+
+# Quantization kernel for onnx-int8 ("avx2", "avx512", "avx512_vnni", "arm64").
+_ONNX_QUANT_CONFIG = os.environ.get("EMBEDDING_ONNX_QUANT", "avx2")
+
+PARITY_TEXTS = [
+    "grilled chicken with rice",
+    "chocolate cake dessert",
+    "gluten-free bakery bread",
+    "فول مدمس وطعمية",
+    "seafood pasta with shrimp",
+    "كشري مصري",
+    "vegan salad, no dairy",
+    "beef shawarma sandwich",
+]
+
+
+def backend_tag(backend: Backend) -> str:
+    """Label for vectors a backend produces ("onnx-int8" carries its quantization kernel)."""
+    if backend == "onnx-int8":
+        return f"{backend}-{_ONNX_QUANT_CONFIG}"
+    return backend
+
+
+def load_model(model_name: str, backend: Backend = "torch") -> SentenceTransformer:
+    """Load `model_name` with the requested backend."""
+    if backend == "torch":
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+        return SentenceTransformer(model_name, device=device, trust_remote_code=True)
+
+    if backend == "int8":
+        model = SentenceTransformer(model_name, device="cpu", trust_remote_code=True)
+        return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    if backend in ("onnx", "onnx-int8"):
+        local_dir = os.path.join(EMBEDDING_ONNX_DIR, model_name.replace("/", "__"))
+        if not os.path.isdir(local_dir):
+            SentenceTransformer(model_name, device="cpu", backend="onnx").save(local_dir)
+        if backend == "onnx":
+            return SentenceTransformer(
+                local_dir,
+                device="cpu",
+                backend="onnx",
+                model_kwargs={"file_name": "onnx/model.onnx"},
+            )
+
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        # Named explicitly: left to itself the export calls the avx2 graph
+        # "quint8" (its weight dtype) and the other kernels "qint8".
+        file_suffix = f"qint8_{_ONNX_QUANT_CONFIG}"
+        file_name = f"model_{file_suffix}.onnx"
+        if not os.path.exists(os.path.join(local_dir, "onnx", file_name)):
+            model = SentenceTransformer(local_dir, device="cpu", backend="onnx")
+            export_dynamic_quantized_onnx_model(model, _ONNX_QUANT_CONFIG, local_dir, file_suffix=file_suffix)
+        return SentenceTransformer(
+            local_dir,
+            device="cpu",
+            backend="onnx",
+            model_kwargs={"file_name": f"onnx/{file_name}"},
+        )
+
+    raise ValueError(f"Unknown embedding backend '{backend}' — expected one of {BACKENDS}")
+
+
+def cosine_parity(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Row-wise cosine similarity between two (n, dim) matrices → min / mean."""
+    ref = reference / np.linalg.norm(reference, axis=1, keepdims=True)
+    cand = candidate / np.linalg.norm(candidate, axis=1, keepdims=True)
+    sims = np.sum(ref * cand, axis=1)
+    return {"min": float(sims.min()), "mean": float(sims.mean())}
+
+
+def check_parity(
+    model_name: str,
+    backend: Backend,
+    texts: List[str] = PARITY_TEXTS,
+    threshold: float = 0.99,
+) -> Dict[str, object]:
+    """
+    Encode `texts` with torch and with `backend` and compare them.
+    `ok` is True when every pair has cosine similarity >= threshold.
+    """
+    reference = load_model(model_name, "torch").encode(texts, normalize_embeddings=True)
+    candidate = load_model(model_name, backend).encode(texts, normalize_embeddings=True)
+    parity = cosine_parity(np.asarray(reference), np.asarray(candidate))
+    return {"backend": backend, "threshold": threshold, "ok": parity["min"] >= threshold, **parity}
@@ -0,0 +1,180 @@
+"""
+utils/embedding_cache.py
+────────────────────────
+Two-tier cache for query embeddings.
+
+  • Memory — bounded LRU (EMBEDDING_CACHE_SIZE entries)
+  • Disk   — optional SQLite file (EMBEDDING_CACHE_PATH) that survives restarts,
+             bounded LRU too (EMBEDDING_CACHE_DISK_SIZE rows, least recently
+             used pruned first)
+
+Keys are the normalized query text (lowercased, whitespace collapsed) plus the
+model name, so switching models never serves stale vectors.
+
+Disk writes (new vectors and last-used touches) are buffered and committed in
+batches — every EMBEDDING_CACHE_FLUSH_EVERY writes or FLUSH_SECONDS, and at
+exit — on a WAL database with synchronous=NORMAL. The disk has its own lock,
+so memory hits never wait behind it.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH", "")
+EMBEDDING_CACHE_DISK_SIZE = int(os.environ.get("EMBEDDING_CACHE_DISK_SIZE", "20000"))
+EMBEDDING_CACHE_FLUSH_EVERY = int(os.environ.get("EMBEDDING_CACHE_FLUSH_EVERY", "32"))
+
+FLUSH_SECONDS = 5.0
+
+
+def normalize_query(text: str) -> str:
+    """'  Chicken   Shawarma ' → 'chicken shawarma'"""
+    return " ".join((text or "").lower().split())
+
+
+class EmbeddingCache:
+    """Thread-safe LRU over query vectors with an optional bounded SQLite tier."""
+
+    def __init__(
+        self,
+        max_size: int = 2048,
+        path: str = "",
+        disk_size: int = 20000,
+        flush_every: int = 32,
+    ):
+        self.max_size = max_size
+        self.disk_size = disk_size
+        self.flush_every = max(1, flush_every)
+        self._mem: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._pending: Dict[str, Tuple[bytes, float]] = {}  # key → (vector, last_used), not yet written
+        self._flushed_at = time.monotonic()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.disk_pruned = 0
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS query_embeddings ("
+                " key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL DEFAULT 0)"
+            )
+            columns = {r[1] for r in self._db.execute("PRAGMA table_info(query_embeddings)")}
+            if "last_used" not in columns:  # file from before the disk tier was bounded
+                self._db.execute("ALTER TABLE query_embeddings ADD COLUMN last_used REAL NOT NULL DEFAULT 0")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_query_embeddings_last_used"
+                " ON query_embeddings (last_used)"
+            )
+            self._db.commit()
+            atexit.register(self.flush)
+
+    def get(self, key: str) -> Optional[List[float]]:
+        with self._lock:
+            vec = self._mem.get(key)
+            if vec is not None:
+                self._mem.move_to_end(key)
+                self.hits += 1
+                return vec
+
+        if self._db is not None:
+            with self._db_lock:
+                blob = self._pending.get(key, (None, 0.0))[0]
+                if blob is None:
+                    row = self._db.execute(
+                        "SELECT vector FROM query_embeddings WHERE key = ?", (key,)
+                    ).fetchone()
+                    blob = row[0] if row is not None else None
+                if blob is not None:
+                    self._queue_write(key, blob)  # refresh last_used
+            if blob is not None:
+                vec = np.frombuffer(blob, dtype=np.float32).tolist()
+                with self._lock:
+                    self._remember(key, vec)
+                    self.disk_hits += 1
+                return vec
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, vec: List[float]) -> None:
+        with self._lock:
+            self._remember(key, vec)
+        if self._db is not None:
+            with self._db_lock:
+                self._queue_write(key, np.asarray(vec, dtype=np.float32).tobytes())
+
+    def flush(self) -> None:
+        """Write buffered vectors / touches, then prune the disk tier to disk_size."""
+        if self._db is None:
+            return
+        with self._db_lock:
+            self._flush()
+
+    def _queue_write(self, key: str, blob: bytes) -> None:
+        # Caller holds _db_lock.
+        self._pending[key] = (blob, time.time())
+        if len(self._pending) >= self.flush_every or time.monotonic() - self._flushed_at >= FLUSH_SECONDS:
+            self._flush()
+
+    def _flush(self) -> None:
+        # Caller holds _db_lock.
+        self._flushed_at = time.monotonic()
+        if not self._pending:
+            return
+        self._db.executemany(
+            "INSERT OR REPLACE INTO query_embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+            [(k, blob, used) for k, (blob, used) in self._pending.items()],
+        )
+        self._pending.clear()
+        excess = self._db.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0] - self.disk_size
+        if excess > 0:
+            self._db.execute(
+                "DELETE FROM query_embeddings WHERE key IN ("
+                " SELECT key FROM query_embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            self.disk_pruned += excess
+        self._db.commit()
+
+    def _remember(self, key: str, vec: List[float]) -> None:
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.max_size:
+            self._mem.popitem(last=False)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "size": len(self._mem),
+                "max_size": self.max_size,
+                "persistent": self._db is not None,
+                "disk_max_size": self.disk_size if self._db is not None else 0,
+                "disk_pending": len(self._pending),
+                "disk_pruned": self.disk_pruned,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Single shared cache — used by encode_query().
+query_cache = EmbeddingCache(
+    EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_DISK_SIZE, EMBEDDING_CACHE_FLUSH_EVERY
+)
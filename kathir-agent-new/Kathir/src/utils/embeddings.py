@@ -2,23 +2,45 @@
 rag/embeddings.py
 ─────────────────
 Handles:
-  1. Loading the BAAI/bge-m3 SentenceTransformer model (singleton).
+  1. Loading the BAAI/bge-m3 SentenceTransformer model (singleton) with the
+     backend chosen by EMBEDDING_BACKEND (see embedding_backends.py).
   2. Building text documents from meal rows for embedding.
   3. Generating embeddings in batches.
-  4. Upserting embeddings back into the Supabase `meals` table.
+  4. Bulk-writing embeddings back into the Supabase `meals` table.
+  5. Streaming the catalog page by page with a resumable checkpoint.
 
-Run this module directly to (re)embed all meals:
-    python -m rag.embeddings
+Run this module directly to embed new / changed meals:
+    python -m src.utils.embeddings          # incremental (content-hash based)
+    python -m src.utils.embeddings --full   # re-embed every meal
+    python -m src.utils.embeddings --restart  # ignore a crashed run's checkpoint
+    python -m src.utils.embeddings --full --workers 8  # sharded re-index
 """
 
-import torch
+import argparse
+import hashlib
+import json
+import multiprocessing as mp
+import os
+import queue
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator
+
 from sentence_transformers import SentenceTransformer
 
+from src.utils.batch_encoder import EMBEDDING_BATCH_MAX, EMBEDDING_BATCH_WINDOW_MS, BatchEncoder
 from src.utils.db_client import sb
+from src.utils.embedding_backends import EMBEDDING_BACKEND, backend_tag, load_model
+from src.utils.embedding_cache import normalize_query, query_cache
 
 # ── Model singleton ───────────────────────────────────────────────────────────
-_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 _MODEL_NAME = "BAAI/bge-m3"
+# Stored next to each embedding; rows embedded by a different version are redone.
+# Quantized / ONNX vectors differ slightly from torch ones, so the backend is
+# part of it (torch keeps the bare model name rows were first stored under).
+_BACKEND_TAG = backend_tag(EMBEDDING_BACKEND)
+EMBEDDING_MODEL_VERSION = _MODEL_NAME if _BACKEND_TAG == "torch" else f"{_MODEL_NAME}:{_BACKEND_TAG}"
 
 _model: SentenceTransformer | None = None
 
@@ -27,12 +49,16 @@ def get_model() -> SentenceTransformer:
     """Lazy-load the embedding model (loaded once, reused globally)."""
     global _model
     if _model is None:
-        print(f"Loading embedding model '{_MODEL_NAME}' on {_DEVICE} …")
-        _model = SentenceTransformer(_MODEL_NAME, device=_DEVICE, trust_remote_code=True)
+        print(f"Loading embedding model '{_MODEL_NAME}' ({EMBEDDING_BACKEND} backend) …")
+        _model = load_model(_MODEL_NAME, EMBEDDING_BACKEND)
         print("Model loaded.")
     return _model
 
 
+# Concurrent encode_query() misses are merged into one forward pass.
+query_encoder = BatchEncoder(get_model, EMBEDDING_BATCH_WINDOW_MS, EMBEDDING_BATCH_MAX)
+
+
 # ── Text preparation ──────────────────────────────────────────────────────────
 
 def build_meal_text(meal: dict) -> str:
@@ -51,73 +77,415 @@ def build_meal_text(meal: dict) -> str:
     return text or "no description available"
 
 
+def content_hash(text: str) -> str:
+    """Stable fingerprint of an embedding document (sha256 hex)."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
 # ── Embedding pipeline ────────────────────────────────────────────────────────
 
-def fetch_meals_for_embedding() -> list[dict]:
-    """Fetch all meal rows that need to be embedded."""
-    response = sb.table("meals").select(
-        "id, title, description, category, ingredients, allergens"
-    ).execute()
-    return response.data or []
+EMBEDDING_CHECKPOINT_PATH = os.environ.get(
+    "EMBEDDING_CHECKPOINT_PATH", ".cache/embedding_checkpoint.json"
+)
 
+_MEAL_TEXT_COLUMNS = (
+    "id, title, description, category, ingredients, allergens, "
+    "embedding_hash, embedding_model"
+)
 
-def generate_embeddings(texts: list[str], batch_size: int = 16) -> list[list[float]]:
+
+def iter_meal_pages(
+    page_size: int = 200,
+    after_id: str | None = None,
+    until_id: str | None = None,
+) -> Iterator[list[dict]]:
+    """
+    Yield meal rows (text fields + embedding fingerprint) one page at a time,
+    keyset-paginated on id so each page costs the same regardless of depth.
+    `after_id` / `until_id` bound the id range (exclusive / inclusive).
+    """
+    while True:
+        q = sb.table("meals").select(_MEAL_TEXT_COLUMNS).order("id").limit(page_size)
+        if after_id:
+            q = q.gt("id", after_id)
+        if until_id:
+            q = q.lte("id", until_id)
+        page = q.execute().data or []
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after_id = page[-1]["id"]
+
+
+def needs_embedding(meal: dict, text_hash: str) -> bool:
+    """True if the meal is new, its text changed, or it was embedded by another model."""
+    return (
+        meal.get("embedding_hash") != text_hash
+        or meal.get("embedding_model") != EMBEDDING_MODEL_VERSION
+    )
+
+
+def generate_embeddings(
+    texts: list[str],
+    batch_size: int = 16,
+    show_progress: bool = True,
+) -> list[list[float]]:
     """
     Encode a list of strings into normalized embedding vectors.
     Returns a list of plain Python lists (ready for Supabase JSON).
     """
     model = get_model()
-    print(f"Generating embeddings for {len(texts)} texts …")
+    if show_progress:
+        print(f"Generating embeddings for {len(texts)} texts …")
     embeddings = model.encode(
         texts,
         batch_size=batch_size,
-        show_progress_bar=True,
+        show_progress_bar=show_progress,
         normalize_embeddings=True,  # cosine similarity works best with normalized vectors
         convert_to_numpy=True,
     )
-    print(f"Done — shape: {embeddings.shape}")
+    if show_progress:
+        print(f"Done — shape: {embeddings.shape}")
     return [emb.tolist() for emb in embeddings]
 
 
-def upsert_embeddings(ids: list[str], embeddings: list[list[float]]) -> int:
+def _write_chunk(rows: list[dict], max_retries: int) -> tuple[int, int]:
     """
-    Write each embedding vector back to the matching meal row.
-    Returns the count of successfully updated rows.
+    Write one chunk through the update_meal_embeddings RPC, retrying with
+    exponential backoff. Returns (rows_updated, retries_used); raises after
+    the last failed attempt.
+    """
+    for attempt in range(max_retries + 1):
+        try:
+            res = sb.rpc("update_meal_embeddings", {"payload": rows}).execute()
+            return int(res.data or 0), attempt
+        except Exception:
+            if attempt == max_retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.25))
+    return 0, max_retries
+
+
+def upsert_embeddings(
+    ids: list[str],
+    embeddings: list[list[float]],
+    hashes: list[str] | None = None,
+    chunk_size: int = 100,
+    workers: int = 4,
+    max_retries: int = 3,
+) -> dict:
+    """
+    Write embedding vectors back to their meal rows in bulk.
+
+    Rows are split into chunks of `chunk_size`; each chunk is one
+    update_meal_embeddings RPC call. Up to `workers` chunks are in flight at
+    once, and failed chunks are retried with exponential backoff.
+
+    Returns a summary dict: updated, failed, failed_ids, chunks, retries, seconds.
     """
-    updated = 0
+    rows = []
     for i, (meal_id, emb) in enumerate(zip(ids, embeddings)):
-        result = sb.table("meals").update({"embedding": emb}).eq("id", meal_id).execute()
-        if result.data:
-            updated += 1
-            print(f"✓ {i + 1}/{len(ids)} → {meal_id}")
-        else:
-            print(f"✗ Failed: {meal_id}")
-    return updated
+        row = {"id": meal_id, "embedding": emb}
+        if hashes is not None:
+            row["embedding_hash"] = hashes[i]
+            row["embedding_model"] = EMBEDDING_MODEL_VERSION
+        rows.append(row)
+    chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+
+    report = {"updated": 0, "failed": 0, "failed_ids": [], "chunks": len(chunks), "retries": 0}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = {pool.submit(_write_chunk, chunk, max_retries): chunk for chunk in chunks}
+        for fut in as_completed(futures):
+            chunk = futures[fut]
+            try:
+                updated, retries = fut.result()
+                report["updated"] += updated
+                report["retries"] += retries
+            except Exception as exc:
+                report["failed"] += len(chunk)
+                report["failed_ids"].extend(r["id"] for r in chunk)
+                report["retries"] += max_retries
+                print(f"✗ Chunk of {len(chunk)} failed after {max_retries} retries: {exc}")
+    report["seconds"] = round(time.perf_counter() - started, 2)
+    return report
 
 
 def encode_query(query: str) -> list[float]:
-    """Encode a single query string into a normalized embedding vector."""
-    model = get_model()
-    return model.encode(query, normalize_embeddings=True).tolist()
+    """
+    Encode a single query string into a normalized embedding vector.
+    Repeated queries (after lowercasing / whitespace folding) are served from
+    the query cache instead of running the model again.
+    """
+    text = normalize_query(query)
+    key = f"{_MODEL_NAME}:{_BACKEND_TAG}|{text}"
+    cached = query_cache.get(key)
+    if cached is not None:
+        return cached
+
+    emb = query_encoder.encode(text)
+    query_cache.put(key, emb)
+    return emb
 
 
 # ── Entry point ───────────────────────────────────────────────────────────────
 
-def run_embedding_pipeline() -> None:
-    """Fetch all meals, embed them, and persist back to Supabase."""
-    meals = fetch_meals_for_embedding()
-    if not meals:
+def embed_page(page: list[dict], full: bool = False) -> dict:
+    """
+    Encode and write the meals in one page that need (re-)embedding.
+
+    A meal is re-encoded only when the sha256 of build_meal_text(meal) differs
+    from its stored embedding_hash or it was embedded by another model
+    version; `full=True` re-encodes the whole page.
+    Returns the page's upsert report plus an `embedded` count.
+    """
+    texts, ids, hashes = [], [], []
+    for m in page:
+        text = build_meal_text(m)
+        text_hash = content_hash(text)
+        if full or needs_embedding(m, text_hash):
+            texts.append(text)
+            ids.append(m["id"])
+            hashes.append(text_hash)
+
+    if not ids:
+        return {"embedded": 0, "updated": 0, "failed": 0, "failed_ids": [], "retries": 0}
+    report = upsert_embeddings(ids, generate_embeddings(texts, show_progress=False), hashes)
+    return {"embedded": len(ids), **report}
+
+
+def _new_totals() -> dict:
+    return {"seen": 0, "embedded": 0, "updated": 0, "failed_ids": [], "retries": 0}
+
+
+def _load_checkpoint() -> dict | None:
+    try:
+        with open(EMBEDDING_CHECKPOINT_PATH) as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def _save_checkpoint(state: dict) -> None:
+    os.makedirs(os.path.dirname(EMBEDDING_CHECKPOINT_PATH) or ".", exist_ok=True)
+    tmp = EMBEDDING_CHECKPOINT_PATH + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, EMBEDDING_CHECKPOINT_PATH)
+
+
+def _clear_checkpoint() -> None:
+    if os.path.exists(EMBEDDING_CHECKPOINT_PATH):
+        os.remove(EMBEDDING_CHECKPOINT_PATH)
+
+
+def run_embedding_pipeline(full: bool = False, page_size: int = 200, restart: bool = False) -> None:
+    """
+    Stream meals page by page: fetch → embed changed rows → write → checkpoint.
+
+    Only one page of rows and vectors is held in memory at a time. After each
+    page the last meal id is saved to EMBEDDING_CHECKPOINT_PATH, so a crashed
+    run picks up after that page next time (pass `restart=True` to ignore the
+    checkpoint). Meals that failed to write keep their old hash and are
+    retried on the next run.
+    """
+    totals = _new_totals()
+    after_id = None
+
+    checkpoint = None if restart else _load_checkpoint()
+    if checkpoint and "shards" in checkpoint:
+        print("Found a sharded run's checkpoint — resuming it with its own worker count.")
+        run_sharded_pipeline(len(checkpoint["shards"]), full=full, page_size=page_size)
+        return
+    if checkpoint:
+        after_id = checkpoint["after_id"]
+        full = full or checkpoint["full"]
+        totals = checkpoint["totals"]
+        print(f"Resuming from checkpoint after meal {after_id} ({totals['seen']} meals done).")
+
+    started = time.perf_counter()
+    for page in iter_meal_pages(page_size, after_id):
+        report = embed_page(page, full)
+        totals["seen"] += len(page)
+        totals["embedded"] += report["embedded"]
+        totals["updated"] += report["updated"]
+        totals["retries"] += report["retries"]
+        totals["failed_ids"].extend(report["failed_ids"])
+        _save_checkpoint({"after_id": page[-1]["id"], "full": full, "totals": totals})
+        print(f"… {totals['seen']} meals scanned, {totals['embedded']} embedded")
+
+    if not totals["seen"]:
+        print("No meals found — check your Supabase credentials or table.")
+    _clear_checkpoint()
+
+    print(
+        f"\nEmbedding pipeline complete — {totals['seen']} meals scanned, "
+        f"{totals['embedded']} embedded, {totals['updated']} updated, "
+        f"{totals['retries']} retries, {time.perf_counter() - started:.1f}s."
+    )
+    if totals["failed_ids"]:
+        print(f"✗ {len(totals['failed_ids'])} meals failed: {', '.join(totals['failed_ids'])}")
+
+
+# ── Multi-process re-index ────────────────────────────────────────────────────
+
+def _shard_ranges(workers: int, after_id: str | None = None) -> list[tuple[str | None, str]]:
+    """Split the meal ids after `after_id` into `workers` contiguous (after_id, until_id] ranges."""
+    ids: list[str] = []
+    last = after_id
+    while True:
+        q = sb.table("meals").select("id").order("id").limit(1000)
+        if last:
+            q = q.gt("id", last)
+        page = [r["id"] for r in (q.execute().data or [])]
+        if not page:
+            break
+        ids.extend(page)
+        last = page[-1]
+    if not ids:
+        return []
+
+    size = -(-len(ids) // workers)  # ceil
+    ranges = []
+    for start in range(0, len(ids), size):
+        after = ids[start - 1] if start else after_id
+        ranges.append((after, ids[min(start + size, len(ids)) - 1]))
+    return ranges
+
+
+def _plan_shards(workers: int, full: bool, restart: bool) -> tuple[list[dict], bool]:
+    """
+    Return the shards ({after_id, until_id, totals}) and `full` flag for a run.
+
+    A sharded checkpoint is resumed shard by shard, keeping its own shard
+    count. A checkpoint left by a single-process run is resumed by sharding
+    the ids it had not reached yet. `restart=True` ignores either kind.
+    """
+    checkpoint = None if restart else _load_checkpoint()
+    if checkpoint and "shards" in checkpoint:
+        done = sum(s["totals"]["seen"] for s in checkpoint["shards"])
+        print(f"Resuming {len(checkpoint['shards'])} shard(s) from checkpoint ({done} meals done).")
+        return checkpoint["shards"], full or checkpoint["full"]
+
+    after_id, totals = None, _new_totals()
+    if checkpoint:
+        after_id, totals = checkpoint["after_id"], checkpoint["totals"]
+        full = full or checkpoint["full"]
+        print(f"Resuming from checkpoint after meal {after_id} ({totals['seen']} meals done).")
+    shards = [
+        {"after_id": after, "until_id": until, "totals": _new_totals()}
+        for after, until in _shard_ranges(workers, after_id)
+    ]
+    if shards:
+        shards[0]["totals"] = totals  # carries a single-process run's counts
+    return shards, full
+
+
+def _init_shard_worker(threads: int) -> None:
+    """Pool initializer: pin intra-op threads and load the model once per process."""
+    import torch
+
+    torch.set_num_threads(threads)
+    get_model()
+
+
+def _embed_shard(args: tuple) -> dict:
+    shard, after_id, until_id, totals, full, page_size, progress = args
+    for page in iter_meal_pages(page_size, after_id, until_id):
+        report = embed_page(page, full)
+        totals["seen"] += len(page)
+        totals["embedded"] += report["embedded"]
+        totals["updated"] += report["updated"]
+        totals["retries"] += report["retries"]
+        totals["failed_ids"].extend(report["failed_ids"])
+        progress.put((shard, page[-1]["id"], totals))
+    return totals
+
+
+def _run_shards(shards: list[dict], full: bool, page_size: int, start_method: str) -> None:
+    """Embed every unfinished shard in its own process, checkpointing each page."""
+    pending = [i for i, s in enumerate(shards) if s["after_id"] != s["until_id"]]
+    if not pending:
+        return
+    threads = max(1, (os.cpu_count() or 1) // len(pending))
+    print(f"Embedding with {len(pending)} worker(s) × {threads} thread(s) …")
+
+    ctx = mp.get_context(start_method)
+    started = time.perf_counter()
+    seen_before = sum(s["totals"]["seen"] for s in shards)
+    with ctx.Manager() as manager:
+        progress = manager.Queue()
+        with ctx.Pool(len(pending), initializer=_init_shard_worker, initargs=(threads,)) as pool:
+            jobs = [
+                (i, shards[i]["after_id"], shards[i]["until_id"], shards[i]["totals"], full, page_size, progress)
+                for i in pending
+            ]
+            result = pool.map_async(_embed_shard, jobs)
+
+            while not result.ready() or not progress.empty():
+                try:
+                    shard, last_id, totals = progress.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                shards[shard].update(after_id=last_id, totals=totals)
+                _save_checkpoint({"full": full, "shards": shards})
+                seen = sum(s["totals"]["seen"] for s in shards)
+                embedded = sum(s["totals"]["embedded"] for s in shards)
+                rate = (seen - seen_before) / (time.perf_counter() - started)
+                print(f"\r… {seen} meals scanned, {embedded} embedded ({rate:.1f}/s)", end="", flush=True)
+            result.get()
+
+
+def run_sharded_pipeline(
+    workers: int,
+    full: bool = False,
+    page_size: int = 200,
+    restart: bool = False,
+    start_method: str = "spawn",
+) -> None:
+    """
+    Re-index with `workers` processes. Meal ids are split into contiguous
+    ranges, each process loads the model once and streams its own range
+    (fetch → embed → write), and the parent prints one combined progress line.
+
+    The parent saves every shard's last written id to
+    EMBEDDING_CHECKPOINT_PATH, so a crashed run resumes each shard where it
+    stopped (pass `restart=True` to ignore the checkpoint). Workers are
+    spawned by default; `start_method="fork"` hands them the parent's
+    module state instead (used by the tests and the scaling benchmark).
+    """
+    started = time.perf_counter()
+    shards, full = _plan_shards(workers, full, restart)
+    if not shards:
+        _clear_checkpoint()
         print("No meals found — check your Supabase credentials or table.")
         return
 
-    print(f"Found {len(meals)} meals.")
-    texts = [build_meal_text(m) for m in meals]
-    ids = [m["id"] for m in meals]
+    _run_shards(shards, full, page_size, start_method)
+    _clear_checkpoint()
 
-    embeddings = generate_embeddings(texts)
-    count = upsert_embeddings(ids, embeddings)
-    print(f"\nEmbedding pipeline complete — {count}/{len(meals)} meals updated.")
+    totals = [s["totals"] for s in shards]
+    failed_ids = [mid for t in totals for mid in t["failed_ids"]]
+    print(
+        f"\nEmbedding pipeline complete — {sum(t['seen'] for t in totals)} meals scanned, "
+        f"{sum(t['embedded'] for t in totals)} embedded, "
+        f"{sum(t['updated'] for t in totals)} updated, "
+        f"{sum(t['retries'] for t in totals)} retries, {time.perf_counter() - started:.1f}s."
+    )
+    if failed_ids:
+        print(f"✗ {len(failed_ids)} meals failed: {', '.join(failed_ids)}")
 
 
 if __name__ == "__main__":
-    run_embedding_pipeline()
+    parser = argparse.ArgumentParser(description="Embed meals into Supabase.")
+    parser.add_argument("--full", action="store_true", help="re-embed every meal, ignoring content hashes")
+    parser.add_argument("--page-size", type=int, default=200, help="meals fetched and written per page")
+    parser.add_argument("--restart", action="store_true", help="ignore any saved checkpoint")
+    parser.add_argument("--workers", type=int, default=1, help="shard the catalog across N processes")
+    args = parser.parse_args()
+    if args.workers > 1:
+        run_sharded_pipeline(args.workers, full=args.full, page_size=args.page_size, restart=args.restart)
+    else:
+        run_embedding_pipeline(full=args.full, page_size=args.page_size, restart=args.restart)
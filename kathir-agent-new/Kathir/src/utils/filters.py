@@ -1,4 +1,30 @@
-from typing import Any, Dict, List, Optional
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+def normalize_allergens(items: Optional[List[str]]) -> List[str]:
+    """Lowercase, trim and de-duplicate — mirrors public.normalize_allergens()."""
+    return sorted({a.strip().lower() for a in (items or []) if a and a.strip()})
+
+
+def push_allergen_filters(
+    q: Any,
+    exclude_allergens: Optional[List[str]],
+    require_allergens: Optional[List[str]],
+) -> Any:
+    """
+    Add allergen constraints to a Supabase `meals` query builder so they run
+    in the database against the GIN-indexed `allergens_normalized` column:
+      exclude → NOT (allergens_normalized && {…})
+      require → allergens_normalized @> {…}
+    """
+    exclude = normalize_allergens(exclude_allergens)
+    require = normalize_allergens(require_allergens)
+    if exclude:
+        q = q.not_.ov("allergens_normalized", exclude)
+    if require:
+        q = q.contains("allergens_normalized", require)
+    return q
 
 
 def apply_allergen_filters(
@@ -14,6 +40,9 @@ def apply_allergen_filters(
     require_allergens: meals must contain ALL of these allergens (rare use-case).
 
     The `allergens` column is expected to be a list of lowercase strings on each row.
+
+    Queries already push these constraints into SQL (push_allergen_filters);
+    this stays as a safety net for rows from paths that cannot.
     """
     if not exclude_allergens and not require_allergens:
         return rows
@@ -33,3 +62,41 @@ def apply_allergen_filters(
         out.append(row)
 
     return out
+
+
+def catalog_filter(
+    rids: List[str],
+    min_price: Optional[float],
+    max_price: Optional[float],
+    category: Optional[str],
+    exclude_allergens: Optional[List[str]] = None,
+    require_allergens: Optional[List[str]] = None,
+) -> Callable[[Dict[str, Any]], bool]:
+    """
+    Predicate over in-process catalog metadata (utils/meal_catalog.py) that
+    mirrors the tools' `meals` query filters, so candidates can be filtered
+    before paging and every one an index returns survives hydration.
+    """
+    now = time.time()
+    rid_set = set(rids)
+    exclude = set(normalize_allergens(exclude_allergens))
+    require = set(normalize_allergens(require_allergens))
+
+    def keep(meta: Dict[str, Any]) -> bool:
+        if meta["expiry"] <= now:
+            return False
+        if rid_set and meta["restaurant_id"] not in rid_set:
+            return False
+        if max_price is not None and meta["price"] > float(max_price):
+            return False
+        if min_price is not None and meta["price"] < float(min_price):
+            return False
+        if category and meta["category"] != category:
+            return False
+        if exclude & meta["allergens"]:
+            return False
+        if require and not require <= meta["allergens"]:
+            return False
+        return True
+
+    return keep
@@ -1,5 +1,20 @@
 from typing import Any, Dict
 
+from src.utils.restaurant_directory import restaurant_directory
+
+
+def restaurant_name_for(row: Dict[str, Any]) -> str:
+    """
+    Restaurant name for a meal row: an embedded `restaurants` object or a
+    `restaurant_name` column if the row has one (e.g. from an RPC), otherwise
+    the in-process restaurant directory keyed by restaurant_id.
+    """
+    if isinstance(row.get("restaurants"), dict):
+        return row["restaurants"].get("restaurant_name", "Unknown Restaurant")
+    if row.get("restaurant_name"):
+        return row["restaurant_name"]
+    return restaurant_directory.name_for(row.get("restaurant_id")) or "Unknown Restaurant"
+
 
 def format_meal_row(row: Dict[str, Any], score_map: Dict[str, float] = {}) -> Dict[str, Any]:
     """
@@ -9,12 +24,7 @@ def format_meal_row(row: Dict[str, Any], score_map: Dict[str, float] = {}) -> Di
     Note: restaurant_id is excluded for security - only restaurant_name is exposed.
     score_map: optional {meal_id: similarity_score} from a vector search call.
     """
-    # Extract restaurant name from nested object or use fallback
-    restaurant_name = "Unknown Restaurant"
-    if isinstance(row.get("restaurants"), dict):
-        restaurant_name = row["restaurants"].get("restaurant_name", "Unknown Restaurant")
-    elif row.get("restaurant_name"):
-        restaurant_name = row["restaurant_name"]
+    restaurant_name = restaurant_name_for(row)
     
     return {
         "id": row["id"],
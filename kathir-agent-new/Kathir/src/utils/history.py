@@ -0,0 +1,266 @@
+"""
+utils/history.py
+────────────────
+Token-budgeted conversation history for the agent (a LangGraph pre_model_hook).
+
+  trim_history(state) — what the LLM sees on each call:
+                          [summary of older turns] + last AGENT_HISTORY_TURNS turns
+  HistoryState        — agent state with the rolling summary alongside messages
+  history_stats()     — running token counters for /metrics
+
+The stored thread is never rewritten; only the model input is. For each call:
+  • the turn in progress (latest user message onward) is always sent in full
+  • earlier kept turns have their tool payloads replaced by one-line stubs
+  • turns older than that are folded into an extractive rolling summary that
+    is stored in state and only ever extended, so each turn is summarized once
+  • if the result is still over AGENT_HISTORY_TOKEN_BUDGET, the oldest kept
+    turns are folded too, then the summary is cut from its oldest end
+
+Token counts are approximate (chars / 4) — enough to bound cost and latency.
+"""
+
+import json
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+
+from langchain_core.messages import (
+    AIMessage,
+    BaseMessage,
+    HumanMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langgraph.prebuilt.chat_agent_executor import AgentState
+from typing_extensions import NotRequired
+
+from src.prompts import BASE_SYSTEM_PROMPT
+
+AGENT_HISTORY_TURNS = int(os.environ.get("AGENT_HISTORY_TURNS", "4"))
+AGENT_HISTORY_TOKEN_BUDGET = int(os.environ.get("AGENT_HISTORY_TOKEN_BUDGET", "6000"))
+AGENT_SUMMARY_MAX_CHARS = int(os.environ.get("AGENT_SUMMARY_MAX_CHARS", "2000"))
+
+_SNIPPET_CHARS = 160
+_CONTEXT_PREFIX = re.compile(r"^\[context:[^\]]*\]\s*")
+_SUMMARY_HEADER = "Summary of earlier conversation (oldest first):\n"
+_SYSTEM_TOKENS = len(BASE_SYSTEM_PROMPT) // 4
+
+Turn = List[BaseMessage]
+
+
+class HistoryState(AgentState):
+    """AgentState plus the rolling summary: {"through": last folded message id, "text": ...}."""
+    history_summary: NotRequired[Dict[str, str]]
+
+
+# ── Token accounting ──────────────────────────────────────────────────────────
+
+def _text(message: BaseMessage) -> str:
+    content = message.content
+    if isinstance(content, list):
+        content = " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in content
+        )
+    return content or ""
+
+
+def estimate_tokens(messages: List[BaseMessage]) -> int:
+    total = 0
+    for m in messages:
+        total += 4 + len(_text(m)) // 4
+        for call in getattr(m, "tool_calls", None) or []:
+            total += len(json.dumps(call.get("args") or {}, default=str)) // 4 + 8
+    return total
+
+
+class _Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.tokens_in = 0    # what the full thread would have cost
+        self.tokens_out = 0   # what was actually sent
+        self.max_tokens_out = 0
+
+    def record(self, tokens_in: int, tokens_out: int) -> None:
+        with self._lock:
+            self.calls += 1
+            self.tokens_in += tokens_in
+            self.tokens_out += tokens_out
+            self.max_tokens_out = max(self.max_tokens_out, tokens_out)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "model_calls": self.calls,
+                "avg_thread_tokens": round(self.tokens_in / self.calls) if self.calls else 0,
+                "avg_sent_tokens": round(self.tokens_out / self.calls) if self.calls else 0,
+                "max_sent_tokens": self.max_tokens_out,
+                "token_budget": AGENT_HISTORY_TOKEN_BUDGET,
+            }
+
+
+_stats = _Stats()
+
+
+def history_stats() -> Dict[str, Any]:
+    return _stats.stats()
+
+
+# ── Turns, stubs and summary lines ────────────────────────────────────────────
+
+def _split_turns(messages: List[BaseMessage]) -> List[Turn]:
+    """Group messages into turns, each starting at a user message."""
+    turns: List[Turn] = []
+    for m in messages:
+        if isinstance(m, HumanMessage) or not turns:
+            turns.append([m])
+        else:
+            turns[-1].append(m)
+    return turns
+
+
+def _snippet(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= _SNIPPET_CHARS else text[: _SNIPPET_CHARS - 1] + "…"
+
+
+def _payload(message: BaseMessage) -> Optional[Dict[str, Any]]:
+    try:
+        data = json.loads(_text(message))
+    except (TypeError, ValueError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _tool_stub(message: ToolMessage) -> ToolMessage:
+    """A one-line stand-in for an old tool result (keeps tool_call_id pairing intact)."""
+    data = _payload(message)
+    parts = [f"{message.name or 'tool'} result trimmed from history"]
+    if data is not None:
+        parts.append(f"ok={data.get('ok')}")
+        for key in ("count", "n", "total", "error", "err"):
+            if data.get(key) is not None:
+                parts.append(f"{key}={data[key]}")
+        rows = data.get("results") or data.get("meals") or data.get("items") or []
+        refs = [
+            f"{r.get('id') or r.get('meal_id') or r.get('h')}:{str(r.get('title') or r.get('t') or '')[:30]}"
+            for r in rows[:5]
+            if isinstance(r, dict) and (r.get("id") or r.get("meal_id") or r.get("h"))
+        ]
+        if refs:
+            parts.append("rows=" + ", ".join(refs))
+    return ToolMessage(
+        content="[" + "; ".join(parts) + "]",
+        tool_call_id=message.tool_call_id,
+        name=message.name,
+        id=message.id,
+        artifact=message.artifact,
+    )
+
+
+def _reply_text(message: AIMessage) -> str:
+    """The user-facing part of an agent reply (the `message` field of its JSON)."""
+    text = _text(message).strip()
+    if text.startswith("```"):
+        text = text.strip("`").removeprefix("json").strip()
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict) and data.get("message"):
+            return str(data["message"])
+    except ValueError:
+        pass
+    return text
+
+
+def _summarize_turn(turn: Turn) -> List[str]:
+    lines: List[str] = []
+    for m in turn:
+        if isinstance(m, HumanMessage):
+            lines.append("User: " + _snippet(_CONTEXT_PREFIX.sub("", _text(m))))
+        elif isinstance(m, ToolMessage):
+            data = _payload(m) or {}
+            rows = data.get("results") or data.get("meals") or data.get("items") or []
+            count = data.get("count", data.get("n", len(rows)))
+            lines.append(f"  {m.name}: ok={data.get('ok')}, {count} rows")
+        elif isinstance(m, AIMessage):
+            for call in m.tool_calls or []:
+                args = ", ".join(f"{k}={v}" for k, v in (call.get("args") or {}).items() if v not in (None, "", []))
+                lines.append("  called " + _snippet(f"{call['name']}({args})"))
+            reply = _reply_text(m)
+            if reply and not m.tool_calls:
+                lines.append("Boss: " + _snippet(reply))
+    return lines
+
+
+def _fold(summary: str, turns: List[Turn]) -> str:
+    lines = summary.splitlines() if summary else []
+    for turn in turns:
+        lines.extend(_summarize_turn(turn))
+    text = "\n".join(lines)
+    while len(text) > AGENT_SUMMARY_MAX_CHARS and "\n" in text:
+        text = text.split("\n", 1)[1]
+    return text[-AGENT_SUMMARY_MAX_CHARS:]
+
+
+# ── The hook ──────────────────────────────────────────────────────────────────
+
+def _unfolded(turns: List[Turn], through: str) -> List[Turn]:
+    """Turns after the one containing message id `through` (all if not found)."""
+    if not through:
+        return turns
+    for i, turn in enumerate(turns):
+        if any(m.id == through for m in turn):
+            return turns[i + 1:]
+    return turns
+
+
+def _assemble(summary: str, kept: List[Turn]) -> List[BaseMessage]:
+    out: List[BaseMessage] = []
+    if summary:
+        out.append(SystemMessage(content=_SUMMARY_HEADER + summary))
+    for i, turn in enumerate(kept):
+        current = i == len(kept) - 1
+        for m in turn:
+            out.append(m if current or not isinstance(m, ToolMessage) else _tool_stub(m))
+    return out
+
+
+def trim_history(state: Dict[str, Any]) -> Dict[str, Any]:
+    """pre_model_hook: bounded model input plus the updated rolling summary."""
+    messages: List[BaseMessage] = state["messages"]
+    previous = state.get("history_summary") or {}
+    summary, through = previous.get("text", ""), previous.get("through", "")
+
+    turns = _unfolded(_split_turns(messages), through)
+    split = max(len(turns) - max(AGENT_HISTORY_TURNS, 1), 0)
+    if split:
+        summary = _fold(summary, turns[:split])
+        through = turns[split - 1][-1].id or through
+    kept = turns[split:]
+
+    llm_input = _assemble(summary, kept)
+    while len(kept) > 1 and estimate_tokens(llm_input) + _SYSTEM_TOKENS > AGENT_HISTORY_TOKEN_BUDGET:
+        summary = _fold(summary, kept[:1])
+        through = kept[0][-1].id or through
+        kept = kept[1:]
+        llm_input = _assemble(summary, kept)
+
+    budget_chars = max((AGENT_HISTORY_TOKEN_BUDGET - _SYSTEM_TOKENS - estimate_tokens(llm_input[1:])) * 4, 0)
+    if summary and len(summary) > budget_chars:
+        summary = summary[-budget_chars:].split("\n", 1)[-1] if budget_chars else ""
+        llm_input = _assemble(summary, kept)
+
+    tokens_in = estimate_tokens(messages) + _SYSTEM_TOKENS
+    tokens_out = estimate_tokens(llm_input) + _SYSTEM_TOKENS
+    _stats.record(tokens_in, tokens_out)
+    print(
+        f"History: {len(messages)} msgs / ~{tokens_in} tok → "
+        f"{len(llm_input)} msgs / ~{tokens_out} tok "
+        f"({len(kept)} turns kept, summary {len(summary)} chars)"
+    )
+
+    update: Dict[str, Any] = {"llm_input_messages": llm_input}
+    if through != previous.get("through", "") or summary != previous.get("text", ""):
+        update["history_summary"] = {"through": through, "text": summary}
+    return update
@@ -0,0 +1,152 @@
+"""
+utils/lexical_index.py
+──────────────────────
+In-process BM25 keyword index over meal text (Arabic + English).
+
+  tokenize(text)       — normalized tokens used for both documents and queries
+  BM25Index            — incremental inverted index with Okapi BM25 scoring
+  reciprocal_rank_fusion(rankings) — merge several ranked id lists into one
+
+Arabic normalization folds the spelling variants people actually type:
+diacritics and tatweel are dropped, أ/إ/آ → ا, ى → ي, ة → ه, and a leading
+"ال" is stripped from longer words. English tokens are lowercased with a
+light plural strip ("cakes" → "cake").
+"""
+
+import math
+import re
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_AR_DIACRITICS = re.compile("[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]")
+_AR_FOLD = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا", "ى": "ي", "ة": "ه", "ؤ": "و", "ئ": "ي"})
+
+_STOPWORDS = {
+    # English
+    "a", "an", "and", "the", "of", "with", "in", "on", "for", "to", "or", "at", "by", "from",
+    "some", "any", "me", "i", "want", "show", "find", "get",
+    # Arabic
+    "و", "في", "من", "على", "مع", "او", "الى", "عن", "ب", "ل",
+}
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def _stem(token: str) -> str:
+    if token.isascii():
+        if len(token) > 4 and token.endswith("ies"):
+            return token[:-3] + "y"
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            return token[:-1]
+        return token
+    if len(token) > 4 and token.startswith("ال"):
+        return token[2:]
+    return token
+
+
+def tokenize(text: str) -> List[str]:
+    text = _AR_DIACRITICS.sub("", (text or "").lower()).translate(_AR_FOLD)
+    return [_stem(t) for t in _TOKEN_RE.findall(text) if t not in _STOPWORDS]
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a mutable document set.
+
+    Term frequencies are kept per document so upsert/remove can adjust the
+    postings and corpus statistics in place — no rebuild needed.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs: Dict[str, Dict[str, int]] = {}     # doc_id → {term: tf}
+        self._lens: Dict[str, int] = {}
+        self._meta: Dict[str, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}  # term → {doc_id: tf}
+        self._total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def meta(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        return self._meta.get(doc_id)
+
+    def ids(self) -> List[str]:
+        with self._lock:
+            return list(self._docs)
+
+    def upsert(self, doc_id: str, tokens: Iterable[str], meta: Optional[Dict[str, Any]] = None) -> None:
+        tf: Dict[str, int] = {}
+        for t in tokens:
+            tf[t] = tf.get(t, 0) + 1
+        with self._lock:
+            self.remove(doc_id)
+            self._docs[doc_id] = tf
+            self._lens[doc_id] = sum(tf.values())
+            self._meta[doc_id] = meta or {}
+            self._total_len += self._lens[doc_id]
+            for term, count in tf.items():
+                self._postings.setdefault(term, {})[doc_id] = count
+
+    def remove(self, doc_id: str) -> None:
+        with self._lock:
+            tf = self._docs.pop(doc_id, None)
+            if tf is None:
+                return
+            self._total_len -= self._lens.pop(doc_id)
+            self._meta.pop(doc_id, None)
+            for term in tf:
+                posting = self._postings.get(term)
+                if posting is not None:
+                    posting.pop(doc_id, None)
+                    if not posting:
+                        del self._postings[term]
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        predicate: Optional[Predicate] = None,
+    ) -> List[Tuple[str, float]]:
+        """Top-k (doc_id, bm25_score) for `query`, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._docs)
+            if not n or not terms:
+                return []
+            avgdl = self._total_len / n
+            scores: Dict[str, float] = {}
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._lens[doc_id] / avgdl)
+                    scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            ranked = sorted(scores.items(), key=lambda x: -x[1])
+            if predicate is None:
+                return ranked[:k]
+            out = []
+            for doc_id, score in ranked:
+                if predicate(self._meta[doc_id]):
+                    out.append((doc_id, score))
+                    if len(out) >= k:
+                        break
+            return out
+
+
+def reciprocal_rank_fusion(rankings: Iterable[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    Reciprocal rank fusion: score(d) = Σ 1 / (k + rank_i(d)) over every list
+    that contains d. Returns (id, fused_score), best first.
+    """
+    fused: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] = fused.get(doc_id, 0.0) + 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: -x[1])
@@ -0,0 +1,242 @@
+"""
+utils/meal_catalog.py
+─────────────────────
+In-process copies of the active meal catalog used for retrieval.
+
+  get_meal_index()     — VectorIndex over meal embeddings (None unless VECTOR_SEARCH_BACKEND=local)
+  get_lexical_index()  — BM25Index over title / description / category / ingredients
+  wait_for_catalog()   — the BM25 index, waiting (bounded) for the first load
+  refresh_catalog()    — pull rows changed since the last refresh (or reload everything)
+  start_catalog_refresher() — background thread: initial load + periodic refresh
+  on_meals_changed(cb)  — called with (changed ids, relisted ids) after each
+                          refresh (None, [] after a full reload: anything may
+                          have changed)
+
+Both indexes are fed by the same paged read of `meals`, so they always agree
+on which meals are live. Incremental refreshes follow the updated_at cursor;
+a periodic full reload drops deleted meals.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Literal, Optional
+
+import numpy as np
+
+from src.utils.db_client import sb
+from src.utils.lexical_index import BM25Index, tokenize
+from src.utils.time_utils import now_iso
+from src.utils.vector_index import VectorIndex, parse_embedding
+
+# ── Config ────────────────────────────────────────────────────────────────────
+VECTOR_SEARCH_BACKEND: Literal["local", "rpc"] = os.environ.get(
+    "VECTOR_SEARCH_BACKEND", "local"
+)  # type: ignore[assignment]
+REFRESH_SECONDS = float(os.environ.get("VECTOR_INDEX_REFRESH_SECONDS", "60"))
+FULL_RELOAD_SECONDS = float(os.environ.get("VECTOR_INDEX_FULL_RELOAD_SECONDS", "3600"))
+# How long a search waits for the first catalog load before it gives up on it
+CATALOG_WAIT_SECONDS = float(os.environ.get("CATALOG_WAIT_SECONDS", "10"))
+
+_PAGE_SIZE = 500
+_TITLE_WEIGHT = 2  # title tokens are repeated so a title hit outranks a description hit
+
+_CATALOG_COLUMNS = (
+    "id, title, description, category, ingredients, restaurant_id, discounted_price, "
+    "allergens, status, quantity_available, expiry_date, updated_at"
+)
+
+# ── State ─────────────────────────────────────────────────────────────────────
+_meal_index: Optional[VectorIndex] = None
+_lexical_index: Optional[BM25Index] = None
+_cursor: str = ""  # max updated_at seen so far
+_last_full_load = 0.0
+_refresh_lock = threading.Lock()
+_refresher: Optional[threading.Thread] = None
+_loaded = threading.Event()
+_listeners: List[Callable[[Optional[List[str]], List[str]], None]] = []
+
+
+def on_meals_changed(callback: Callable[[Optional[List[str]], List[str]], None]) -> None:
+    """
+    Register a listener for catalog changes (e.g. result-cache invalidation).
+    It gets the changed meal ids and, of those, the relisted ones: meals that
+    became live (new, back in stock, reactivated) or changed a field searches
+    filter on (price, category, restaurant, allergens, expiry), so they may
+    now belong to results that did not contain them before.
+    """
+    _listeners.append(callback)
+
+
+def _notify(meal_ids: Optional[List[str]], relisted: List[str]) -> None:
+    for callback in _listeners:
+        try:
+            callback(meal_ids, relisted)
+        except Exception as exc:
+            print(f"Meal catalog listener failed: {exc}")
+
+
+def _parse_ts(value: Optional[str]) -> float:
+    if not value:
+        return 0.0
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def _columns() -> str:
+    if VECTOR_SEARCH_BACKEND == "local":
+        return _CATALOG_COLUMNS + ", embedding"
+    return _CATALOG_COLUMNS
+
+
+def _row_meta(row: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": row["id"],
+        "restaurant_id": row.get("restaurant_id"),
+        "price": float(row.get("discounted_price") or 0),
+        "category": row.get("category"),
+        "allergens": frozenset(a.strip().lower() for a in (row.get("allergens") or [])),
+        "expiry": _parse_ts(row.get("expiry_date")),
+    }
+
+
+def _row_tokens(row: Dict[str, Any]) -> List[str]:
+    ingredients = row.get("ingredients") or []
+    if isinstance(ingredients, list):
+        ingredients = " ".join(str(i) for i in ingredients)
+    body = " ".join(filter(None, [row.get("description"), row.get("category"), ingredients]))
+    return tokenize(row.get("title") or "") * _TITLE_WEIGHT + tokenize(body)
+
+
+def _is_live(row: Dict[str, Any]) -> bool:
+    return row.get("status") == "active" and int(row.get("quantity_available") or 0) > 0
+
+
+def _fetch_pages(since: Optional[str]):
+    """Yield pages of meal rows ordered by updated_at (only changed rows if `since`)."""
+    offset = 0
+    while True:
+        q = sb.table("meals").select(_columns())
+        if since:
+            q = q.gt("updated_at", since)
+        else:
+            q = (
+                q.eq("status", "active")
+                 .gt("quantity_available", 0)
+                 .gt("expiry_date", now_iso())
+            )
+        page = q.order("updated_at").order("id").range(offset, offset + _PAGE_SIZE - 1).execute().data or []
+        if not page:
+            return
+        yield page
+        if len(page) < _PAGE_SIZE:
+            return
+        offset += _PAGE_SIZE
+
+
+def refresh_catalog(full: bool = False) -> int:
+    """
+    Bring both indexes up to date. Returns the number of rows touched.
+
+    Incremental refreshes read rows with updated_at past the cursor: live rows
+    are upserted and everything else is dropped. A full reload rebuilds both
+    indexes from scratch.
+    """
+    global _meal_index, _lexical_index, _cursor, _last_full_load
+    with _refresh_lock:
+        if full or _lexical_index is None:
+            ids: List[str] = []
+            vecs: List[np.ndarray] = []
+            metas: List[Dict[str, Any]] = []
+            lexical = BM25Index()
+            cursor = ""
+            for page in _fetch_pages(since=None):
+                for row in page:
+                    meta = _row_meta(row)
+                    lexical.upsert(row["id"], _row_tokens(row), meta)
+                    vec = parse_embedding(row.get("embedding"))
+                    if vec is not None:
+                        ids.append(row["id"])
+                        vecs.append(vec)
+                        metas.append(meta)
+                    cursor = max(cursor, row.get("updated_at") or "")
+            if VECTOR_SEARCH_BACKEND == "local":
+                index = VectorIndex(dim=len(vecs[0]) if vecs else 1024)
+                index.build(ids, np.vstack(vecs) if vecs else np.zeros((0, index.dim)), metas)
+                _meal_index = index
+            _lexical_index = lexical
+            _cursor = cursor
+            _last_full_load = time.time()
+            _loaded.set()
+            _notify(None, [])
+            return len(lexical)
+
+        changed: List[str] = []
+        relisted: List[str] = []
+        for page in _fetch_pages(since=_cursor):
+            for row in page:
+                if _is_live(row):
+                    meta = _row_meta(row)
+                    if _lexical_index.meta(row["id"]) != meta:  # new, or a filterable field moved
+                        relisted.append(row["id"])
+                    _lexical_index.upsert(row["id"], _row_tokens(row), meta)
+                    vec = parse_embedding(row.get("embedding"))
+                    if _meal_index is not None:
+                        if vec is not None:
+                            _meal_index.upsert(row["id"], vec, meta)
+                        else:
+                            _meal_index.remove(row["id"])
+                else:
+                    _lexical_index.remove(row["id"])
+                    if _meal_index is not None:
+                        _meal_index.remove(row["id"])
+                _cursor = max(_cursor, row.get("updated_at") or "")
+                changed.append(row["id"])
+        if changed:
+            _notify(changed, relisted)
+        return len(changed)
+
+
+def get_meal_index() -> Optional[VectorIndex]:
+    """The loaded vector index, or None if disabled by config or not loaded yet."""
+    if VECTOR_SEARCH_BACKEND != "local":
+        return None
+    return _meal_index
+
+
+def get_lexical_index() -> Optional[BM25Index]:
+    """The loaded BM25 index, or None until the first load finishes."""
+    return _lexical_index
+
+
+def wait_for_catalog(timeout: float = CATALOG_WAIT_SECONDS) -> Optional[BM25Index]:
+    """
+    The BM25 index; before the first load has finished, start the refresher
+    (if it is not running) and wait up to `timeout` seconds for it. None if
+    the catalog is still not loaded.
+    """
+    if _lexical_index is None:
+        start_catalog_refresher()
+        _loaded.wait(timeout)
+    return _lexical_index
+
+
+def _refresh_loop() -> None:
+    while True:
+        try:
+            full = time.time() - _last_full_load >= FULL_RELOAD_SECONDS
+            count = refresh_catalog(full=full)
+            if full:
+                print(f"Meal catalog loaded — {count} meals.")
+        except Exception as exc:
+            print(f"Meal catalog refresh failed: {exc}")
+        time.sleep(REFRESH_SECONDS)
+
+
+def start_catalog_refresher() -> None:
+    """Start the background load/refresh thread (idempotent)."""
+    global _refresher
+    if _refresher is not None:
+        return
+    _refresher = threading.Thread(target=_refresh_loop, name="meal-catalog-refresher", daemon=True)
+    _refresher.start()
@@ -0,0 +1,75 @@
+"""
+utils/query_runner.py
+─────────────────────
+Write data-access logic once, run it on the sync or the async Supabase client.
+
+Business logic is a generator that takes a client and *yields* work instead
+of performing it:
+
+    def _logic(db, user_id):
+        rows = (yield db.table("favorites").select("meal_id").eq("user_id", user_id)).data
+        vec = yield offload(encode_query, "cake")      # blocking CPU / sync call
+        return {...}
+
+  run_sync(_logic, ...)        — drives it with `sb`; builders are .execute()d inline
+  await run_async(_logic, ...) — drives it with the async client; builders are
+                                 awaited and offloaded calls run in a worker thread
+
+So the sync LangChain tool and the async FastAPI route share one code path,
+and the async path never blocks the event loop.
+"""
+
+import asyncio
+from typing import Any, Callable, Generator, TypeVar
+
+from src.utils.db_client import get_async_client, sb
+
+T = TypeVar("T")
+Steps = Generator[Any, Any, T]
+
+
+class offload:
+    """A blocking call for the driver to run (inline when sync, in a thread when async)."""
+
+    __slots__ = ("fn", "args", "kwargs")
+
+    def __init__(self, fn: Callable[..., Any], *args: Any, **kwargs: Any):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+
+def run_sync(logic: Callable[..., Steps[T]], *args: Any, **kwargs: Any) -> T:
+    gen = logic(sb, *args, **kwargs)
+    send, value = gen.send, None
+    while True:
+        try:
+            step = send(value)
+        except StopIteration as done:
+            return done.value
+        try:
+            if isinstance(step, offload):
+                value = step.fn(*step.args, **step.kwargs)
+            else:
+                value = step.execute()
+            send = gen.send
+        except Exception as exc:  # re-raised inside the logic so it can handle it
+            send, value = gen.throw, exc
+
+
+async def run_async(logic: Callable[..., Steps[T]], *args: Any, **kwargs: Any) -> T:
+    gen = logic(await get_async_client(), *args, **kwargs)
+    send, value = gen.send, None
+    while True:
+        try:
+            step = send(value)
+        except StopIteration as done:
+            return done.value
+        try:
+            if isinstance(step, offload):
+                value = await asyncio.to_thread(step.fn, *step.args, **step.kwargs)
+            else:
+                value = await step.execute()
+            send = gen.send
+        except Exception as exc:
+            send, value = gen.throw, exc
@@ -0,0 +1,39 @@
+"""
+utils/request_context.py
+────────────────────────
+Request-scoped state carried in contextvars.
+
+  set_current_user(user_id) — record the verified user for this request
+  user_context(user_id)     — the same as a `with` block (resets afterwards)
+  current_user_id()         — read it anywhere downstream (tools, helpers)
+
+Each request (and each asyncio task / LangGraph tool thread it spawns)
+sees its own copy, so concurrent users never share state and tools never
+need their own auth round trip.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Iterator, Optional
+
+# Used when no authenticated user is in context (local development / CLI).
+DEV_USER_ID = "11111111-1111-1111-1111-111111111111"
+
+_current_user: ContextVar[Optional[str]] = ContextVar("current_user", default=None)
+
+
+def set_current_user(user_id: str) -> Token:
+    return _current_user.set(user_id)
+
+
+@contextmanager
+def user_context(user_id: str) -> Iterator[None]:
+    token = _current_user.set(user_id)
+    try:
+        yield
+    finally:
+        _current_user.reset(token)
+
+
+def current_user_id() -> str:
+    return _current_user.get() or DEV_USER_ID
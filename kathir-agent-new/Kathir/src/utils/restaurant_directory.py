@@ -0,0 +1,141 @@
+"""
+utils/restaurant_directory.py
+─────────────────────────────
+In-process directory of restaurants (profile_id ↔ restaurant_name).
+
+  resolve(name)     — partial or misspelled name → best matching restaurants
+  name_for(id)      — restaurant_id → restaurant_name (replaces the embedded join)
+  refresh()         — reload from Supabase (also exposed as POST /admin/refresh/restaurants)
+
+Matching mirrors the old `ilike '%name%'` lookup first (substring hits win),
+then falls back to pg_trgm-style trigram similarity so typos still resolve.
+The directory reloads itself in the background every
+RESTAURANT_DIRECTORY_REFRESH_SECONDS.
+"""
+
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from src.utils.db_client import sb
+
+REFRESH_SECONDS = float(os.environ.get("RESTAURANT_DIRECTORY_REFRESH_SECONDS", "300"))
+MIN_SIMILARITY = 0.3  # pg_trgm's default similarity_threshold
+
+
+def trigrams(text: str) -> Set[str]:
+    """pg_trgm-style trigrams: each lowercased word padded with '  ' / ' '."""
+    grams: Set[str] = set()
+    for word in text.lower().split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class RestaurantDirectory:
+    def __init__(self) -> None:
+        self._names: Dict[str, str] = {}             # profile_id → restaurant_name
+        self._grams: Dict[str, Set[str]] = {}        # profile_id → trigram set
+        self._postings: Dict[str, Set[str]] = {}     # trigram → profile_ids
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    # ── loading ───────────────────────────────────────────────────────────────
+
+    def refresh(self) -> int:
+        """Reload every restaurant from Supabase. Returns the restaurant count."""
+        rows: List[Dict] = []
+        offset = 0
+        while True:
+            page = (
+                sb.table("restaurants")
+                  .select("profile_id, restaurant_name")
+                  .order("profile_id")
+                  .range(offset, offset + 999)
+                  .execute()
+                  .data or []
+            )
+            rows.extend(page)
+            if len(page) < 1000:
+                break
+            offset += 1000
+
+        names = {r["profile_id"]: r["restaurant_name"] for r in rows if r.get("restaurant_name")}
+        grams = {rid: trigrams(name) for rid, name in names.items()}
+        postings: Dict[str, Set[str]] = {}
+        for rid, gs in grams.items():
+            for g in gs:
+                postings.setdefault(g, set()).add(rid)
+
+        with self._lock:
+            self._names, self._grams, self._postings = names, grams, postings
+            self._loaded_at = time.time()
+        return len(names)
+
+    def _ensure_fresh(self) -> None:
+        if not self._loaded_at:
+            self.refresh()
+        elif time.time() - self._loaded_at > REFRESH_SECONDS and not self._refreshing:
+            self._refreshing = True
+
+            def _bg() -> None:
+                try:
+                    self.refresh()
+                except Exception as exc:
+                    print(f"Restaurant directory refresh failed: {exc}")
+                finally:
+                    self._refreshing = False
+
+            threading.Thread(target=_bg, name="restaurant-directory-refresh", daemon=True).start()
+
+    # ── lookups ───────────────────────────────────────────────────────────────
+
+    def resolve(self, name: str, limit: int = 3) -> List[Tuple[str, str]]:
+        """
+        Return up to `limit` (profile_id, restaurant_name) pairs for a partial
+        or misspelled name: substring matches first, then trigram similarity.
+        """
+        self._ensure_fresh()
+        needle = " ".join((name or "").lower().split())
+        if not needle:
+            return []
+
+        with self._lock:
+            names, grams, postings = self._names, self._grams, self._postings
+
+        hits = [rid for rid, n in names.items() if needle in n.lower()]
+        if hits:
+            hits.sort(key=lambda rid: (len(names[rid]), names[rid]))
+            return [(rid, names[rid]) for rid in hits[:limit]]
+
+        query = trigrams(needle)
+        candidates: Set[str] = set()
+        for g in query:
+            candidates |= postings.get(g, set())
+
+        scored = []
+        for rid in candidates:
+            sim = len(query & grams[rid]) / len(query | grams[rid])
+            if sim >= MIN_SIMILARITY:
+                scored.append((sim, rid))
+        scored.sort(key=lambda x: (-x[0], names[x[1]]))
+        return [(rid, names[rid]) for _, rid in scored[:limit]]
+
+    def name_for(self, restaurant_id: Optional[str]) -> Optional[str]:
+        if not restaurant_id:
+            return None
+        self._ensure_fresh()
+        return self._names.get(restaurant_id)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "restaurants": len(self._names),
+            "trigrams": len(self._postings),
+            "age_seconds": round(time.time() - self._loaded_at, 1) if self._loaded_at else None,
+        }
+
+
+# Single shared directory — import `restaurant_directory` everywhere.
+restaurant_directory = RestaurantDirectory()
@@ -0,0 +1,195 @@
+"""
+utils/result_cache.py
+─────────────────────
+Filter-aware cache for search_meals responses.
+
+  make_key(args)          — normalized argument tuple (case, whitespace and
+                            allergen order do not split entries)
+  ResultCache.get / put   — bounded LRU with a per-entry deadline
+  invalidate_meals(ids)   — drop every entry whose results contain one of `ids`
+  invalidate_listings()   — drop everything (a meal became available or
+                            changed a filtered field)
+
+An entry lives for at most SEARCH_CACHE_TTL_SECONDS, and never past the
+earliest expiry_date among its results, so an expired meal is never served.
+The meal catalog refresher reports changed meals (stock, status, price…)
+and those entries are invalidated; a meal that is new, back in stock or
+reactivated, or whose price, category, restaurant, allergens or expiry
+changed could belong to any cached page, so it clears the cache.
+POST /admin/invalidate/meals does the same on demand.
+
+Changes are only seen when the catalog polls, so a cached page can lag the
+database by up to min(SEARCH_CACHE_TTL_SECONDS, VECTOR_INDEX_REFRESH_SECONDS);
+stats() reports that bound as "staleness_bound_seconds".
+"""
+
+import copy
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from src.utils.embedding_cache import normalize_query
+from src.utils.filters import normalize_allergens
+
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "1024"))
+SEARCH_CACHE_TTL_SECONDS = float(os.environ.get("SEARCH_CACHE_TTL_SECONDS", "120"))
+
+CacheKey = Tuple[Any, ...]
+
+# Arguments matched case-insensitively downstream; everything else (e.g. the
+# exact-match category) keeps its case in the key.
+_CASE_INSENSITIVE = {"query", "restaurant_name"}
+
+
+def _expiry_ts(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+def make_key(args: Dict[str, Any]) -> CacheKey:
+    """Normalize search arguments into a hashable key."""
+    key = []
+    for name in sorted(args):
+        value = args[name]
+        if name in ("exclude_allergens", "require_allergens"):
+            value = tuple(sorted(normalize_allergens(value))) or None
+        elif name in _CASE_INSENSITIVE:
+            value = normalize_query(value) or None
+        elif isinstance(value, str):
+            value = value.strip() or None
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = float(value)
+        elif isinstance(value, list):
+            value = tuple(value)
+        key.append((name, value))
+    return tuple(key)
+
+
+class ResultCache:
+    """Thread-safe LRU of search responses with expiry-capped TTLs."""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 120.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict[str, Any], float, float]]" = OrderedDict()
+        self._by_meal: Dict[str, Set[CacheKey]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+        self.listing_clears = 0
+        self._served_age_total = 0.0
+        self._served_age_max = 0.0
+        # Seconds between change reports from whoever feeds invalidate_*
+        # (None: entries are only ever dropped by their deadline).
+        self.change_feed_seconds: Optional[float] = None
+
+    def get(self, key: CacheKey) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= now:
+                self._drop(key)
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            value, stored_at, _ = entry
+            age = now - stored_at
+            self.hits += 1
+            self._served_age_total += age
+            self._served_age_max = max(self._served_age_max, age)
+        return copy.deepcopy(value)
+
+    def put(self, key: CacheKey, value: Dict[str, Any]) -> None:
+        """Cache a search response; the deadline is capped by its earliest meal expiry."""
+        now = time.time()
+        deadline = now + self.ttl
+        meal_ids = []
+        for r in value.get("results") or []:
+            meal_ids.append(r["id"])
+            expiry = _expiry_ts(r.get("expiry_date"))
+            if expiry is not None:
+                deadline = min(deadline, expiry)
+        if deadline <= now:
+            return
+
+        with self._lock:
+            self._drop(key)
+            self._entries[key] = (copy.deepcopy(value), now, deadline)
+            for mid in meal_ids:
+                self._by_meal.setdefault(mid, set()).add(key)
+            while len(self._entries) > self.max_size:
+                self._drop(next(iter(self._entries)))
+
+    def invalidate_meals(self, meal_ids: Iterable[str]) -> int:
+        """Drop every entry that contains one of `meal_ids`. Returns entries dropped."""
+        with self._lock:
+            keys: Set[CacheKey] = set()
+            for mid in meal_ids:
+                keys |= self._by_meal.get(mid, set())
+            for key in keys:
+                self._drop(key)
+            self.invalidated += len(keys)
+            return len(keys)
+
+    def invalidate_listings(self) -> int:
+        """Drop every entry — a newly available or re-priced meal may belong to any cached page."""
+        with self._lock:
+            self.listing_clears += 1
+        return self.clear()
+
+    def staleness_bound(self) -> float:
+        """Longest a served entry can lag a change in the database, in seconds."""
+        if self.change_feed_seconds is None:
+            return self.ttl
+        return min(self.ttl, self.change_feed_seconds)
+
+    def clear(self) -> int:
+        with self._lock:
+            count = len(self._entries)
+            self._entries.clear()
+            self._by_meal.clear()
+            self.invalidated += count
+            return count
+
+    def _drop(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for r in entry[0].get("results") or []:
+            keys = self._by_meal.get(r["id"])
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_meal[r["id"]]
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            lookups = self.hits + self.misses
+            oldest = min((e[1] for e in self._entries.values()), default=None)
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+                "expired": self.expired,
+                "invalidated": self.invalidated,
+                "listing_clears": self.listing_clears,
+                "staleness_bound_seconds": round(self.staleness_bound(), 1),
+                "avg_served_age_seconds": round(self._served_age_total / self.hits, 2) if self.hits else 0.0,
+                "max_served_age_seconds": round(self._served_age_max, 2),
+                "oldest_entry_age_seconds": round(now - oldest, 1) if oldest is not None else None,
+            }
+
+
+# Single shared cache for meal search — import `search_cache` everywhere.
+search_cache = ResultCache(max_size=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL_SECONDS)
@@ -0,0 +1,239 @@
+"""
+utils/tool_data.py
+──────────────────
+Out-of-band channel for tool results during one agent run.
+
+  ToolDataCollector  — callback handler: pass in the run config's
+                       "callbacks" and it records every tool result as it
+                       finishes (plus the LLM's output-token usage and
+                       per-step tool timings)
+  tool_steps         — process-wide parallel tool-step counters (/metrics)
+  parse_reply(text)  — the {"message", "action"} object from the model's reply
+  build_response(reply, collector) — final {"message", "data", "action"}
+
+The model only writes a short message and an action; the structured data
+the client renders (meals, cart, built cart) is the tool's own output,
+attached here by reference instead of being re-generated token by token.
+"""
+
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# Custom callback event a tool sends once it holds a concurrency slot, so its
+# span measures running time rather than time queued behind other calls.
+TOOL_SLOT_ACQUIRED = "tool_slot_acquired"
+
+# Tool → the action reported when the model does not name one.
+TOOL_ACTIONS = {
+    "search_meals": "search",
+    "search_favorites": "search",
+    "get_cart": "cart",
+    "add_to_cart": "cart",
+    "build_cart": "build",
+}
+
+
+def tool_output_data(output: Any) -> Any:
+    """
+    A tool's on_tool_end output (ToolMessage or raw value) → JSON-friendly data.
+    The full result is the artifact when the model was shown a compact view.
+    """
+    content = getattr(output, "artifact", None) or getattr(output, "content", output)
+    if isinstance(content, str):
+        try:
+            return json.loads(content)
+        except json.JSONDecodeError:
+            return content
+    return content
+
+
+class ToolDataCollector(BaseCallbackHandler):
+    """Collects (tool name, result) pairs and LLM output tokens for one run."""
+
+    run_inline = True  # record in order, on the caller's thread / loop
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._names: Dict[Any, str] = {}
+        self._open: Dict[Any, Tuple[Any, float]] = {}          # run_id → (step, start)
+        self._spans: List[Tuple[Any, float, float]] = []       # (step, start, end)
+        self.results: List[Tuple[str, Any]] = []
+        self.llm_calls = 0
+        self.output_tokens = 0
+        self.started = time.perf_counter()
+
+    def on_tool_start(
+        self,
+        serialized: Dict[str, Any],
+        input_str: str,
+        *,
+        run_id: Any,
+        parent_run_id: Any = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        name = (serialized or {}).get("name") or kwargs.get("name") or "tool"
+        # Calls from one model step share a graph step (one tool-node task
+        # per call on newer LangGraph, one task for all of them on older).
+        step = (metadata or {}).get("langgraph_step", parent_run_id)
+        with self._lock:
+            self._names[run_id] = name
+            self._open[run_id] = (step, time.perf_counter())
+
+    def on_custom_event(self, name: str, data: Any, *, run_id: Any, **kwargs: Any) -> None:
+        # Sent by the tool through its own run's child callbacks, so run_id
+        # is the tool run's id.
+        if name != TOOL_SLOT_ACQUIRED:
+            return
+        with self._lock:
+            if run_id in self._open:
+                self._open[run_id] = (self._open[run_id][0], time.perf_counter())
+
+    def _close(self, run_id: Any) -> None:
+        opened = self._open.pop(run_id, None)
+        if opened is not None:
+            self._spans.append((opened[0], opened[1], time.perf_counter()))
+
+    def on_tool_end(self, output: Any, *, run_id: Any, **kwargs: Any) -> None:
+        with self._lock:
+            self._close(run_id)
+            name = self._names.pop(run_id, None) or getattr(output, "name", None) or "tool"
+            self.results.append((name, tool_output_data(output)))
+
+    def on_tool_error(self, error: BaseException, *, run_id: Any, **kwargs: Any) -> None:
+        with self._lock:
+            self._close(run_id)
+            self._names.pop(run_id, None)
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        usage = None
+        for generations in getattr(response, "generations", None) or []:
+            for gen in generations:
+                usage = getattr(getattr(gen, "message", None), "usage_metadata", None) or usage
+        if usage is None:
+            usage = ((getattr(response, "llm_output", None) or {}).get("token_usage") or {})
+            usage = {"output_tokens": usage.get("completion_tokens", 0)}
+        with self._lock:
+            self.llm_calls += 1
+            self.output_tokens += int(usage.get("output_tokens") or 0)
+
+    def primary(self) -> Tuple[Optional[str], Any]:
+        """
+        The result the reply is about: the last successful one (a retried
+        search supersedes the empty attempt), else the last one at all.
+        """
+        with self._lock:
+            for name, data in reversed(self.results):
+                if isinstance(data, dict) and data.get("ok", data.get("success", True)):
+                    return name, data
+            return self.results[-1] if self.results else (None, None)
+
+    def steps(self) -> List[Dict[str, Any]]:
+        """
+        Per model step that called tools: how many ran, their summed run
+        time (excluding any wait for a slot), the step's wall time and the
+        difference — the time saved by running them concurrently instead
+        of one after another.
+        """
+        by_step: Dict[Any, List[Tuple[float, float]]] = {}
+        with self._lock:
+            for step, start, end in self._spans:
+                by_step.setdefault(step, []).append((start, end))
+        out = []
+        for spans in by_step.values():
+            busy = sum(end - start for start, end in spans)
+            wall = max(end for _, end in spans) - min(start for start, _ in spans)
+            out.append({
+                "tools": len(spans),
+                "tool_seconds": round(busy, 3),
+                "wall_seconds": round(wall, 3),
+                "saved_seconds": round(busy - wall, 3),
+            })
+        return out
+
+    def summary(self) -> str:
+        steps = self.steps()
+        parallel = [s for s in steps if s["tools"] > 1]
+        saved = sum(s["saved_seconds"] for s in parallel)
+        return (
+            f"{len(self.results)} tool calls in {len(steps)} steps "
+            f"({len(parallel)} parallel, saved {saved:.2f}s), {self.llm_calls} LLM calls, "
+            f"{self.output_tokens} output tokens, {time.perf_counter() - self.started:.2f}s"
+        )
+
+    def finish(self) -> str:
+        """Add this run's steps to the process-wide counters; returns summary()."""
+        tool_steps.record(self.steps())
+        return self.summary()
+
+
+class _StepStats:
+    """Process-wide tool-step counters for /metrics."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.steps = 0
+        self.parallel_steps = 0
+        self.tool_calls = 0
+        self.saved_seconds = 0.0
+        self.wall_seconds = 0.0
+
+    def record(self, steps: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            for step in steps:
+                self.steps += 1
+                self.tool_calls += step["tools"]
+                self.wall_seconds += step["wall_seconds"]
+                if step["tools"] > 1:
+                    self.parallel_steps += 1
+                    self.saved_seconds += step["saved_seconds"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "steps": self.steps,
+                "parallel_steps": self.parallel_steps,
+                "tool_calls": self.tool_calls,
+                "avg_step_wall_seconds": round(self.wall_seconds / self.steps, 3) if self.steps else 0.0,
+                "saved_seconds_total": round(self.saved_seconds, 2),
+            }
+
+
+tool_steps = _StepStats()
+
+
+def parse_reply(text: str) -> Dict[str, Any]:
+    """
+    The first JSON object in the model's reply (code fences and surrounding
+    prose are tolerated). Plain text becomes {"message": text}.
+    """
+    text = (text or "").strip()
+    decoder = json.JSONDecoder()
+    start = text.find("{")
+    while start != -1:
+        try:
+            obj, _ = decoder.raw_decode(text, start)
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+            continue
+        if isinstance(obj, dict):
+            return obj
+        start = text.find("{", start + 1)
+    return {"message": text}
+
+
+def build_response(reply_text: str, collector: ToolDataCollector) -> Dict[str, Any]:
+    """Assemble the client response from the model's short reply plus captured tool data."""
+    reply = parse_reply(reply_text)
+    tool, data = collector.primary()
+    if data is None:
+        data = reply.get("data")  # replies that still inline data keep working
+    return {
+        "message": reply.get("message") or "",
+        "data": data,
+        "action": reply.get("action") or TOOL_ACTIONS.get(tool or ""),
+    }
@@ -0,0 +1,166 @@
+"""
+utils/vector_index.py
+─────────────────────
+In-process approximate nearest-neighbour index over meal embeddings.
+
+  VectorIndex      — NumPy IVF index (flat scan below IVF_MIN_ROWS)
+  parse_embedding  — pgvector value from PostgREST → normalized float32 array
+
+Loading and refreshing the shared meal index lives in meal_catalog.py.
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+IVF_MIN_ROWS = 4096  # below this an exact flat scan is already sub-millisecond
+_NPROBE = 8
+_KMEANS_ITERS = 10
+
+Predicate = Callable[[Dict[str, Any]], bool]
+
+
+def parse_embedding(value: Any) -> Optional[np.ndarray]:
+    """pgvector columns come back from PostgREST as a '[0.1,0.2,…]' string."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    vec = np.asarray(value, dtype=np.float32)
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm > 0 else None
+
+
+# ── Index ─────────────────────────────────────────────────────────────────────
+
+class VectorIndex:
+    """
+    Cosine-similarity index over L2-normalised vectors.
+
+    Rows live in one dense matrix; deletes swap the last row into the hole so
+    the matrix stays contiguous. Once the index holds IVF_MIN_ROWS rows it is
+    clustered with k-means and a search only scores rows in the _NPROBE
+    closest clusters. Rows added afterwards are assigned to their nearest
+    existing centroid; the periodic full reload re-clusters from scratch.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self._vecs = np.zeros((0, dim), dtype=np.float32)
+        self._ids: List[str] = []
+        self._meta: List[Dict[str, Any]] = []
+        self._pos: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._assign = np.zeros(0, dtype=np.int32)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    # ── writes ────────────────────────────────────────────────────────────────
+
+    def upsert(self, meal_id: str, vec: np.ndarray, meta: Dict[str, Any]) -> None:
+        with self._lock:
+            cluster = self._nearest_centroid(vec)
+            if meal_id in self._pos:
+                row = self._pos[meal_id]
+                self._vecs[row] = vec
+                self._meta[row] = meta
+                self._assign[row] = cluster
+                return
+            self._pos[meal_id] = len(self._ids)
+            self._ids.append(meal_id)
+            self._meta.append(meta)
+            self._vecs = np.vstack([self._vecs, vec[None, :]])
+            self._assign = np.append(self._assign, np.int32(cluster))
+
+    def remove(self, meal_id: str) -> None:
+        with self._lock:
+            row = self._pos.pop(meal_id, None)
+            if row is None:
+                return
+            last = len(self._ids) - 1
+            if row != last:
+                moved_id = self._ids[last]
+                self._ids[row] = moved_id
+                self._meta[row] = self._meta[last]
+                self._vecs[row] = self._vecs[last]
+                self._assign[row] = self._assign[last]
+                self._pos[moved_id] = row
+            self._ids.pop()
+            self._meta.pop()
+            self._vecs = self._vecs[:last]
+            self._assign = self._assign[:last]
+
+    def build(self, ids: List[str], vecs: np.ndarray, metas: List[Dict[str, Any]]) -> None:
+        """Replace the whole index contents and (re)cluster if large enough."""
+        with self._lock:
+            self._ids = list(ids)
+            self._meta = list(metas)
+            self._pos = {mid: i for i, mid in enumerate(self._ids)}
+            self._vecs = np.array(vecs, dtype=np.float32).reshape(-1, self.dim)
+            self._centroids = None
+            self._assign = np.zeros(len(self._ids), dtype=np.int32)
+            if len(self._ids) >= IVF_MIN_ROWS:
+                self._train()
+
+    def _train(self) -> None:
+        n = len(self._ids)
+        nlist = max(1, int(np.sqrt(n)))
+        rng = np.random.default_rng(0)
+        centroids = self._vecs[rng.choice(n, size=nlist, replace=False)].copy()
+        for _ in range(_KMEANS_ITERS):
+            assign = np.argmax(self._vecs @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = self._vecs[assign == c]
+                if len(members):
+                    centroid = members.mean(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+        self._centroids = centroids
+        self._assign = np.argmax(self._vecs @ centroids.T, axis=1).astype(np.int32)
+
+    def _nearest_centroid(self, vec: np.ndarray) -> int:
+        if self._centroids is None:
+            return 0
+        return int(np.argmax(self._centroids @ vec))
+
+    # ── reads ─────────────────────────────────────────────────────────────────
+
+    def search(
+        self,
+        query: np.ndarray,
+        k: int,
+        threshold: float = 0.0,
+        predicate: Optional[Predicate] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Return up to k (meal_id, similarity) pairs with similarity >= threshold,
+        best first. `predicate` is evaluated on each candidate's metadata.
+        """
+        with self._lock:
+            if not self._ids:
+                return []
+            query = np.asarray(query, dtype=np.float32)
+
+            if self._centroids is not None:
+                probe = np.argsort(self._centroids @ query)[-_NPROBE:]
+                rows = np.nonzero(np.isin(self._assign, probe))[0]
+                scores = self._vecs[rows] @ query
+            else:
+                rows = None
+                scores = self._vecs @ query
+
+            hit = np.nonzero(scores >= threshold)[0]
+            order = hit[np.argsort(-scores[hit], kind="stable")]
+
+            out: List[Tuple[str, float]] = []
+            for i in order:
+                row = int(rows[i]) if rows is not None else int(i)
+                if predicate is not None and not predicate(self._meta[row]):
+                    continue
+                out.append((self._ids[row], float(scores[i])))
+                if len(out) >= k:
+                    break
+            return out
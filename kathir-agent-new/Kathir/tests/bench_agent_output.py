@@ -0,0 +1,77 @@
+"""
+Benchmark: LLM output tokens and latency per agent turn.
+
+Runs a fixed set of prompts through create_agent() in-process (no HTTP, no
+intent-router fast path) and reports, per prompt and in total:
+  • output tokens generated by the model across the turn (usage_metadata)
+  • characters in the final reply
+  • wall time of the turn
+
+Run it on the build where the prompt makes the model copy tool data into
+its reply and on the one where the data is attached out of band, and
+compare — the final reply shrinks from a full meal / cart listing to a
+one-line {"message", "action"} object.
+
+Needs OPENROUTER_API_KEY and the Supabase env of a normal run.
+Run with: python -m tests.bench_agent_output [repeats]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+import uuid
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.boss_agent import create_agent
+from src.utils.request_context import user_context
+
+USER_ID = os.environ.get("BENCH_USER_ID", "11111111-1111-1111-1111-111111111111")
+
+PROMPTS = [
+    "show me chicken dishes under 80 EGP",
+    "I need gluten-free desserts",
+    "build a cart with 500 EGP",
+    "what's in my cart?",
+]
+
+
+async def run_turn(agent, prompt):
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    t0 = time.perf_counter()
+    with user_context(USER_ID):
+        result = await agent.ainvoke({"messages": [{"role": "user", "content": prompt}]}, config)
+    wall = time.perf_counter() - t0
+
+    out_tokens = sum(
+        (getattr(m, "usage_metadata", None) or {}).get("output_tokens", 0)
+        for m in result["messages"]
+        if m.type == "ai"
+    )
+    return out_tokens, len(result["messages"][-1].content or ""), wall
+
+
+async def main(repeats):
+    agent = create_agent()
+    totals = {"tokens": [], "chars": [], "wall": []}
+    print(f"{'prompt':40} {'out tok':>8} {'reply ch':>9} {'p50 s':>7}")
+    for prompt in PROMPTS:
+        tokens, chars, walls = [], [], []
+        for _ in range(repeats):
+            t, c, w = await run_turn(agent, prompt)
+            tokens.append(t)
+            chars.append(c)
+            walls.append(w)
+        totals["tokens"] += tokens
+        totals["chars"] += chars
+        totals["wall"] += walls
+        print(f"{prompt[:40]:40} {statistics.mean(tokens):8.0f} {statistics.mean(chars):9.0f} "
+              f"{statistics.median(walls):7.2f}")
+    print(f"{'ALL':40} {statistics.mean(totals['tokens']):8.0f} {statistics.mean(totals['chars']):9.0f} "
+          f"{statistics.median(totals['wall']):7.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 3))
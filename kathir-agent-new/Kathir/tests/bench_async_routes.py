@@ -0,0 +1,74 @@
+"""
+Load test: concurrent throughput of the async routes.
+
+Fires N concurrent clients at a running server and reports requests/s plus
+p50/p95 latency for:
+  1. GET  /favorites/search   (browse + semantic)
+  2. POST /cart/build
+  3. GET  /health             (control: no DB work)
+
+Run it against the old build (routes calling the sync client via
+tool.invoke) and the new one (async client) to compare — with the sync
+client every in-flight DB round trip stalls the event loop, so /health
+latency climbs with load too.
+
+Start the server with a single worker so the event loop is the bottleneck:
+    uvicorn main:app --workers 1
+Run with: python -m tests.bench_async_routes [concurrency] [requests_per_worker] [base_url]
+"""
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+RESTAURANT = os.environ.get("BENCH_RESTAURANT", "a")
+TOKEN = os.environ.get("BENCH_TOKEN", "")
+
+CASES = [
+    ("favorites browse", "GET", "/favorites/search", {"params": {"limit": 8}}),
+    ("favorites query", "GET", "/favorites/search", {"params": {"query": "chocolate cake"}}),
+    ("cart build", "POST", "/cart/build", {"json": {"budget": 300, "restaurant_name": RESTAURANT}}),
+    ("health", "GET", "/health", {}),
+]
+
+
+def run(label, method, url, kwargs, concurrency, per_worker):
+    latencies = []
+    errors = 0
+    headers = {"Authorization": f"Bearer {TOKEN}"} if TOKEN else {}
+
+    def worker(_):
+        nonlocal errors
+        with requests.Session() as session:
+            for _ in range(per_worker):
+                t0 = time.perf_counter()
+                resp = session.request(method, url, headers=headers, timeout=60, **kwargs)
+                latencies.append(time.perf_counter() - t0)
+                if resp.status_code != 200:
+                    errors += 1
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    total = concurrency * per_worker
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<18} {total / wall:8.1f} req/s   "
+          f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms"
+          f"   errors {errors}")
+
+
+if __name__ == "__main__":
+    concurrency = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    per_worker = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    base_url = sys.argv[3] if len(sys.argv) > 3 else "http://localhost:8000"
+
+    requests.get(f"{base_url}/health", timeout=10).raise_for_status()
+    print(f"{concurrency} concurrent clients × {per_worker} requests each → {base_url}\n")
+    for label, method, path, kwargs in CASES:
+        run(label, method, base_url + path, kwargs, concurrency, per_worker)
@@ -0,0 +1,67 @@
+"""
+Benchmark: per-call encode vs. the micro-batching BatchEncoder.
+
+Fires N concurrent callers, each encoding unique query strings (so the query
+cache never helps), and reports throughput plus p50/p95 latency for:
+  1. per-call  — get_model().encode(query) on every request (old path)
+  2. batched   — BatchEncoder.encode(query)
+
+Run with: python -m tests.bench_batch_encoder [concurrency] [requests_per_worker]
+          [--model PATH]   (e.g. a local copy of bge-m3 on an offline host)
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.utils.batch_encoder import BatchEncoder
+from src.utils.embedding_backends import EMBEDDING_BACKEND, load_model
+from src.utils.embeddings import get_model
+
+WORDS = ["chicken", "dessert", "koshary", "pizza", "falafel", "grilled fish",
+         "chocolate cake", "molokhia", "shawarma", "rice pudding", "salad", "pasta"]
+
+
+def run(label, encode, concurrency, per_worker):
+    latencies = []
+
+    def worker(w):
+        for i in range(per_worker):
+            q = f"{WORDS[(w + i) % len(WORDS)]} {w}-{i}"
+            t0 = time.perf_counter()
+            encode(q)
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    wall = time.perf_counter() - t0
+
+    total = concurrency * per_worker
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{label:<10} {total / wall:8.1f} q/s   "
+          f"p50 {statistics.median(latencies) * 1000:7.1f} ms   p95 {p95 * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("concurrency", type=int, nargs="?", default=16)
+    parser.add_argument("per_worker", type=int, nargs="?", default=8)
+    parser.add_argument("--model", help="model name or local path (default: the app's bge-m3)")
+    args = parser.parse_args()
+    concurrency, per_worker = args.concurrency, args.per_worker
+
+    model = load_model(args.model, EMBEDDING_BACKEND) if args.model else get_model()
+    model.encode("warm up", normalize_embeddings=True)
+
+    print(f"{concurrency} concurrent callers × {per_worker} queries each\n")
+    run("per-call", lambda q: model.encode(q, normalize_embeddings=True).tolist(),
+        concurrency, per_worker)
+    for window in (2, 5, 10):
+        encoder = BatchEncoder(lambda: model, window_ms=window, max_batch=32)
+        run(f"batch {window}ms", encoder.encode, concurrency, per_worker)
+        print(f"           avg batch size: {encoder.stats()['avg_batch_size']}")
@@ -0,0 +1,89 @@
+"""
+Benchmark + parity check for the embedding backends.
+
+Each backend runs in its own subprocess so peak RSS is measured in isolation.
+Reports load time, per-query latency (p50 / p95), peak RSS, and cosine
+parity against the torch vectors (fails the backend below the threshold).
+
+Run with: python -m tests.bench_embedding_backends [backend ...] [--threshold 0.99]
+          [--model PATH]   (e.g. a local copy of bge-m3 on an offline host)
+"""
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from src.utils.embedding_backends import BACKENDS, PARITY_TEXTS, cosine_parity, load_model
+
+MODEL_NAME = "BAAI/bge-m3"
+QUERIES = ["chicken", "dessert", "cheap koshary", "gluten free bread", "فطير مشلتت",
+           "grilled fish with rice", "chocolate", "vegan meal under 80 EGP"] * 4
+
+
+def run_one(model_name: str, backend: str, out_path: str) -> None:
+    """Child process: load one backend, time it, dump stats + parity vectors."""
+    t0 = time.perf_counter()
+    model = load_model(model_name, backend)
+    load_s = time.perf_counter() - t0
+
+    model.encode("warm up", normalize_embeddings=True)
+    latencies = []
+    for q in QUERIES:
+        t0 = time.perf_counter()
+        model.encode(q, normalize_embeddings=True)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    vectors = np.asarray(model.encode(PARITY_TEXTS, normalize_embeddings=True))
+    np.save(out_path + ".npy", vectors)
+    with open(out_path, "w") as f:
+        json.dump({
+            "backend": backend,
+            "load_s": round(load_s, 2),
+            "p50_ms": round(statistics.median(latencies) * 1000, 1),
+            "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 1),
+            # ru_maxrss is KiB on Linux
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }, f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("backends", nargs="*", default=list(BACKENDS))
+    parser.add_argument("--threshold", type=float, default=0.99)
+    parser.add_argument("--model", default=MODEL_NAME, help="model name or local path")
+    parser.add_argument("--one", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.one:
+        run_one(args.model, args.one, args.out)
+        sys.exit(0)
+
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    results, vectors = [], {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in backends:
+            out = os.path.join(tmp, backend)
+            subprocess.run(
+                [sys.executable, "-m", "tests.bench_embedding_backends",
+                 "--model", args.model, "--one", backend, "--out", out],
+                check=True,
+            )
+            with open(out) as f:
+                results.append(json.load(f))
+            vectors[backend] = np.load(out + ".npy")
+
+    print(f"\n{'backend':<10} {'load s':>7} {'p50 ms':>8} {'p95 ms':>8} {'RSS MB':>8} {'cos min':>8}  parity")
+    for r in results:
+        parity = cosine_parity(vectors["torch"], vectors[r["backend"]])
+        status = "ok" if parity["min"] >= args.threshold else "FAIL"
+        print(f"{r['backend']:<10} {r['load_s']:>7} {r['p50_ms']:>8} {r['p95_ms']:>8} "
+              f"{r['peak_rss_mb']:>8} {parity['min']:>8.4f}  {status}")
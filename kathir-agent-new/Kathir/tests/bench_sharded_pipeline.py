@@ -0,0 +1,113 @@
+"""
+Benchmark: full re-index throughput of run_sharded_pipeline by worker count.
+
+The meals table is an in-memory fake of N synthetic meals, and each write
+can sleep --write-ms to stand in for the update_meal_embeddings round trip.
+Workers are forked so they share the fake; each one still loads its own
+copy of the (real) model, as in production.
+
+Run with: python -m tests.bench_sharded_pipeline [--meals 400] [--workers 1 2 4]
+          [--write-ms 0] [--model PATH]   (e.g. a local copy of bge-m3)
+"""
+import argparse
+import os
+import tempfile
+import time
+from types import SimpleNamespace
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.utils import embeddings
+from src.utils.embedding_backends import EMBEDDING_BACKEND, load_model
+
+WORDS = ["chicken", "dessert", "koshary", "pizza", "falafel", "grilled fish",
+         "chocolate cake", "molokhia", "shawarma", "rice pudding", "salad", "pasta"]
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows, self.n = rows, None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def gt(self, column, value):
+        self.rows = [r for r in self.rows if r[column] > value]
+        return self
+
+    def lte(self, column, value):
+        self.rows = [r for r in self.rows if r[column] <= value]
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows[:self.n])
+
+
+class FakeSupabase:
+    def __init__(self, meals, write_ms):
+        self.meals, self.write_ms = meals, write_ms
+
+    def table(self, name):
+        return FakeQuery(self.meals)
+
+    def rpc(self, name, params):
+        def execute():
+            time.sleep(self.write_ms / 1000)
+            return SimpleNamespace(data=len(params["payload"]))
+        return SimpleNamespace(execute=execute)
+
+
+def fake_meals(n):
+    return [
+        {
+            "id": f"{i:06d}",
+            "title": f"{WORDS[i % len(WORDS)]} plate {i}",
+            "description": f"home-made {WORDS[(i * 7) % len(WORDS)]} with rice, salad and bread",
+            "category": WORDS[(i * 3) % len(WORDS)],
+            "ingredients": [WORDS[(i + k) % len(WORDS)] for k in range(3)],
+            "allergens": ["gluten"] if i % 3 else [],
+        }
+        for i in range(n)
+    ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--meals", type=int, default=400)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--write-ms", type=float, default=0)
+    parser.add_argument("--model", help="model name or local path (default: the app's bge-m3)")
+    args = parser.parse_args()
+
+    embeddings.sb = FakeSupabase(fake_meals(args.meals), args.write_ms)
+    if args.model:
+        model = None
+
+        def get_model():
+            global model
+            if model is None:
+                model = load_model(args.model, EMBEDDING_BACKEND)
+            return model
+
+        embeddings.get_model = get_model
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        embeddings.EMBEDDING_CHECKPOINT_PATH = os.path.join(tmp, "checkpoint.json")
+        for workers in args.workers:
+            t0 = time.perf_counter()
+            embeddings.run_sharded_pipeline(workers, full=True, start_method="fork")
+            results.append((workers, time.perf_counter() - t0))
+
+    print(f"\n{args.meals} meals, {os.cpu_count()} CPU(s), write latency {args.write_ms:g} ms\n")
+    print(f"{'workers':>7} {'seconds':>8} {'meals/s':>8} {'speedup':>8}")
+    for workers, seconds in results:
+        print(f"{workers:>7} {seconds:>8.1f} {args.meals / seconds:>8.1f} {results[0][1] / seconds:>7.2f}x")
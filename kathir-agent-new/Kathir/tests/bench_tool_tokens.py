@@ -0,0 +1,92 @@
+"""
+Benchmark: prompt tokens spent on tool results, full vs compact view.
+
+Replays a fixed set of conversations — the tool calls the agent makes for
+them — against the live tools, and for every result counts the tokens of
+  • full     — the JSON the model used to receive (the whole tool output)
+  • compact  — what it receives now (tools/agent_views.py)
+
+A tool result is resent on every later model call in the session (two per
+turn: the tool call and the reply), so the per-conversation figure weights
+each result by how many calls carry it.
+
+Tokens are counted with tiktoken (cl100k_base) when installed, otherwise
+estimated as characters / 4. Needs the Supabase env of a normal run.
+Run with: python -m tests.bench_tool_tokens
+"""
+import json
+import os
+import uuid
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from src.tools.agent_views import compact
+from src.tools.budget import build_cart
+from src.tools.cart import get_cart
+from src.tools.favorites import search_favorites
+from src.tools.meals import search_meals
+from src.utils.request_context import user_context
+
+USER_ID = os.environ.get("BENCH_USER_ID", "11111111-1111-1111-1111-111111111111")
+RESTAURANT = os.environ.get("BENCH_RESTAURANT", "Malfoof Restaurant")
+
+TOOLS = {t.name: t for t in (search_meals, search_favorites, build_cart, get_cart)}
+
+CONVERSATIONS = {
+    "browse and narrow": [
+        ("search_meals", {"query": "chicken", "max_price": 80}),
+        ("search_meals", {"query": "grilled chicken", "max_price": 80, "sort": "price_asc"}),
+        ("get_cart", {}),
+    ],
+    "dietary": [
+        ("search_meals", {"query": "desserts", "exclude_allergens": ["gluten"], "min_similarity": 0.4}),
+        ("search_meals", {"query": "cake", "exclude_allergens": ["gluten", "dairy", "milk"], "min_similarity": 0.4}),
+    ],
+    "budget cart": [
+        ("build_cart", {"budget": 500, "restaurant_name": RESTAURANT}),
+        ("get_cart", {}),
+    ],
+    "favourites": [
+        ("search_favorites", {"user_id": USER_ID}),
+        ("search_favorites", {"user_id": USER_ID, "query": "sweet", "max_price": 60}),
+        ("search_meals", {"query": "pizza", "limit": 20}),
+    ],
+}
+
+try:
+    import tiktoken
+    _enc = tiktoken.get_encoding("cl100k_base")
+
+    def count_tokens(text: str) -> int:
+        return len(_enc.encode(text))
+except ImportError:
+    def count_tokens(text: str) -> int:
+        return len(text) // 4
+
+
+def main():
+    thread_id = str(uuid.uuid4())
+    grand_full = grand_compact = 0
+    print(f"{'conversation / call':48} {'full':>7} {'compact':>8} {'saved':>6}")
+    with user_context(USER_ID):
+        for name, calls in CONVERSATIONS.items():
+            conv_full = conv_compact = 0
+            for i, (tool, args) in enumerate(calls):
+                data = TOOLS[tool].invoke(args)
+                full = count_tokens(json.dumps(data, ensure_ascii=False))
+                small = count_tokens(compact(tool, data, thread_id))
+                carried = 1 + 2 * (len(calls) - 1 - i)  # model calls that resend it
+                conv_full += full * carried
+                conv_compact += small * carried
+                label = f"  {tool}({', '.join(f'{k}={v}' for k, v in args.items() if k != 'user_id')})"
+                print(f"{label[:48]:48} {full:7d} {small:8d} {1 - small / max(full, 1):6.0%}")
+            grand_full += conv_full
+            grand_compact += conv_compact
+            print(f"{name + ' (prompt tokens, whole session)':48} {conv_full:7d} {conv_compact:8d} "
+                  f"{1 - conv_compact / max(conv_full, 1):6.0%}")
+    print(f"{'ALL':48} {grand_full:7d} {grand_compact:8d} {1 - grand_compact / max(grand_full, 1):6.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Micro-batching of query embeddings (src/utils/batch_encoder.py).
+
+A fake model stands in for bge-m3: it records every encode() call and
+returns one vector per text, so the tests can check how requests were
+grouped, that duplicates share a slot, and that failures reach the right
+callers without killing the worker thread.
+Run with: python -m pytest tests/test_batch_encoder.py
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from src.utils.batch_encoder import BatchEncoder
+
+
+class FakeModel:
+    def __init__(self, fail=False, drop_last=False, gate=None):
+        self.calls = []
+        self.fail = fail
+        self.drop_last = drop_last
+        self.gate = gate
+
+    def encode(self, texts, **kwargs):
+        self.calls.append(list(texts))
+        if self.gate is not None:
+            self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("model exploded")
+        vecs = np.array([[float(len(t)), 1.0] for t in texts])
+        return vecs[:-1] if self.drop_last else vecs
+
+
+def submit_all(encoder, texts):
+    return [encoder.submit(t) for t in texts]
+
+
+def test_identical_texts_share_one_slot():
+    model = FakeModel()
+    encoder = BatchEncoder(lambda: model, window_ms=200, max_batch=32)
+
+    futures = submit_all(encoder, ["pizza", "pizza", "koshary"])
+
+    assert [f.result(5) for f in futures] == [[5.0, 1.0], [5.0, 1.0], [7.0, 1.0]]
+    assert model.calls == [["pizza", "koshary"]]
+    assert encoder.stats()["items"] == 3
+
+
+def test_window_closes_a_batch():
+    model = FakeModel()
+    encoder = BatchEncoder(lambda: model, window_ms=20, max_batch=32)
+
+    first = encoder.submit("pizza")
+    first.result(5)
+    second = encoder.submit("koshary")
+    second.result(5)
+
+    assert model.calls == [["pizza"], ["koshary"]]
+    assert encoder.stats()["batches"] == 2
+
+
+def test_max_batch_caps_a_batch():
+    model = FakeModel()
+    encoder = BatchEncoder(lambda: model, window_ms=300, max_batch=2)
+
+    futures = submit_all(encoder, ["a", "bb", "ccc", "dddd", "eeeee"])
+
+    assert [f.result(5)[0] for f in futures] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert model.calls == [["a", "bb"], ["ccc", "dddd"], ["eeeee"]]
+
+
+def test_model_error_reaches_every_caller_and_worker_survives():
+    model = FakeModel(fail=True)
+    encoder = BatchEncoder(lambda: model, window_ms=100, max_batch=32)
+
+    futures = submit_all(encoder, ["pizza", "koshary"])
+    for fut in futures:
+        with pytest.raises(RuntimeError, match="model exploded"):
+            fut.result(5)
+
+    model.fail = False
+    assert encoder.submit("salad").result(5) == [5.0, 1.0]
+
+
+def test_missing_vector_only_fails_its_own_caller():
+    model = FakeModel(drop_last=True)
+    encoder = BatchEncoder(lambda: model, window_ms=100, max_batch=32)
+
+    ok, missing = submit_all(encoder, ["pizza", "koshary"])
+
+    assert ok.result(5) == [5.0, 1.0]
+    with pytest.raises(RuntimeError, match="no embedding returned"):
+        missing.result(5)
+    model.drop_last = False
+    assert encoder.submit("salad").result(5) == [5.0, 1.0]
+
+
+def test_cancelled_request_is_dropped():
+    gate = threading.Event()
+    model = FakeModel(gate=gate)
+    encoder = BatchEncoder(lambda: model, window_ms=10, max_batch=32)
+
+    busy = encoder.submit("pizza")
+    while not model.calls:  # worker is now blocked inside encode()
+        time.sleep(0.005)
+    cancelled = encoder.submit("koshary")
+    assert cancelled.cancel()
+    waiting = encoder.submit("salad")
+    gate.set()
+
+    assert busy.result(5) == [5.0, 1.0]
+    assert waiting.result(5) == [5.0, 1.0]
+    assert model.calls == [["pizza"], ["salad"]]
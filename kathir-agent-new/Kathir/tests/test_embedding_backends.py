@@ -0,0 +1,32 @@
+"""
+Backend selection helpers (src/utils/embedding_backends.py).
+
+Nothing here loads a model: the checks cover the cheap paths that decide
+what gets loaded and how its vectors are labelled and compared.
+Run with: python -m pytest tests/test_embedding_backends.py
+"""
+import numpy as np
+import pytest
+
+from src.utils import embedding_backends
+from src.utils.embedding_backends import backend_tag, cosine_parity, load_model
+
+
+@pytest.mark.parametrize("backend", ["int4", "ONNX", ""])
+def test_load_model_rejects_unknown_backend(backend):
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        load_model("BAAI/bge-m3", backend)
+
+
+def test_backend_tag_names_the_onnx_quant_kernel(monkeypatch):
+    monkeypatch.setattr(embedding_backends, "_ONNX_QUANT_CONFIG", "avx512_vnni")
+    assert backend_tag("onnx-int8") == "onnx-int8-avx512_vnni"
+    assert [backend_tag(b) for b in ("torch", "int8", "onnx")] == ["torch", "int8", "onnx"]
+
+
+def test_cosine_parity_is_row_wise():
+    reference = np.array([[1.0, 0.0], [0.0, 2.0]])
+    candidate = np.array([[3.0, 0.0], [1.0, 1.0]])
+    parity = cosine_parity(reference, candidate)
+    assert parity["min"] == pytest.approx(np.sqrt(0.5))
+    assert parity["mean"] == pytest.approx((1 + np.sqrt(0.5)) / 2)
@@ -0,0 +1,67 @@
+"""
+Rule-stage routes of the intent router (src/intent_router.py).
+
+The embedding stage is switched off so only the regex rules decide; the
+cases pin what may take the fast path and what must reach the agent.
+Run with: python -m pytest tests/test_intent_router.py
+"""
+import pytest
+
+from src import intent_router
+from src.intent_router import Route, classify
+
+
+@pytest.fixture(autouse=True)
+def rules_only(monkeypatch):
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_ENABLED", True)
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_EMBEDDINGS", False)
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("what's in my cart?", Route("get_cart", {}, "rule")),
+    ("ايه اللي في السلة", Route("get_cart", {}, "rule")),
+    ("show me chicken", Route("search_meals", {"query": "chicken"}, "rule")),
+    ("find desserts under 50 EGP", Route("search_meals", {"max_price": 50.0, "query": "desserts"}, "rule")),
+    ("show me the cheapest pizza", Route("search_meals", {"sort": "price_asc", "query": "pizza"}, "rule")),
+    ("عايز فراخ", Route("search_meals", {"query": "فراخ"}, "rule")),
+    ("عايز بيتزا اقل من 80 جنيه", Route("search_meals", {"max_price": 80.0, "query": "بيتزا"}, "rule")),
+    ("my favourites", Route("search_favorites", {}, "rule")),
+    ("my favorite desserts", Route("search_favorites", {"query": "desserts"}, "rule")),
+])
+def test_routes_simple_requests(message, expected):
+    assert classify(message) == expected
+
+
+@pytest.mark.parametrize("message", [
+    # no food named
+    "I need help",
+    "show me my orders",
+    "find me something",
+    # restaurant mentions
+    "show me pizza from Malfoof Restaurant",
+    "عايز بيتزا من مطعم ملفوف",
+    # negations, allergens and diets
+    "find me something without eggs",
+    "show me meals with no nuts",
+    "show me gluten-free bread",
+    "any vegan desserts",
+    "عايز حلويات بدون مكسرات",
+    "عايز كيك من غير لبن",
+    "my favourites without nuts",
+    # quantities and headcounts
+    "show me pizza for 4 people",
+    "I want 2 burgers",
+    "find chicken for my family",
+    # follow-ups and cart edits
+    "add the second one to my cart",
+    "show me cheaper ones",
+    "عايز ده",
+])
+def test_sends_to_agent(message):
+    assert classify(message) is None
+
+
+@pytest.mark.parametrize("message", ["عايز ديك رومي", "عايز دولمة", "عايز دجاج"])
+def test_arabic_demonstratives_need_word_boundaries(message):
+    # "ده / دي / دول" inside ordinary words must not count as a reference back.
+    assert not intent_router._NEEDS_AGENT.search(message)
@@ -0,0 +1,180 @@
+"""
+Sharded re-index (run_sharded_pipeline in src/utils/embeddings.py).
+
+The meals table and the model are in-process fakes and the worker pool is
+forked, so the workers inherit them. Workers log every text they encode
+and every id they write to files under tmp_path, which is how the tests
+see what happened inside the other processes.
+Run with: python -m pytest tests/test_sharded_pipeline.py
+"""
+import json
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from src.utils import embeddings
+from src.utils.embeddings import _shard_ranges, run_sharded_pipeline
+
+MEAL_IDS = [f"m{i:03d}" for i in range(10)]
+
+
+class FakeQuery:
+    def __init__(self, rows):
+        self.rows = rows
+        self.n = None
+
+    def select(self, columns):
+        return self
+
+    def order(self, column):
+        self.rows = sorted(self.rows, key=lambda r: r["id"])
+        return self
+
+    def limit(self, n):
+        self.n = n
+        return self
+
+    def gt(self, column, value):
+        self.rows = [r for r in self.rows if r[column] > value]
+        return self
+
+    def lte(self, column, value):
+        self.rows = [r for r in self.rows if r[column] <= value]
+        return self
+
+    def execute(self):
+        return SimpleNamespace(data=self.rows[:self.n])
+
+
+class FakeSupabase:
+    def __init__(self, log_dir):
+        # Already embedded and unchanged: only a --full run re-encodes them.
+        self.meals = [
+            {
+                "id": mid,
+                "title": f"meal {mid}",
+                "embedding_hash": embeddings.content_hash(f"meal {mid}"),
+                "embedding_model": embeddings.EMBEDDING_MODEL_VERSION,
+            }
+            for mid in MEAL_IDS
+        ]
+        self.writes = log_dir / "writes.log"
+
+    def table(self, name):
+        return FakeQuery(list(self.meals))
+
+    def rpc(self, name, params):
+        rows = params["payload"]
+        with open(self.writes, "a") as f:
+            f.writelines(f"{r['id']}\n" for r in rows)
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=len(rows)))
+
+
+class FakeModel:
+    """Logs encoded meal ids; raises on `crash_on` while the crash flag file exists."""
+
+    def __init__(self, log_dir, crash_on=None):
+        self.encodes = log_dir / "encodes.log"
+        self.crash_flag = log_dir / "crash"
+        self.crash_on = crash_on
+
+    def encode(self, texts, **kwargs):
+        ids = [t.split()[1] for t in texts]
+        if self.crash_on in ids and self.crash_flag.exists():
+            raise RuntimeError(f"worker died on {self.crash_on}")
+        with open(self.encodes, "a") as f:
+            f.writelines(f"{mid}\n" for mid in ids)
+        return np.ones((len(texts), 4))
+
+
+def read_log(path):
+    return path.read_text().split() if path.exists() else []
+
+
+@pytest.fixture
+def pipeline(tmp_path, monkeypatch):
+    db, model = FakeSupabase(tmp_path), FakeModel(tmp_path, crash_on="m007")
+    monkeypatch.setattr(embeddings, "sb", db)
+    monkeypatch.setattr(embeddings, "get_model", lambda: model)
+    monkeypatch.setattr(embeddings, "EMBEDDING_CHECKPOINT_PATH", str(tmp_path / "checkpoint.json"))
+
+    def run(workers, **kwargs):
+        run_sharded_pipeline(workers, page_size=2, start_method="fork", **kwargs)
+
+    run.db, run.model = db, model
+    run.checkpoint = tmp_path / "checkpoint.json"
+    return run
+
+
+def test_ranges_cover_every_id_once(pipeline):
+    ranges = _shard_ranges(3)
+    assert ranges == [(None, "m003"), ("m003", "m007"), ("m007", "m009")]
+    assert _shard_ranges(2, after_id="m005") == [("m005", "m007"), ("m007", "m009")]
+    assert _shard_ranges(20)[-1] == ("m008", "m009")
+
+
+def test_every_meal_embedded_and_written_once(pipeline):
+    pipeline(3, full=True)
+
+    assert sorted(read_log(pipeline.model.encodes)) == MEAL_IDS
+    assert sorted(read_log(pipeline.db.writes)) == MEAL_IDS
+    assert not pipeline.checkpoint.exists()
+
+
+def test_crashed_run_resumes_each_shard_from_checkpoint(pipeline):
+    pipeline.model.crash_flag.touch()
+    with pytest.raises(RuntimeError, match="worker died on m007"):
+        pipeline(3, full=True)
+
+    checkpoint = json.loads(pipeline.checkpoint.read_text())
+    assert checkpoint["full"] is True
+    assert [s["until_id"] for s in checkpoint["shards"]] == ["m003", "m007", "m009"]
+    # The crashing shard got its first page (m004, m005) written and saved.
+    assert checkpoint["shards"][1]["after_id"] == "m005"
+    # Ids each shard has checkpointed as written: (start of its range, after_id].
+    shards = checkpoint["shards"]
+    starts = [None] + [s["until_id"] for s in shards[:-1]]
+    done = {
+        mid
+        for start, s in zip(starts, shards)
+        for mid in MEAL_IDS
+        if (start is None or mid > start) and s["after_id"] and mid <= s["after_id"]
+    }
+    first_run = read_log(pipeline.model.encodes)
+    os.remove(pipeline.model.encodes)
+    pipeline.model.crash_flag.unlink()
+
+    # The shard layout and --full come from the checkpoint, not this call.
+    pipeline(5, full=False)
+
+    second_run = read_log(pipeline.model.encodes)
+    assert {"m004", "m005"} <= done
+    assert not done & set(second_run)
+    assert sorted(set(first_run) | set(second_run)) == MEAL_IDS
+    assert set(read_log(pipeline.db.writes)) == set(MEAL_IDS)
+    assert not pipeline.checkpoint.exists()
+
+
+def test_restart_ignores_a_sharded_checkpoint(pipeline):
+    finished = [{"after_id": "m009", "until_id": "m009", "totals": embeddings._new_totals()}]
+    pipeline.checkpoint.write_text(json.dumps({"full": True, "shards": finished}))
+
+    pipeline(2, full=True)
+    assert read_log(pipeline.model.encodes) == []
+    assert not pipeline.checkpoint.exists()
+
+    pipeline.checkpoint.write_text(json.dumps({"full": True, "shards": finished}))
+    pipeline(2, full=True, restart=True)
+    assert sorted(read_log(pipeline.model.encodes)) == MEAL_IDS
+
+
+def test_single_process_checkpoint_is_sharded_from_where_it_stopped(pipeline):
+    totals = dict(embeddings._new_totals(), seen=6, embedded=6)
+    pipeline.checkpoint.write_text(json.dumps({"after_id": "m005", "full": True, "totals": totals}))
+
+    pipeline(2)
+
+    assert sorted(read_log(pipeline.model.encodes)) == ["m006", "m007", "m008", "m009"]
+    assert not pipeline.checkpoint.exists()
@@ -0,0 +1,7 @@
+-- Track what each stored meal embedding was computed from.
+-- run_embedding_pipeline compares sha256(build_meal_text(meal)) and the model
+-- version against these columns and only re-encodes meals that differ.
+
+ALTER TABLE public.meals
+  ADD COLUMN IF NOT EXISTS embedding_hash  text,
+  ADD COLUMN IF NOT EXISTS embedding_model text;
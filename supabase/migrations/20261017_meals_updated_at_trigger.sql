@@ -0,0 +1,16 @@
+-- Keep meals.updated_at current on every UPDATE.
+-- The agent API refreshes its in-process vector index incrementally by
+-- polling rows with updated_at > last cursor, so stock/status/embedding
+-- changes must bump the timestamp.
+
+-- Step 1: Trigger (reuses the shared set_updated_at() helper)
+DROP TRIGGER IF EXISTS trg_meals_set_updated_at ON public.meals;
+
+CREATE TRIGGER trg_meals_set_updated_at
+  BEFORE UPDATE ON public.meals
+  FOR EACH ROW
+  EXECUTE FUNCTION public.set_updated_at();
+
+-- Step 2: Index for the incremental "changed since" poll
+CREATE INDEX IF NOT EXISTS idx_meals_updated_at
+  ON public.meals (updated_at);
@@ -0,0 +1,76 @@
+-- Filtered vector search for the agent API's search_meals tool.
+-- Replaces the match_meals RPC + hydration select pair with one call:
+-- restaurant, price, category and allergen filters run in SQL, and rows come
+-- back fully hydrated (including restaurant_name), best match first.
+-- NULL filter arguments are ignored. Allergen comparisons are case-insensitive.
+
+CREATE OR REPLACE FUNCTION public.search_meals_filtered(
+  query_embedding   public.vector,
+  match_threshold   double precision DEFAULT 0.55,
+  match_count       integer          DEFAULT 8,
+  restaurant_ids    uuid[]           DEFAULT NULL,
+  min_price         numeric          DEFAULT NULL,
+  max_price         numeric          DEFAULT NULL,
+  category_filter   text             DEFAULT NULL,
+  exclude_allergens text[]           DEFAULT NULL,
+  require_allergens text[]           DEFAULT NULL
+)
+RETURNS TABLE(
+  id                 uuid,
+  title              text,
+  description        text,
+  category           text,
+  image_url          text,
+  discounted_price   numeric,
+  allergens          text[],
+  status             text,
+  expiry_date        timestamptz,
+  quantity_available integer,
+  restaurant_id      uuid,
+  restaurant_name    text,
+  similarity         double precision
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    m.id,
+    m.title,
+    m.description,
+    m.category,
+    m.image_url,
+    m.discounted_price,
+    m.allergens,
+    m.status,
+    m.expiry_date,
+    m.quantity_available,
+    m.restaurant_id,
+    r.restaurant_name,
+    1 - (m.embedding <=> query_embedding) AS similarity
+  FROM public.meals m
+  LEFT JOIN public.restaurants r ON r.profile_id = m.restaurant_id
+  WHERE m.status = 'active'
+    AND m.quantity_available > 0
+    AND m.expiry_date > now()
+    AND m.embedding IS NOT NULL
+    AND (1 - (m.embedding <=> query_embedding)) >= match_threshold
+    AND (restaurant_ids  IS NULL OR m.restaurant_id = ANY (restaurant_ids))
+    AND (min_price       IS NULL OR m.discounted_price >= min_price)
+    AND (max_price       IS NULL OR m.discounted_price <= max_price)
+    AND (category_filter IS NULL OR m.category = category_filter)
+    AND (
+      exclude_allergens IS NULL
+      OR NOT (ARRAY(SELECT lower(a) FROM unnest(m.allergens) a)
+              && ARRAY(SELECT lower(a) FROM unnest(exclude_allergens) a))
+    )
+    AND (
+      require_allergens IS NULL
+      OR ARRAY(SELECT lower(a) FROM unnest(m.allergens) a)
+         @> ARRAY(SELECT lower(a) FROM unnest(require_allergens) a)
+    )
+  ORDER BY m.embedding <=> query_embedding
+  LIMIT match_count;
+$$;
+
+GRANT EXECUTE ON FUNCTION public.search_meals_filtered(
+  public.vector, double precision, integer, uuid[], numeric, numeric, text, text[], text[]
+) TO anon, authenticated, service_role;
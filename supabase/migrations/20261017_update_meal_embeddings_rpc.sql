@@ -0,0 +1,25 @@
+-- Batch writer for meal embeddings.
+-- Takes a JSON array of {id, embedding, embedding_hash, embedding_model}
+-- objects and updates them all in one statement, so the embedding pipeline
+-- writes a chunk of rows per request instead of one UPDATE round trip each.
+-- Returns the number of rows updated.
+
+CREATE OR REPLACE FUNCTION public.update_meal_embeddings(payload jsonb)
+RETURNS integer
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE public.meals AS m
+       SET embedding       = (r->'embedding')::text::public.vector,
+           embedding_hash  = COALESCE(r->>'embedding_hash', m.embedding_hash),
+           embedding_model = COALESCE(r->>'embedding_model', m.embedding_model)
+      FROM jsonb_array_elements(payload) AS r
+     WHERE m.id = (r->>'id')::uuid
+    RETURNING m.id
+  )
+  SELECT count(*)::integer FROM updated;
+$$;
+
+-- Only the backend (service role) may bulk-write embeddings.
+REVOKE ALL ON FUNCTION public.update_meal_embeddings(jsonb) FROM PUBLIC, anon, authenticated;
+GRANT EXECUTE ON FUNCTION public.update_meal_embeddings(jsonb) TO service_role;
@@ -0,0 +1,10 @@
+-- Keyset pagination for meal browse (/meals/search and /favorites/search
+-- without a query). Pages are read as
+--   ORDER BY discounted_price, id
+--   WHERE (discounted_price, id) > (:last_price, :last_id)
+-- so a deep page is an index range scan instead of an OFFSET over every
+-- earlier row. Partial on active meals, matching the browse filter.
+
+CREATE INDEX IF NOT EXISTS idx_meals_active_price_id
+  ON public.meals (discounted_price, id)
+  WHERE status = 'active';
@@ -0,0 +1,85 @@
+-- Server-side allergen filtering for meal search.
+-- Adds a lowercase, trimmed, de-duplicated copy of meals.allergens backed by
+-- a GIN index, so exclude / require filters become array-overlap (&&) and
+-- contains (@>) predicates instead of a Python post-filter.
+
+-- Step 1: Normalizer (IMMUTABLE so it can back a generated column)
+CREATE OR REPLACE FUNCTION public.normalize_allergens(items text[])
+RETURNS text[]
+LANGUAGE sql IMMUTABLE PARALLEL SAFE
+AS $$
+  SELECT COALESCE(array_agg(DISTINCT lower(btrim(a))), ARRAY[]::text[])
+  FROM unnest(items) AS a
+  WHERE btrim(a) <> '';
+$$;
+
+-- Step 2: Generated column
+ALTER TABLE public.meals
+  ADD COLUMN IF NOT EXISTS allergens_normalized text[]
+  GENERATED ALWAYS AS (public.normalize_allergens(allergens)) STORED;
+
+-- Step 3: GIN index for && / @> lookups
+CREATE INDEX IF NOT EXISTS idx_meals_allergens_normalized
+  ON public.meals USING gin (allergens_normalized);
+
+-- Step 4: search_meals_filtered uses the indexed column
+CREATE OR REPLACE FUNCTION public.search_meals_filtered(
+  query_embedding   public.vector,
+  match_threshold   double precision DEFAULT 0.55,
+  match_count       integer          DEFAULT 8,
+  restaurant_ids    uuid[]           DEFAULT NULL,
+  min_price         numeric          DEFAULT NULL,
+  max_price         numeric          DEFAULT NULL,
+  category_filter   text             DEFAULT NULL,
+  exclude_allergens text[]           DEFAULT NULL,
+  require_allergens text[]           DEFAULT NULL
+)
+RETURNS TABLE(
+  id                 uuid,
+  title              text,
+  description        text,
+  category           text,
+  image_url          text,
+  discounted_price   numeric,
+  allergens          text[],
+  status             text,
+  expiry_date        timestamptz,
+  quantity_available integer,
+  restaurant_id      uuid,
+  restaurant_name    text,
+  similarity         double precision
+)
+LANGUAGE sql STABLE
+AS $$
+  SELECT
+    m.id,
+    m.title,
+    m.description,
+    m.category,
+    m.image_url,
+    m.discounted_price,
+    m.allergens,
+    m.status,
+    m.expiry_date,
+    m.quantity_available,
+    m.restaurant_id,
+    r.restaurant_name,
+    1 - (m.embedding <=> query_embedding) AS similarity
+  FROM public.meals m
+  LEFT JOIN public.restaurants r ON r.profile_id = m.restaurant_id
+  WHERE m.status = 'active'
+    AND m.quantity_available > 0
+    AND m.expiry_date > now()
+    AND m.embedding IS NOT NULL
+    AND (1 - (m.embedding <=> query_embedding)) >= match_threshold
+    AND (restaurant_ids  IS NULL OR m.restaurant_id = ANY (restaurant_ids))
+    AND (min_price       IS NULL OR m.discounted_price >= min_price)
+    AND (max_price       IS NULL OR m.discounted_price <= max_price)
+    AND (category_filter IS NULL OR m.category = category_filter)
+    AND (exclude_allergens IS NULL
+         OR NOT (m.allergens_normalized && public.normalize_allergens(exclude_allergens)))
+    AND (require_allergens IS NULL
+         OR m.allergens_normalized @> public.normalize_allergens(require_allergens))
+  ORDER BY m.embedding <=> query_embedding
+  LIMIT match_count;
+$$;